@@ -0,0 +1,244 @@
+"""
+File: arithmetic.py
+Description:
+    Exact numeric fast path of calculator.regular. Expressions without
+    variables or constants (2^64 + 1, 1/3 + 1/6, sqrt(9/4), sin(2.5)) are
+    evaluated while parsing, with ints and fractions.Fraction and math
+    functions for float arguments, without building sympy objects.
+    Results that need an exact irrational form (sqrt(2), sin(1), 2^(1/3))
+    are handed back to the sympy path.
+"""
+
+import re
+import math
+import operator
+from fractions import Fraction
+from functools import lru_cache
+import sympy as smp
+
+
+# The fast path can be switched off (benchmarks compare it with eval / sympy)
+settings = {'enabled': True}
+
+# Results kept per expression text, and the largest power (in bits) computed exactly
+RESULT_CACHE = 4096
+MAX_BITS = 1 << 16
+
+# Numbers, operators and function names of a cleaned expression
+token = re.compile(r'\d+\.?\d*|\.\d+|\*\*|//|[-+*/%()^]|[A-Za-z_]+|.')
+
+# Float functions, with the exact arguments whose values are exact
+functions = {'sqrt': math.sqrt, 'exp': math.exp, 'ln': math.log, 'log': math.log, 'sin': math.sin,
+             'cos': math.cos, 'tan': math.tan, 'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
+             'sec': lambda v: 1 / math.cos(v), 'csc': lambda v: 1 / math.sin(v), 'cot': lambda v: 1 / math.tan(v)}
+exact_values = {'exp': {0: 1}, 'ln': {1: 0}, 'log': {1: 0}, 'sin': {0: 0}, 'cos': {0: 1}, 'tan': {0: 0},
+                'asin': {0: 0}, 'acos': {1: 0}, 'atan': {0: 0}, 'sec': {0: 1}}
+
+
+class NeedsSympy(Exception):
+    """The value needs an exact irrational (or complex, or too large) sympy form"""
+
+
+# ------------------ Exact operations ------------------
+
+def is_exact(value):
+    """
+    :returns: whether value is an int / Fraction
+    """
+    return isinstance(value, (int, Fraction))
+
+def exact(value):
+    """
+    :param value: int or Fraction
+    :returns: int when the Fraction is whole
+    """
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return value.numerator
+    return value
+
+def root(value, n):
+    """
+    Exact n-th root of a nonnegative int / Fraction
+
+    :raises NeedsSympy: when the root isn't rational
+    """
+    value = Fraction(value)
+    if value < 0:
+        raise NeedsSympy(value)
+    parts = []
+    for part in (value.numerator, value.denominator):
+        if n == 2:
+            guess = math.isqrt(part)
+        elif part.bit_length() < 1000:
+            guess = round(part ** (1 / n))
+        else:
+            raise NeedsSympy(value)
+        found = [g for g in (guess - 1, guess, guess + 1) if g >= 0 and g ** n == part]
+        if not found:
+            raise NeedsSympy(value)
+        parts.append(found[0])
+    return exact(Fraction(*parts))
+
+def power(base, exponent):
+    """
+    base ** exponent, exact for exact operands when the result is rational
+    """
+    if type(base) is int and type(exponent) is int and exponent >= 0:
+        if exponent * base.bit_length() > MAX_BITS:
+            raise NeedsSympy(exponent)
+        return base ** exponent
+    if not is_exact(base) or not is_exact(exponent):
+        result = base ** exponent
+        if isinstance(result, complex) or (isinstance(result, smp.Basic) and not result.is_real):
+            raise NeedsSympy(result)
+        return result
+    exponent = Fraction(exponent)
+    base = Fraction(base)
+    bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+    if abs(exponent.numerator) * bits > MAX_BITS:
+        raise NeedsSympy(exponent)
+    if base == 0 and exponent < 0:
+        raise ZeroDivisionError('0 to a negative power')
+    if exponent.denominator != 1:
+        base = Fraction(root(base, exponent.denominator))
+    return exact(base ** exponent.numerator)
+
+def call(name, value):
+    """
+    Function of a number: math for floats, exact values (sqrt(9/4), cos(0)) for ints / Fractions
+    """
+    if not is_exact(value):
+        try:
+            return smp.Float(functions[name](float(value)))
+        except (ValueError, ZeroDivisionError):
+            raise NeedsSympy(value)
+    if name == 'sqrt':
+        return root(value, 2)
+    if value in exact_values.get(name, {}):
+        return exact_values[name][value]
+    raise NeedsSympy(value)
+
+
+# ------------------ Evaluating ------------------
+
+binary = {'+': operator.add, '-': operator.sub, '*': operator.mul, '//': operator.floordiv, '%': operator.mod}
+
+def divide(a, b):
+    """
+    a / b, exact (int when whole) for exact operands
+    """
+    if type(a) is int and type(b) is int:
+        whole, rest = divmod(a, b)
+        return whole if rest == 0 else Fraction(a, b)
+    if is_exact(a) and is_exact(b):
+        return exact(Fraction(a) / b)
+    return a / b
+
+def apply(op, a, b):
+    """
+    :param op: binary operator token
+    :returns: a op b
+    """
+    if op == '/':
+        return divide(a, b)
+    if type(a) is int and type(b) is int:
+        return binary[op](a, b)
+    return exact(binary[op](a, b))
+
+class Evaluator:
+    """
+    Precedence climbing over the tokens of a cleaned expression, with
+    python's precedence (** binds tighter than a unary minus on its left)
+    computing values while parsing
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.at = 0
+
+    def peek(self):
+        return self.tokens[self.at] if self.at < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise SyntaxError(f'expected {expected}, got {token}')
+        self.at += 1
+        return token
+
+    def sum(self):
+        value = self.product()
+        while self.peek() in ('+', '-'):
+            op = self.take()
+            value = apply(op, value, self.product())
+        return value
+
+    def product(self):
+        value = self.unary()
+        while self.peek() in ('*', '/', '//', '%'):
+            op = self.take()
+            value = apply(op, value, self.unary())
+        return value
+
+    def unary(self):
+        token = self.peek()
+        if token == '-':
+            self.take()
+            return -self.unary()
+        if token == '+':
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        value = self.atom()
+        if self.peek() in ('**', '^'):
+            self.take()
+            return power(value, self.unary())
+        return value
+
+    def atom(self):
+        token = self.take()
+        if token == '(':
+            value = self.sum()
+            self.take(')')
+            return value
+        if token in functions:
+            self.take('(')
+            value = self.sum()
+            self.take(')')
+            return call(token, value)
+        if token[0].isdigit() or token[0] == '.':
+            return float(token) if '.' in token else int(token)
+        raise SyntaxError(f'unexpected {token}')
+
+def evaluate(text):
+    """
+    :param text: cleaned or raw expression (^ is read as **)
+    :returns: exact value (int / Fraction), float, sympy Float when a math function
+              was applied to a float (sympy's own type for it), or None when text
+              isn't a pure number expression or needs sympy
+    """
+    return evaluated(text) if settings['enabled'] else None
+
+@lru_cache(maxsize=RESULT_CACHE)
+def evaluated(text):
+    """
+    Cached evaluate (results are immutable numbers)
+    """
+    tokens = token.findall(text)
+    if not tokens or any(t[0].isalpha() and t not in functions for t in tokens) or ''.join(tokens) != text:
+        return None
+    evaluator = Evaluator(tokens)
+    try:
+        value = evaluator.sum()
+    except (NeedsSympy, SyntaxError, ValueError, ArithmeticError):
+        # 1/0, 5%0, 2.0^10000 ... are left to the sympy path
+        return None
+    return value if evaluator.peek() is None else None
+
+
+# Test:
+if __name__ == '__main__':
+    for expression in ['2**64+1', '1/3+1/6', 'sqrt(9/4)', '(8/27)**(2/3)', 'sin(2.5)', '2.5*4', 'sqrt(2)', 'x+1']:
+        print(expression, evaluate(expression))
@@ -0,0 +1,81 @@
+"""
+File: batched.py
+Description:
+    Implements batched matrix operations over stacks of matrices, shape (N, k, k),
+    for vector_calc in vector.py. Stacks go through NumPy's broadcasting linalg
+    and very large stacks are split across a thread pool.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from threadpoolctl import threadpool_limits  # limits BLAS / LAPACK threads inside the pool
+
+
+# Matrices per thread chunk, smaller stacks run in a single call
+BATCH_CHUNK = 16384
+
+batch_ops = ['det', 'inv', 'matmul', 'solve']
+
+
+def kernel(oper, a, b=None):
+    """
+    Broadcasting linalg operation on one stack
+    :param oper: operation in batch_ops
+    :param a: (n, k, k) stack
+    :param b: (n, k, m) / (k, m) stack for matmul and solve
+    :returns: operation result for the stack
+    """
+    if oper == 'det':
+        return np.linalg.det(a)
+    if oper == 'inv':
+        return np.linalg.inv(a)
+    if oper == 'matmul':
+        return np.matmul(a, b)
+    if oper == 'solve':
+        return np.linalg.solve(a, b)
+
+def blas_threads(limit):
+    """
+    Context limiting BLAS threads, so pool threads don't oversubscribe the cores
+    :param limit: max BLAS threads
+    :returns: context manager
+    """
+    return threadpool_limits(limits=limit)
+
+def batched_calc(oper, a, b=None, workers=None, chunk=BATCH_CHUNK):
+    """
+    Runs a matrix operation over a stack of matrices
+
+    :param oper: operation in batch_ops
+    :param a: (N, k, k) array
+    :param b: second operand for matmul / solve, one matrix or a stack of N
+    :param workers: threads for large stacks (defaults to cpu count)
+    :param chunk: matrices per thread chunk
+    :returns: stacked results, (N,) for det
+    :raises ValueError: operation not in batch_ops
+    """
+
+    if oper not in batch_ops:
+        raise ValueError(f'{oper} is not supported for stacks of matrices')
+    a = np.asarray(a)
+    per_matrix = b is not None and np.ndim(b) == 3
+    workers = workers or os.cpu_count() or 1
+
+    # Small stacks (or one worker): one broadcasting call
+    if len(a) <= chunk or workers == 1:
+        return kernel(oper, a, b)
+
+    # Each thread runs LAPACK on its own chunk, so BLAS itself stays single threaded
+    starts = range(0, len(a), chunk)
+    parts = [(a[s:s + chunk], b[s:s + chunk] if per_matrix else b) for s in starts]
+    with blas_threads(1), ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(lambda part: kernel(oper, *part), parts))
+    return np.concatenate(results)
+
+
+# Test:
+if __name__ == '__main__':
+    stack = np.random.default_rng(0).random((5, 3, 3))
+    print(batched_calc('det', stack))
+    print(np.allclose(batched_calc('det', stack, chunk=2, workers=2), np.linalg.det(stack)))
@@ -0,0 +1,58 @@
+"""
+File: bench_arithmetic.py
+Description:
+    Throughput of calculate() on pure number expressions with the exact
+    numeric fast path (arithmetic.py) and through clean / eval / sympy,
+    for a workload of unique expressions and one repeating 50 expressions.
+    Usage: python benchmarks/bench_arithmetic.py [requests, default 20000]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import arithmetic
+from calculator import calculate
+
+shapes = ['{a}+{b}*{c}', '{a}/{b}+{c}/{d}', '({a}+{b})*({c}-{d})/{a}', '{a}^3-{b}^2/{c}',
+          'sqrt({a}*{a})/{b}', '{a}.5*{b}-{c}', 'sin({a}.5)*{b}', '({a}/{b})^2']
+
+
+def workload(count, rng):
+    """
+    :param count: number of expressions
+    :param rng: random.Random
+    :returns: list of expression strings
+    """
+    return [rng.choice(shapes).format(a=rng.randint(1, 999), b=rng.randint(1, 999), c=rng.randint(1, 999),
+                                      d=rng.randint(1, 999)) for _ in range(count)]
+
+
+def throughput(exprs):
+    """
+    :returns: calculate requests per second over exprs
+    """
+    no_conditions = ['', '', '', '', '', '']
+    start = time.perf_counter()
+    for expr in exprs:
+        calculate(expr, no_conditions)
+    return len(exprs) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    unique = workload(count, rng)
+    repeated = unique[:50] * (count // 50)
+
+    print(f'{"workload":>9} {"fast /s":>10} {"eval /s":>10} {"speedup":>8}')
+    for name, exprs in (('unique', unique), ('repeated', repeated)):
+        arithmetic.evaluated.cache_clear()
+        arithmetic.settings['enabled'] = True
+        fast = throughput(exprs)
+        arithmetic.settings['enabled'] = False
+        slow = throughput(exprs)
+        arithmetic.settings['enabled'] = True
+        print(f'{name:>9} {fast:10,.0f} {slow:10,.0f} {fast / slow:7.1f}x')
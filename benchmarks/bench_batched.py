@@ -0,0 +1,50 @@
+"""
+File: bench_batched.py
+Description:
+    Compares batched vector_calc matrix operations on an (N, k, k) stack
+    with calling vector.det / np.linalg once per matrix.
+    Usage: python benchmarks/bench_batched.py [N, default 100000] [k, default 3]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from vector import vector_calc, det
+
+
+def timed(func):
+    """
+    Seconds taken by one call of func
+    :param func: function without arguments
+    :returns: (seconds, result)
+    """
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    stack = np.random.default_rng(0).integers(-9, 10, (n, k, k))
+    strings = [';'.join(','.join(str(v) for v in row) for row in m) for m in stack]
+
+    loop_str, dets_str = timed(lambda: [det(s) for s in strings])
+    loop_np, dets_np = timed(lambda: [np.linalg.det(m) for m in stack])
+    batch, dets = timed(lambda: vector_calc('det', stack))
+    assert np.allclose(dets, dets_np) and np.allclose(dets, dets_str)
+
+    print(f'det of {n:,} {k}x{k} matrices')
+    print(f'  vector.det loop  : {loop_str:8.3f} s')
+    print(f'  np.linalg loop   : {loop_np:8.3f} s')
+    print(f'  batched          : {batch:8.3f} s  ({loop_str / batch:,.0f}x / {loop_np / batch:,.0f}x)')
+
+    # Diagonally dominant stack so every matrix is invertible
+    dominant = stack + np.eye(k) * 10 * k
+    for oper in ('inv', 'matmul'):
+        loop, _ = timed(lambda: [np.linalg.inv(m) if oper == 'inv' else m @ m for m in dominant])
+        batch, _ = timed(lambda: vector_calc(oper, dominant, dominant))
+        print(f'{oper:>6}: loop {loop:8.3f} s  batched {batch:8.3f} s  ({loop / batch:,.0f}x)')
@@ -0,0 +1,77 @@
+"""
+File: bench_chunked.py
+Description:
+    Benchmarks chunked vector_calc operations over an on-disk dataset and
+    reports peak RSS, which should stay flat as the dataset grows, with an
+    output path or a temporary output.
+    Usage: python benchmarks/bench_chunked.py [size in GB, default 1] [directory]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from chunked import open_array, open_output, window
+from vector import vector_calc
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+def run_sampled(func):
+    """
+    Runs func while sampling RSS every 10 ms
+
+    :param func: function to run
+    :returns: (elapsed seconds, peak sampled RSS in MB)
+    """
+    peak, done = [current_rss_mb()], threading.Event()
+
+    def sample():
+        while not done.wait(0.01):
+            peak.append(current_rss_mb())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    return elapsed, max(peak)
+
+
+if __name__ == '__main__':
+    size_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    folder = sys.argv[2] if len(sys.argv) > 2 else tempfile.gettempdir()
+    rows = int(size_gb * 2**30 / 24)
+    path = os.path.join(folder, 'bench_vectors.npy')
+    out_path = os.path.join(folder, 'bench_norms.npy')
+
+    # Write the dataset chunk by chunk so the setup itself stays bounded
+    data = open_output(path, (rows, 3))
+    for start in range(0, rows, 1 << 20):
+        stop = min(start + (1 << 20), rows)
+        target = window(data, start, stop, 'r+')
+        target[...] = np.random.default_rng(start).random((stop - start, 3))
+        target.flush()
+        del target
+    del data
+
+    data = open_array(path)
+    print(f'dataset: {rows:,} vectors ({size_gb:.2f} GB), rss before: {current_rss_mb():.1f} MB')
+    # add without out writes to a temporary file, which must stay as flat as an explicit path
+    for oper, b, out in [('sum_norm', None, None), ('norm', None, out_path),
+                         ('dot', np.array([1.0, 2.0, 3.0]), out_path), ('add', np.ones(3), out_path),
+                         ('add', np.ones(3), None)]:
+        elapsed, peak = run_sampled(lambda: vector_calc(oper, data, b, out=out))
+        print(f'{oper:>9}: {elapsed:7.2f} s  {size_gb / elapsed:6.2f} GB/s  peak rss {peak:7.1f} MB')
+
+    os.remove(path)
+    os.remove(out_path)
@@ -0,0 +1,52 @@
+"""
+File: bench_downsample.py
+Description:
+    Benchmarks LTTB and per-pixel min / max decimation of dense series
+    and the drawing time they save in graph.py.
+    Usage: python benchmarks/bench_downsample.py [points, default 10000000] [pixels, default 750]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from downsample import downsample
+
+
+def draw_ms(xs, ys):
+    """
+    Time to draw one line on a fresh Agg figure
+    :param xs: x values
+    :param ys: y values
+    :returns: milliseconds
+    """
+    figure = Figure(figsize=(7.5, 4.3), dpi=100)
+    FigureCanvasAgg(figure)
+    start = time.perf_counter()
+    figure.add_subplot().plot(xs, ys)
+    figure.canvas.draw()
+    return (time.perf_counter() - start) * 1e3
+
+
+if __name__ == '__main__':
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 7
+    pixels = int(sys.argv[2]) if len(sys.argv) > 2 else 750
+    xs = np.linspace(0, 100, points)
+    ys = np.sin(xs) * np.cos(xs * 37) + np.random.default_rng(0).normal(0, 0.05, points)
+    ys[points // 3] = 10.0  # spike the decimation has to keep
+
+    print(f'{points:,} points -> {pixels} px')
+    print(f'{"method":>8} {"points out":>10} {"decimate ms":>12} {"draw ms":>9} {"peak kept":>10}')
+    for method in ('minmax', 'lttb'):
+        start = time.perf_counter()
+        dx, dy = downsample(xs, ys, pixels, method)
+        elapsed = (time.perf_counter() - start) * 1e3
+        print(f'{method:>8} {len(dx):>10,} {elapsed:12.1f} {draw_ms(dx, dy):9.1f} {str(np.nanmax(dy) == 10.0):>10}')
+    if points <= 10 ** 7:
+        print(f'{"none":>8} {points:>10,} {0:12.1f} {draw_ms(xs, ys):9.1f}')
@@ -0,0 +1,32 @@
+"""
+File: bench_export.py
+Description:
+    Measures headless export throughput (images per second) of export.py
+    for a single process and for a process pool.
+    Usage: python benchmarks/bench_export.py [graphs, default 200]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from export import export
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    exprs = [f'sin({m % 7 + 1}x) + x^2/{m + 10}; e^(-x^2/{m % 5 + 1})' for m in range(count)]
+    pools = sorted({1, os.cpu_count() or 1})
+
+    print(f'{count} graphs')
+    print(f'{"format":>7} {"workers":>8} {"seconds":>8} {"images/s":>9}')
+    with tempfile.TemporaryDirectory() as folder:
+        for fmt in ('png', 'svg'):
+            for workers in pools:
+                start = time.perf_counter()
+                paths = export(exprs, folder, fmt, workers)
+                elapsed = time.perf_counter() - start
+                assert all(paths)
+                print(f'{fmt:>7} {workers:>8} {elapsed:8.2f} {count / elapsed:9.1f}')
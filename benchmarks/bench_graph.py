@@ -0,0 +1,69 @@
+"""
+File: bench_graph.py
+Description:
+    Measures compile / sample / draw time in milliseconds of the graph.py
+    plotting engine for dense curves, on the non-interactive Agg backend,
+    the cost of each extra function in an overlay, 3D surface redraws
+    and root / extremum finding on dense grids.
+    Usage: python benchmarks/bench_graph.py [points, default 100000]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from graph import draw, draw_surface, axes_for, compile_exprs, compile_derivatives, find_roots, parse, SURFACE_SAMPLES
+
+
+if __name__ == '__main__':
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    figure = Figure(figsize=(7.5, 4.3), dpi=100)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+
+    print(f'{points:,} points per curve')
+    print(f'{"expression":>20} {"compile ms":>11} {"sample ms":>10} {"draw ms":>9}')
+    for expr in ['x^2 + 4x', 'sin(x)/x', 'tan(x)', '1/(x-1)', 'e^(-x^2)*cos(20x)']:
+        draw(ax, expr, n=points)  # warm up
+        timings = draw(ax, expr, n=points)
+        print(f'{expr:>20} {timings["compile"]:11.2f} {timings["sample"]:10.2f} {timings["draw"]:9.2f}')
+
+    # Overlays: one batched evaluator over a shared grid, cost per extra function
+    grid = np.linspace(-10, 10, points)
+    family = [f'sin(x)*e^(-x^2/{m + 1}) + {m}x' for m in range(10)]
+    print(f'\n{"functions":>10} {"sample ms":>10} {"per function":>13}')
+    for count in (1, 2, 5, 10):
+        func = compile_exprs(family[:count])
+        func(grid)
+        start = time.perf_counter()
+        func(grid)
+        elapsed = (time.perf_counter() - start) * 1e3
+        print(f'{count:>10} {elapsed:10.2f} {elapsed / count:13.2f}')
+
+    # Roots / extrema: sign changes on the sampled grid polished all at once
+    print(f'\n{"roots":>26} {"found":>7} {"extrema":>8} {"ms":>8}')
+    for expr in ['sin(1000x)', 'x*cos(x^2)', 'tan(x) - x']:
+        func = compile_derivatives(parse(expr))
+        xs = np.linspace(-10, 10, max(points, 2 * 10 ** 5))
+        start = time.perf_counter()
+        found = find_roots(func, xs)
+        elapsed = (time.perf_counter() - start) * 1e3
+        extrema = len(found['minima']) + len(found['maxima'])
+        print(f'{expr:>26} {len(found["roots"]):>7} {extrema:>8} {elapsed:8.2f}')
+
+    # Surfaces: full mesh evaluated in one call, rendered at viewport resolution
+    ax3d = axes_for(ax, True)
+    print(f'\n{"surface":>26} {"mesh":>9} {"sample ms":>10} {"draw ms":>9} {"redraw ms":>10}')
+    for expr in ['sin(sqrt(x^2+y^2))', 'x^2 - y^2', 'e^(-(x^2+y^2)/20)*cos(x)']:
+        timings = draw_surface(ax3d, expr)
+        start = time.perf_counter()
+        figure.canvas.draw()  # redraw, as when rotating the view
+        redraw = (time.perf_counter() - start) * 1e3
+        mesh = f'{SURFACE_SAMPLES}x{SURFACE_SAMPLES}'
+        print(f'{expr:>26} {mesh:>9} {timings["sample"]:10.2f} {timings["draw"]:9.2f} {redraw:10.2f}')
@@ -0,0 +1,37 @@
+"""
+File: bench_pages.py
+Description:
+    Measures page-switch latency of the GUI (main.py) with pages retained
+    (built on first visit, then hidden / shown) and rebuilt on every switch
+    (the previous behavior). Needs a display.
+    Usage: python benchmarks/bench_pages.py [rounds, default 20]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import profiling
+import main
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    switches = [(main.calc_menu, main.calc_page), (main.vector_menu, main.vector_page),
+                (main.graph_menu, main.graphs_page), (main.wp_menu, main.wp_page)]
+
+    print(f'{rounds} rounds over {len(switches)} pages')
+    print(f'{"pages":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for retain in (False, True):
+        main.RETAIN_PAGES = retain
+        main.delete_frames(main.main_frame)
+        main.pages.clear()
+        profiling.reset()
+        for _ in range(rounds):
+            for menu, page in switches:
+                main.indicate(menu, page)
+                main.root.update()
+        stage = profiling.report()['stages']['main.page_switch']
+        print(f'{"retained" if retain else "rebuilt":>9} {stage["p50_ms"]:8.2f} {stage["p95_ms"]:8.2f} '
+              f'{stage["p99_ms"]:8.2f}')
+    main.root.destroy()
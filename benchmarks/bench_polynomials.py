@@ -0,0 +1,65 @@
+"""
+File: bench_polynomials.py
+Description:
+    Times calculate() on random polynomials of growing degree with the
+    polynomial fast path (polynomials.py) and through sympy. sympy is
+    skipped above its max degree, where it takes minutes or fails to parse.
+    Usage: python benchmarks/bench_polynomials.py [max degree, default 10000] [sympy max degree, default 100]
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import polynomials
+from calculator import calculate
+
+
+def random_poly(degree, rng):
+    """
+    :param degree: degree
+    :param rng: random.Random
+    :returns: dense polynomial text, e.g. 3x^4 - 2x^3 + ...
+    """
+    return ' + '.join(f'{rng.randint(1, 9)}x^{k}' for k in range(degree, 0, -1)) + ' + 1'
+
+
+def timed(expr, conditions):
+    """
+    :returns: (ms, result) of one calculate call
+    """
+    start = time.perf_counter()
+    result = calculate(expr, conditions)
+    return (time.perf_counter() - start) * 1000, result
+
+
+if __name__ == '__main__':
+    max_degree = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sympy_degree = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = random.Random(0)
+    no_conditions = ['', '', '', '', '', '']
+    operations = [('d/dx', '{}', no_conditions), ('∫', '{}', no_conditions),
+                  ('∫ 0..1', '{}', ['', '', '0', '1', '', '']), ('lim x->1/2', '{}', ['', '1/2', '', '', '', '']),
+                  ('d/dx', '({0})({0})', no_conditions)]
+    ops = {'∫ 0..1': '∫', 'lim x->1/2': 'lim'}
+
+    print(f'{"degree":>7} {"operation":>14} {"fast ms":>10} {"sympy ms":>10}')
+    degree = 10
+    while degree <= max_degree:
+        poly = random_poly(degree, rng)
+        for name, shape, conditions in operations:
+            expr = f'{ops.get(name, name)}[{shape.format(poly)}]'
+            label = name + (' (a*a)' if shape != '{}' else '')
+            polynomials.settings['enabled'] = True
+            fast, result = timed(expr, conditions)
+            slow = ''
+            if degree <= sympy_degree:
+                polynomials.settings['enabled'] = False
+                ms, expected = timed(expr, conditions)
+                assert name.startswith('lim') or label.endswith('(a*a)') or expected == result, (name, degree)
+                slow = f'{ms:10.1f}'
+            print(f'{degree:>7} {label:>14} {fast:10.1f} {slow:>10}')
+        degree *= 10
+    polynomials.settings['enabled'] = True
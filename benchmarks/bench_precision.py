@@ -0,0 +1,53 @@
+"""
+File: bench_precision.py
+Description:
+    Benchmarks the speed / accuracy tradeoff of each precision setting
+    for the numeric kernels shared by calculator.py and vector.py.
+    Usage: python benchmarks/bench_precision.py [matrix size, default 12]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import sympy as smp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import precision
+
+
+def timed(func, repeat):
+    """
+    Average seconds per call of func
+    :param func: function without arguments
+    :param repeat: number of calls
+    :returns: (seconds per call, last result)
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    rng = np.random.default_rng(0)
+
+    # Integer matrix with nearly dependent rows, exact determinant from sympy as the reference
+    matrix = (rng.integers(-9, 10, (size, size)) + np.eye(size, dtype=int) * 100).tolist()
+    matrix[-1] = [v + 1 for v in matrix[0]]
+    exact_det = smp.Matrix(matrix).det(method='bareiss')
+    vector = rng.integers(-10 ** 6, 10 ** 6, 10 ** 4).tolist()
+    exact_norm = smp.sqrt(sum(smp.Integer(v) ** 2 for v in vector))
+
+    print(f'{"mode":>8} {"det us":>10} {"det rel err":>12} {"norm us":>10} {"norm rel err":>12}')
+    for mode, digits in [('float32', None), ('float64', None), ('mp', 30), ('mp', 100)]:
+        precision.set_precision(mode, digits)
+        m, vec = precision.to_array(matrix), precision.to_array(vector)
+        det_time, det = timed(lambda: precision.det(m), 20)
+        norm_time, norm = timed(lambda: precision.norm(vec), 20)
+        det_err = abs((smp.Float(str(det), 120) - exact_det) / exact_det)
+        norm_err = abs((smp.Float(str(norm), 120) - exact_norm) / exact_norm).evalf(5)
+        name = mode if digits is None else f'mp{digits}'
+        print(f'{name:>8} {det_time * 1e6:10.1f} {float(det_err):12.2e} {norm_time * 1e6:10.1f} {float(norm_err):12.2e}')
+    precision.set_precision('float64')
@@ -0,0 +1,45 @@
+"""
+File: bench_series.py
+Description:
+    Taylor / Laurent expansions of composite trig / exp expressions with
+    sparse power series rings (expansions.py) at a high order, a cached
+    lower order request, and both methods at a low order (smp.series takes
+    seconds at order 12 and minutes past 20).
+    Usage: python benchmarks/bench_series.py [order, default 200] [low order, default 12]
+"""
+
+import os
+import sys
+import time
+import sympy as smp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import expansions
+
+x = smp.Symbol('x')
+cases = [smp.exp(smp.sin(x)) * smp.cos(x), smp.tan(smp.sin(x)) + smp.cos(x)**2, 1 / smp.sin(x),
+         smp.exp(x) / smp.sin(x)**3, smp.log(1 + smp.sin(x)) * smp.atan(x)]
+
+
+if __name__ == '__main__':
+    order = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    low = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    print(f'{"expression":>32} {f"ring({order}) s":>12} {"cached ms":>10} {f"ring({low}) ms":>12} {f"series({low}) s":>14}')
+    for expr in cases:
+        start = time.perf_counter()
+        expansions.expand(expr, x, 0, order)
+        ring = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expansions.expand(expr, x, 0, order // 2)
+        cached = (time.perf_counter() - start) * 1000
+
+        expansions.expansions.clear()
+        start = time.perf_counter()
+        expansions.expand(expr, x, 0, low)
+        ring_low = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        smp.series(expr, x, 0, low)
+        series = time.perf_counter() - start
+        print(f'{str(expr):>32} {ring:12.2f} {cached:10.2f} {ring_low:12.1f} {series:14.2f}')
@@ -0,0 +1,47 @@
+"""
+File: bench_simplify.py
+Description:
+    Latency of derivative / partial derivative / integral requests under each
+    simplification tier (simplification.py), with 'full' standing in for the
+    previous unconditional smp.simplify (derivatives and integrals, which
+    don't simplify by default, are set to the tier too). Reports p50 / max
+    ms and total count_ops of the results.
+    Usage: python benchmarks/bench_simplify.py [seconds budget, default 0.5]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import sympy as smp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import simplification
+from calculator import inside_expr, clean
+
+cases = [('∂/∂x', 'x^2y + sin(xy)', 'x'), ('∂/∂x', '(x^2 - y^2)/(x - y)', 'x'),
+         ('∂/∂x', '(x + y)^6/(x^2 + y^2 + 1)', 'x'), ('∂/∂x', 'sin(x)^2cos(y) + cos(x)^2cos(y)', 'y'),
+         ('∂/∂x', 'exp(x^2 + y^2)/(x^2 + y^2)^3', 'y'), ('∂/∂x', 'atan(y/x)', 'x'),
+         ('d/dx', 'sin(x)cos(x)', 'x'), ('d/dx', 'exp(x^2)sin(x)^3/(1 + x^2)^3', 'x'),
+         ('d/dx', 'sqrt(x^2 + 1)/(x + 1)^4', 'x'), ('d/dx', '(sin(x) + cos(y) + tan(z) + x)^20', 'x'),
+         ('∫', '1/(x^2 - 1)', 'x'), ('∫', 'x^3exp(x)', 'x')]
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    print(f'{"tier":>6} {"p50 ms":>8} {"max ms":>8} {"ops":>6}')
+    for tier in ('none', 'cheap', 'full'):
+        simplification.set_policy(tier, seconds)
+        simplification.set_policy(tier, site='derivative')
+        simplification.set_policy(tier, site='integral')
+        simplification.results.clear()
+        times, ops = [], 0
+        for op, expr, wrt in cases:
+            start = time.perf_counter()
+            result = inside_expr(op, clean(expr.replace(' ', '')), [wrt, '', '', '', '', ''])
+            times.append((time.perf_counter() - start) * 1000)
+            ops += smp.count_ops(result) if result is not None else 0
+        print(f'{tier:>6} {np.median(times):8.1f} {max(times):8.1f} {ops:6d}')
+    simplification.set_policy('cheap', 0.5)
+    simplification.set_policy('none', site='derivative')
+    simplification.set_policy('none', site='integral')
@@ -0,0 +1,66 @@
+"""
+File: bench_soak.py
+Description:
+    Soak test of the memory budget (memory.py): runs a long mix of calculate /
+    vector_calc requests with ever-changing inputs and asserts that RSS stays flat
+    after warm up.
+    Usage: python benchmarks/bench_soak.py [requests, default 1000000] [allowed growth MB, default 32]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import memory
+from calculator import calculate
+from vector import vector_calc
+
+
+no_conditions = ['', '', '', '', '', '']
+x_conditions = ['', 'x', '', '', '', '']
+
+
+def request(n):
+    """
+    One request of the mix, inputs change with n so caches keep filling
+    :param n: request number
+    """
+    kind = n % 5
+    if kind == 0:
+        calculate(f'{n}*x^2 + {n % 97}*x - {n % 13}', no_conditions)
+    elif kind == 1:
+        calculate(f'd/dx[sin({n % 211}x)*x^{n % 7 + 1}]', x_conditions)
+    elif kind == 2:
+        calculate(f'({n} + 3)/{n % 89 + 1}', no_conditions)
+    elif kind == 3:
+        vector_calc('dot', f'[{n}, {n % 17}, 3]', f'[1, {n % 5}, {n}]')
+    else:
+        vector_calc('cross', f'[{n % 41}, 2, {n}]', f'[{n}, 1, {n % 3}]')
+
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    allowed = float(sys.argv[2]) if len(sys.argv) > 2 else 32.0
+    samples = 20
+    every = max(total // samples, 1)
+    warmup = max(total // 10, 1)
+
+    print(f'{total} requests, budget {memory.settings}')
+    print(f'{"requests":>10} {"seconds":>8} {"rss MB":>8} {"sympy cache":>12} {"clears":>7}')
+    start = time.perf_counter()
+    baseline, peak = None, 0.0
+    for n in range(1, total + 1):
+        request(n)
+        if n == warmup:
+            baseline = memory.rss_mb()
+        if n % every == 0 or n == total:
+            use = memory.usage()
+            if baseline is not None:
+                peak = max(peak, use['rss_mb'])
+            print(f'{n:>10} {time.perf_counter() - start:8.1f} {use["rss_mb"]:8.1f} '
+                  f'{use["sympy_cache_entries"]:>12} {use["clears"]:>7}')
+
+    growth = peak - baseline
+    print(f'RSS growth after warm up: {growth:.1f} MB (allowed {allowed} MB)')
+    assert growth <= allowed, f'memory grew {growth:.1f} MB over {total} requests'
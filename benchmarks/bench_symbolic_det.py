@@ -0,0 +1,47 @@
+"""
+File: bench_symbolic_det.py
+Description:
+    Times the exact determinant of a k x k matrix of random polynomials in x
+    with fraction-free (Bareiss) elimination over ZZ[x] (vector.exact_det)
+    against sympy's Matrix.det on the same matrix.
+    Usage: python benchmarks/bench_symbolic_det.py [k, default 30] [seed, default 0]
+"""
+
+import os
+import sys
+import time
+import random
+import sympy as smp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from vector import vector_calc, exact_det
+
+
+def random_matrix(k, seed):
+    """
+    :param k: size
+    :param seed: random seed
+    :returns: k x k matrix expression with polynomial entries of degree <= 2
+    """
+    rng = random.Random(seed)
+    entry = lambda: f'{rng.randint(-5, 5)}x^2 + {rng.randint(-5, 5)}x + {rng.randint(-5, 5)}'
+    return '[' + '; '.join(', '.join(entry() for _ in range(k)) for _ in range(k)) + ']'
+
+
+if __name__ == '__main__':
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    expr = random_matrix(k, seed)
+
+    start = time.perf_counter()
+    result = vector_calc('det', expr)
+    print(f'vector_calc det {k}x{k}: {time.perf_counter() - start:.2f} s ({len(result)} chars)')
+
+    # Sympy's default (Bareiss over expressions) only at sizes where it finishes
+    if k <= 10:
+        from vector import str_to_matrix
+        m = str_to_matrix(expr)
+        start = time.perf_counter()
+        expected = m.det()
+        print(f'Matrix.det {k}x{k}: {time.perf_counter() - start:.2f} s')
+        assert smp.expand(expected - exact_det(m)) == 0
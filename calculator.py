@@ -6,12 +6,23 @@ Description:
 """
 
 import sympy as smp
+import precision
+import profiling
+import capture
+import memory
+import equations
+import odes
+import session
+import polynomials
+import arithmetic
+import simplification
+import expansions
 
 
 # Symbolic assignments (much easier for operational tasks)
 x, y, z, t, n = smp.symbols("x y z t n")
 poss_vars = ['x', 'y', 'z']
-operators = ['+', '-', '*', '/', '^']
+operators = ['+', '-', '*', '/', '^', '=', ';']
 special = ['π', 'e', 'sin', 'cos', 'tan', 'sec', 'csc', 'cot', 'ln', 'log']
 
 # ---------------- Functions ----------------
@@ -21,18 +32,18 @@ def derivative(expr, wrt):
     Calculates derivative of an expression
     :param expr: expression
     :param wrt: with respect to
-    :returns: evaluated derivative
+    :returns: evaluated derivative (simplified by the derivative site's tier)
     """
-    return smp.diff(expr, wrt)
+    return simplification.simplify(smp.diff(expr, wrt), site='derivative')
 
 def partial_deriv(expr, wrt):
     """
     Calculates partial derivative of an expression
     :param expr: expression
     :param wrt: with respect to
-    :returns: simplified evaluated partial derivative
+    :returns: evaluated partial derivative (simplified by the current policy)
     """
-    return smp.simplify((smp.diff(expr, wrt)))
+    return simplification.simplify(smp.diff(expr, wrt))
 
 def integral(expr, wrt, r1, r2):
     """
@@ -41,14 +52,14 @@ def integral(expr, wrt, r1, r2):
     :param wrt: with respect to
     :param r1: left bound
     :param r2: right bound
-    :returns: evaluated integral
+    :returns: evaluated integral (simplified by the integral site's tier)
     """
     if r1 == '' and r2 == '':  
         # No bounds
-        return smp.integrate(expr, wrt)
+        return simplification.simplify(smp.integrate(expr, wrt), site='integral')
     else:
         # Numeric or infinite bounds
-        return smp.integrate(expr, (wrt, r1, r2))
+        return simplification.simplify(smp.integrate(expr, (wrt, r1, r2)), site='integral')
 
 def limit(expr, var, toward, side=None):
     """
@@ -74,6 +85,46 @@ def series(expr, i, n):
     """
     return smp.Sum(expr, i, n)
 
+def solve_equations(expr, wrt=None):
+    """
+    Solves an equation or system of equations separated by ';'
+    (symbolically within a time budget, otherwise numerically)
+
+    :param expr: expression, e.g. x^2 + y^2 = 4; y = x
+    :param wrt: solve for this variable only (None: all of x, y, z)
+    :returns: solutions text, e.g. x = 1, y = 2; x = -1, y = -2
+    """
+    solutions, method = equations.solve(expr, wrt)
+    profiling.count('calculate.solve ' + method)
+    return equations.format_solutions(solutions)
+
+def ode(expr, t_end=None):
+    """
+    Solves ordinary differential equations in x(t), y(t), z(t) with
+    initial conditions separated by ';' (closed form when sympy finds
+    one, otherwise numerically)
+
+    :param expr: expression, e.g. y'' + y = 0; y(0) = 1; y'(0) = 0
+    :param t_end: t the numeric solution is evaluated at
+    :returns: solution text, e.g. y(t) = cos(t) or y(10) = -0.839071529076
+    """
+    solution, method = odes.solve_ode(expr, t_end or None)
+    profiling.count('calculate.ode ' + method)
+    return odes.format_solution(solution)
+
+def taylor(expr, wrt, point, order):
+    """
+    Taylor / Laurent expansion of an expression (sparse power series
+    arithmetic, cached per expression and point)
+
+    :param expr: expression
+    :param wrt: variable
+    :param point: point expanded around ('': 0)
+    :param order: powers below it are kept ('': expansions.ORDER)
+    :returns: expansion text, e.g. x - x**3/6 + O(x**5)
+    """
+    return expansions.expansion(expr, wrt, point, order)
+
 def natural_log(expr):
     """
     Calculates natural log of an expression
@@ -110,7 +161,11 @@ def regular(expr):
     expr = expr.replace('csc', 'smp.csc')
     expr = expr.replace('cot', 'smp.cot')
     expr = expr.replace('sec', 'smp.sec')
-    result = eval(expr)
+    result = eval(expr, globals(), session.names)
+
+    # Numeric results in the shared precision setting when enabled
+    if precision.settings['approximate']:
+        result = precision.approximate(result)
     return result
 
 # ---------------- Clean up / Inside-eval ----------------
@@ -170,6 +225,20 @@ def inside_expr(operation, expr, c):
         wrt = z
 
     try:
+        # Polynomials in one variable run on their coefficients (regular
+        # results keep sympy's numbers when approximating)
+        if isinstance(expr, str) and not (operation == 'regular' and precision.settings['approximate']):
+            try:
+                fast = polynomials.calculate(operation, expr, wrt, c)
+            except Exception:
+                fast = None  # anything the fast path can't handle goes to sympy
+            if fast is not None:
+                profiling.count('calculate.polynomial ' + operation)
+                return fast
+
+        # User definitions (f(x) = ...) are inlined into symbolic operations
+        if operation not in ('regular', 'solve', 'ode') and isinstance(expr, str) and session.uses(expr):
+            expr = session.inline(expr)
         if operation == 'd/dx':
             return derivative(expr, wrt)
         if operation == '∫':
@@ -180,6 +249,12 @@ def inside_expr(operation, expr, c):
             return partial_deriv(expr, wrt)
         if operation == 'Σ':
             return series(expr, c[4], c[5])
+        if operation == 'solve':
+            return solve_equations(expr, wrt if c[0] in poss_vars else None)
+        if operation == 'ode':
+            return ode(expr, c[3])  # numeric solutions are reported at the upper ∫ bound
+        if operation == 'taylor':
+            return taylor(expr, wrt, c[1], c[5])  # around the lim point, to the Σ n order
         if operation == 'regular':
             return regular(expr)
     except:
@@ -213,6 +288,7 @@ def post_clean(expr):
 
 # ---------------- Main Calculation ----------------
 
+@capture.captured('calculate')
 def calculate(expr, conditions):
     """
     Calculates symbolic expressions
@@ -222,40 +298,79 @@ def calculate(expr, conditions):
     :returns: finalized expression
     """
 
-    expr = expr.replace(' ', '')
-    table = expr.maketrans('[', ']')
-    expr = expr.translate(table).split(']')
-    poss_oper = ['d/dx', '∫', 'lim', '∂/∂x', 'Σ']
-    for start in range(len(expr)):
-    
-        # 0: derivative, 1: integral, 2: limit, 3: partial_deriv, 4: series
-        if expr[start] in poss_oper:
-            new_expr = ''
-            operation = expr[start]
-            for calc in range(start+1, len(expr)):
-                if expr[calc] == '':
-                    break
-                else:
-                    new_expr += expr[calc]
-            new_expr = clean(new_expr)
+    memory.tick()
+
+    # Stage timings: clean, eval (regular) / operation, str, post_clean
+    with profiling.request('calculate', 'calculate.split'):
+        expr = expr.replace(' ', '')
 
-            # If clean doesn't pass, syntax error
-            if new_expr == None: 
+        # f(x) = ... / c = ... defines a name for later requests
+        if session.is_definition(expr):
+            try:
+                return post_clean(session.describe(session.define(expr)))
+            except (ValueError, SyntaxError, TypeError, smp.SympifyError):
                 return 'ERROR'
-            
-            new_expr = inside_expr(operation, new_expr, conditions)
-            new_expr = str(new_expr)
-            new_expr = post_clean(new_expr)
-            return new_expr
-        else:
-            # Basic calculations
-            new_expr = str(expr[start])
-            new_expr = clean(new_expr)
-            new_expr = inside_expr('regular', new_expr, conditions)
-            new_expr = str(new_expr)
-            new_expr = post_clean(new_expr)
-            return new_expr
-    return None
+
+        # Pure number expressions are evaluated exactly, without clean or sympy
+        if '[' not in expr:
+            t0 = profiling.now()
+            try:
+                value = arithmetic.evaluate(expr)
+            except Exception:
+                value = None  # anything the exact path can't handle goes to sympy
+            if value is not None:
+                profiling.count('calculate.exact')
+                if precision.settings['approximate']:
+                    value = precision.approximate(value)
+                value = str(value)  # numbers print without '**' / pi / E, no post_clean
+                profiling.lap('calculate.exact', t0)
+                return value
+
+        table = expr.maketrans('[', ']')
+        expr = expr.translate(table).split(']')
+        poss_oper = ['d/dx', '∫', 'lim', '∂/∂x', 'Σ', 'solve', 'ode', 'taylor']
+        for start in range(len(expr)):
+        
+            # 0: derivative, 1: integral, 2: limit, 3: partial_deriv, 4: series, 5: solve, 6: ode, 7: taylor
+            if expr[start] in poss_oper:
+                new_expr = ''
+                operation = expr[start]
+                for calc in range(start+1, len(expr)):
+                    if expr[calc] == '':
+                        break
+                    else:
+                        new_expr += expr[calc]
+                t0 = profiling.now()
+                new_expr = clean(new_expr)
+                t0 = profiling.lap('calculate.clean', t0)
+
+                # If clean doesn't pass, syntax error
+                if new_expr == None: 
+                    profiling.count('calculate.errors')
+                    return 'ERROR'
+                
+                new_expr = inside_expr(operation, new_expr, conditions)
+                t0 = profiling.lap('calculate.operation', t0)
+                profiling.count('calculate.operation ' + operation)
+                new_expr = str(new_expr)
+                t0 = profiling.lap('calculate.str', t0)
+                new_expr = post_clean(new_expr)
+                profiling.lap('calculate.post_clean', t0)
+                return new_expr
+            else:
+                # Basic calculations
+                new_expr = str(expr[start])
+                t0 = profiling.now()
+                new_expr = clean(new_expr)
+                t0 = profiling.lap('calculate.clean', t0)
+                new_expr = inside_expr('regular', new_expr, conditions)
+                t0 = profiling.lap('calculate.eval', t0)
+                new_expr = str(new_expr)
+                t0 = profiling.lap('calculate.str', t0)
+                new_expr = post_clean(new_expr)
+                profiling.lap('calculate.post_clean', t0)
+                return new_expr
+        return None
 
 
 # Test:
@@ -0,0 +1,332 @@
+"""
+File: capture.py
+Description:
+    Opt-in workload capture of calculate / vector_calc requests (operation, inputs,
+    latency, result) into compact rotating JSON lines files, and a replay tool that
+    re-runs a capture against the current engine, at the recorded or maximum rate,
+    and reports the latency distribution and changed results.
+    Usage: python capture.py captures/workload.jsonl --rate max
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from functools import wraps
+import numpy as np
+
+
+# Arrays up to this many elements are stored in full, larger ones are skipped (inputs)
+# or reduced to shape / checksum (results)
+MAX_ARRAY = 10_000
+
+# enabled: record requests, path: capture file, max_bytes: size before rotating,
+# backups: rotated files kept (path.1 is the newest)
+settings = {'enabled': False, 'path': os.path.join('captures', 'workload.jsonl'),
+            'max_bytes': 8 * 2**20, 'backups': 4}
+
+lock = threading.Lock()
+local = threading.local()  # nested requests (vector_calc inside calculate) are not recorded twice
+stats = {'recorded': 0, 'skipped': 0}
+
+
+# ------------------ Encoding ------------------
+
+class Unrecordable(Exception):
+    """Input that can't be stored compactly (large arrays, objects)"""
+
+def encode(value):
+    """
+    JSON friendly form of a request input
+
+    :param value: argument
+    :returns: encoded argument
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): encode(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        if value.size > MAX_ARRAY:
+            raise Unrecordable(f'array of {value.size} elements')
+        return {'nd': value.tolist(), 'dtype': str(value.dtype)}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise Unrecordable(type(value).__name__)
+
+def decode(value):
+    """
+    Inverse of encode (tuples come back as lists)
+
+    :param value: encoded argument
+    :returns: argument
+    """
+    if isinstance(value, dict) and 'nd' in value:
+        return np.array(value['nd'], dtype=value['dtype'])
+    if isinstance(value, dict):
+        return {key: decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    return value
+
+def fingerprint(result):
+    """
+    Comparable summary of a result
+
+    :param result: return value of a request
+    :returns: string, small array, or {'shape', 'sum'} of a large array
+    """
+    if isinstance(result, np.ndarray):
+        if result.size <= MAX_ARRAY:
+            return {'nd': np.asarray(result).tolist(), 'dtype': str(result.dtype)}
+        return {'shape': list(result.shape), 'sum': float(np.nansum(result, dtype=np.float64))}
+    if callable(result):
+        return 'callable'
+    return str(result)
+
+
+# ------------------ Recording ------------------
+
+def write(entry):
+    """
+    Appends one request to the capture file, rotating it when full
+    :param entry: request dict
+    """
+    line = json.dumps(entry, separators=(',', ':'), default=str) + '\n'
+    path = settings['path']
+    with lock:
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) + len(line) > settings['max_bytes']:
+            rotate(path)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+        stats['recorded'] += 1
+
+def rotate(path):
+    """
+    Shifts path -> path.1 -> path.2 ... dropping the oldest backup
+    :param path: capture file
+    """
+    backups = settings['backups']
+    if backups <= 0:
+        os.remove(path)
+        return
+    for n in range(backups - 1, 0, -1):
+        if os.path.exists(f'{path}.{n}'):
+            os.replace(f'{path}.{n}', f'{path}.{n + 1}')
+    os.replace(path, f'{path}.1')
+
+def captured(op):
+    """
+    Decorator recording every call of an entry point while capture is enabled
+
+    :param op: operation name used by replay to find the function
+    :returns: decorator
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not settings['enabled'] or getattr(local, 'active', False):
+                return func(*args, **kwargs)
+
+            try:
+                entry = {'ts': time.time(), 'op': op, 'args': encode(args), 'kw': encode(kwargs)}
+            except Unrecordable:
+                stats['skipped'] += 1
+                return func(*args, **kwargs)
+
+            local.active = True
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                entry['res'] = fingerprint(result)
+                return result
+            except Exception as error:
+                entry['err'] = type(error).__name__
+                raise
+            finally:
+                entry['ms'] = (time.perf_counter() - start) * 1e3
+                local.active = False
+                write(entry)
+        return wrapper
+    return decorate
+
+def set_capture(enabled=None, path=None, max_bytes=None, backups=None):
+    """
+    Updates capture settings (None keeps current value)
+
+    :param enabled: record requests
+    :param path: capture file
+    :param max_bytes: size of one file before rotating
+    :param backups: rotated files kept
+    :returns: updated settings
+    """
+    for key, value in (('enabled', enabled), ('path', path), ('max_bytes', max_bytes), ('backups', backups)):
+        if value is not None:
+            settings[key] = value
+    return dict(settings)
+
+
+# ------------------ Replay ------------------
+
+def load(path):
+    """
+    Reads a capture with its rotated backups, oldest first
+
+    :param path: capture file (path.1, path.2 ... are included)
+    :returns: list of request dicts
+    """
+    files = [path]
+    n = 1
+    while os.path.exists(f'{path}.{n}'):
+        files.append(f'{path}.{n}')
+        n += 1
+
+    entries = []
+    for name in reversed(files):
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as f:
+            entries += [json.loads(line) for line in f if line.strip()]
+    return entries
+
+def engines():
+    """
+    Entry points a capture can name (imported lazily, they import this module)
+    :returns: {op: function}
+    """
+    from calculator import calculate
+    from vector import vector_calc
+    return {'calculate': calculate, 'vector_calc': vector_calc}
+
+def same(recorded, replayed):
+    """
+    Compares fingerprints, numbers within a relative 1e-9
+
+    :param recorded: fingerprint from the capture
+    :param replayed: fingerprint from the replay (JSON round tripped)
+    :returns: bool
+    """
+    if recorded == replayed:
+        return True
+    if isinstance(recorded, dict) and isinstance(replayed, dict):
+        if 'nd' in recorded and 'nd' in replayed:
+            a, b = np.array(recorded['nd']), np.array(replayed['nd'])
+            return a.shape == b.shape and np.allclose(a, b, rtol=1e-9, equal_nan=True)
+        if 'sum' in recorded and 'sum' in replayed:
+            return recorded['shape'] == replayed['shape'] and np.isclose(recorded['sum'], replayed['sum'], rtol=1e-9)
+        return False
+    try:
+        return bool(np.isclose(complex(recorded), complex(replayed), rtol=1e-9))
+    except (TypeError, ValueError):
+        return False
+
+def percentiles(ms):
+    """
+    :param ms: latencies in ms
+    :returns: {'p50', 'p95', 'p99', 'max'}
+    """
+    if not len(ms):
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'max': float(np.max(ms))}
+
+def replay(path, rate='max', speed=1.0):
+    """
+    Re-runs a capture against the current engine
+
+    :param path: capture file
+    :param rate: 'recorded' keeps the original spacing of requests (divided by speed), 'max' runs back to back
+    :param speed: speed up factor of the recorded rate
+    :returns: {'requests', 'recorded': percentiles, 'replayed': percentiles, 'by_op', 'diffs', 'seconds'}
+    """
+    entries = load(path)
+    functions = engines()
+    recorded, replayed, by_op, diffs = [], [], {}, []
+
+    enabled, settings['enabled'] = settings['enabled'], False  # don't capture the replay
+    begin = time.perf_counter()
+    try:
+        for n, entry in enumerate(entries):
+            if rate == 'recorded':
+                wait = (entry['ts'] - entries[0]['ts']) / speed - (time.perf_counter() - begin)
+                if wait > 0:
+                    time.sleep(wait)
+
+            func = functions[entry['op']]
+            result, error = None, None
+            start = time.perf_counter()
+            try:
+                result = func(*decode(entry['args']), **decode(entry['kw']))
+            except Exception as e:
+                error = type(e).__name__
+            ms = (time.perf_counter() - start) * 1e3
+
+            recorded.append(entry['ms'])
+            replayed.append(ms)
+            by_op.setdefault(entry['op'], []).append(ms)
+
+            if error or 'err' in entry:
+                if error != entry.get('err'):
+                    diffs.append({'index': n, 'op': entry['op'], 'args': entry['args'],
+                                  'recorded': entry.get('err', entry.get('res')), 'replayed': error})
+                continue
+            new = json.loads(json.dumps(fingerprint(result), default=str))
+            if not same(entry.get('res'), new):
+                diffs.append({'index': n, 'op': entry['op'], 'args': entry['args'],
+                              'recorded': entry.get('res'), 'replayed': new})
+    finally:
+        settings['enabled'] = enabled
+
+    return {'requests': len(entries), 'recorded': percentiles(recorded), 'replayed': percentiles(replayed),
+            'by_op': {op: percentiles(ms) for op, ms in by_op.items()},
+            'diffs': diffs, 'seconds': time.perf_counter() - begin}
+
+def format_replay(result, show=10):
+    """
+    Human readable replay report
+
+    :param result: output of replay
+    :param show: changed results listed
+    :returns: string
+    """
+    lines = [f'{result["requests"]} requests replayed in {result["seconds"]:.2f} s',
+             f'{"latency ms":<16} {"p50":>9} {"p95":>9} {"p99":>9} {"max":>9}']
+    rows = [('recorded', result['recorded']), ('replayed', result['replayed'])]
+    rows += [(f'  {op}', stats) for op, stats in sorted(result['by_op'].items())]
+    for name, p in rows:
+        lines.append(f'{name:<16} {p["p50"]:9.3f} {p["p95"]:9.3f} {p["p99"]:9.3f} {p["max"]:9.3f}')
+    lines.append(f'{len(result["diffs"])} changed results')
+    for diff in result['diffs'][:show]:
+        lines.append(f'  #{diff["index"]} {diff["op"]}{tuple(diff["args"])}: {diff["recorded"]} -> {diff["replayed"]}')
+    return '\n'.join(lines)
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: argument list (defaults to sys.argv)
+    :returns: exit code (1 when results changed)
+    """
+    parser = argparse.ArgumentParser(description='Replay a captured calculate / vector_calc workload')
+    parser.add_argument('capture', nargs='?', default=settings['path'], help='capture file')
+    parser.add_argument('--rate', default='max', choices=['max', 'recorded'])
+    parser.add_argument('--speed', type=float, default=1.0, help='speed up of the recorded rate')
+    parser.add_argument('--show', type=int, default=10, help='changed results listed')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.capture):
+        parser.error(f'no capture at {args.capture}')
+    result = replay(args.capture, args.rate, args.speed)
+    print(format_replay(result, args.show))
+    return 1 if result['diffs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
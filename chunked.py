@@ -0,0 +1,180 @@
+"""
+File: chunked.py
+Description:
+    Implements chunked vector operations over memory-mapped (on-disk) datasets
+    for vector_calc in vector.py. Inputs and outputs are mapped one fixed-size
+    window at a time so memory stays bounded regardless of dataset size.
+"""
+
+import os
+import tempfile
+import weakref
+import numpy as np
+
+
+# Rows per chunk (64k rows of 3 doubles ~ 1.5 MB per window)
+CHUNK_ROWS = 1 << 16
+
+row_ops = ['norm', 'dot', 'add', 'sub', 'cross', 'projection']
+reductions = ['sum', 'sum_norm', 'max_norm']
+
+
+# ------------------ Opening / Windows ------------------
+
+def open_array(path, dtype='float64', dim=3):
+    """
+    Opens an on-disk dataset read-only without loading it
+
+    :param path: .npy file or raw binary file
+    :param dtype: element type of raw files
+    :param dim: vector length of raw files
+    :returns: np.memmap of shape (N, dim)
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    return np.memmap(path, dtype=dtype, mode='r').reshape(-1, dim)
+
+def open_output(path, shape, dtype='float64'):
+    """
+    Creates a memory-mapped .npy output file, a temporary one without a path
+    (to be handed over with release once it is written)
+
+    :param path: output file path or None
+    :param shape: output shape
+    :param dtype: output dtype
+    :returns: np.memmap backed by the output file
+    """
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.npy')
+        os.close(fd)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+def release(result):
+    """
+    Unlinks the temporary file of a written output (or removes it when the
+    memmap is collected where mapped files can't be unlinked), the memmap
+    becomes its only owner and its filename None
+
+    :param result: np.memmap from open_output(None, ...)
+    """
+    path = result.filename
+    try:
+        os.unlink(path)
+    except OSError:
+        weakref.finalize(result, os.remove, path)
+    result.filename = None
+
+def window(arr, start, stop, mode='r'):
+    """
+    Maps rows [start, stop) of an array, memmaps get a fresh mapping of just
+    that window so pages from earlier chunks are released once it is dropped
+
+    :param arr: array or memmap (C-contiguous)
+    :param start: first row
+    :param stop: row after the last
+    :param mode: 'r' for inputs, 'r+' for outputs
+    :returns: array of the window rows
+    """
+    if not isinstance(arr, np.memmap) or arr.filename is None:
+        return arr[start:stop]
+    row_bytes = arr.dtype.itemsize * int(np.prod(arr.shape[1:], dtype=np.int64))
+    return np.memmap(arr.filename, dtype=arr.dtype, mode=mode, offset=arr.offset + start * row_bytes,
+                     shape=(stop - start,) + arr.shape[1:])
+
+
+# ------------------ Chunk Kernels ------------------
+
+def row_kernel(oper, a, b):
+    """
+    Per-row operation on one chunk
+    :param oper: operation in row_ops
+    :param a: (rows, d) chunk
+    :param b: (rows, d) chunk or (d,) vector
+    :returns: chunk result
+    """
+    if oper == 'norm':
+        return np.sqrt(np.einsum('ij,ij->i', a, a))
+    if oper == 'dot':
+        return np.einsum('ij,ij->i', a, np.broadcast_to(b, a.shape))
+    if oper == 'add':
+        return a + b
+    if oper == 'sub':
+        return a - b
+    if oper == 'cross':
+        return np.cross(a, b)
+    if oper == 'projection':
+        b = np.broadcast_to(b, a.shape)
+        return (np.einsum('ij,ij->i', a, b) / np.einsum('ij,ij->i', b, b))[:, None] * b
+
+
+# ------------------ Main Calculation ------------------
+
+def chunked_calc(oper, a, b=None, out=None, chunk_rows=CHUNK_ROWS):
+    """
+    Runs a vector operation over an (N, d) dataset in fixed-size chunks
+
+    :param oper: operation in row_ops or reductions
+    :param a: (N, d) array / memmap
+    :param b: (N, d) array / memmap, or one (d,) vector applied to every row
+    :param out: output .npy path for row operations (None: in memory for arrays,
+                temporary file owned by the result for memmaps)
+    :param chunk_rows: rows per chunk
+    :returns: array / memmap of row results, or the reduced value
+    :raises ValueError: operation not in row_ops or reductions, or b missing
+    """
+
+    n_rows, dim = a.shape
+    per_row = b is not None and np.ndim(b) == 2
+
+    if oper in reductions:
+        total = np.zeros(dim) if oper == 'sum' else 0.0
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            chunk = np.asarray(window(a, start, stop), dtype=np.float64)
+            if oper == 'sum':
+                total += chunk.sum(axis=0)
+            elif oper == 'sum_norm':
+                total += row_kernel('norm', chunk, None).sum()
+            else:
+                total = max(total, row_kernel('norm', chunk, None).max(initial=0.0))
+        return total
+
+    if oper not in row_ops:
+        raise ValueError(f'{oper} is not supported for (N, d) datasets')
+    if b is None and oper != 'norm':
+        raise ValueError(f'{oper} needs a second vector or dataset')
+
+    shape = (n_rows,) if oper in ('norm', 'dot') else (n_rows, dim)
+    if oper in ('norm', 'dot', 'projection'):
+        dtype = np.float64
+    else:
+        dtype = np.result_type(a.dtype, np.asarray(b[:1]).dtype)
+    # In-memory inputs without an output path are computed in memory
+    if out is None and not isinstance(a, np.memmap):
+        result = np.empty(shape, dtype)
+    else:
+        result = open_output(out, shape, dtype)
+    # Temporary outputs keep their file until written, so windows are mapped separately
+    temporary = out is None and isinstance(result, np.memmap)
+    try:
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            b_chunk = window(b, start, stop) if per_row else b
+            target = window(result, start, stop, 'r+')
+            target[...] = row_kernel(oper, window(a, start, stop), b_chunk)
+            if isinstance(target, np.memmap):
+                target.flush()
+            del target
+        if isinstance(result, np.memmap):
+            result.flush()
+    finally:
+        if temporary:
+            release(result)
+    return result
+
+
+# Test:
+if __name__ == '__main__':
+    data = np.arange(30, dtype=np.float64).reshape(10, 3)
+    print(chunked_calc('norm', data, chunk_rows=4)[:])
+    print(chunked_calc('sum_norm', data, chunk_rows=4))
@@ -0,0 +1,129 @@
+"""
+File: downsample.py
+Description:
+    Implements decimation of dense series between sampling and drawing in graph.py.
+    Largest-Triangle-Three-Buckets and per-pixel min / max both cut a series to
+    a pixel-appropriate point count while keeping peaks, fully vectorized in NumPy.
+"""
+
+import numpy as np
+
+
+methods = ['minmax', 'lttb']
+
+
+def buckets(values, count):
+    """
+    Splits a 1D array into (at most) count equal rows, padding the last row with nan
+
+    :param values: 1D array
+    :param count: number of buckets
+    :returns: (rows, size) array, rows <= count so that no row is only padding
+    """
+    size = -(-len(values) // count)
+    count = -(-len(values) // size)
+    padded = np.full(count * size, np.nan)
+    padded[:len(values)] = values
+    return padded.reshape(count, size)
+
+def nan_mean(rows):
+    """
+    Row means ignoring nan (nan for rows with no values, without warnings)
+    :param rows: 2D array
+    :returns: 1D array of means
+    """
+    valid = ~np.isnan(rows)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, rows, 0).sum(axis=1)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+def minmax(xs, ys, count):
+    """
+    Per-pixel min / max decimation, every bucket keeps its lowest and
+    highest point (in x order), buckets with gaps keep a nan to break the line
+
+    :param xs: sorted x values
+    :param ys: y values (nan for breaks)
+    :param count: number of buckets (about the pixel width)
+    :returns: decimated (xs, ys) of at most 3 * count points
+    """
+    if len(xs) <= 3 * count:
+        return xs, ys
+    rows = buckets(ys, count)
+    size = rows.shape[1]
+    offsets = np.arange(len(rows))[:, None] * size
+
+    gaps = np.isnan(rows)
+    lows = np.where(gaps, np.inf, rows).argmin(axis=1)
+    highs = np.where(gaps, -np.inf, rows).argmax(axis=1)
+    first_gap = np.where(gaps.any(axis=1), gaps.argmax(axis=1), lows)
+
+    # Padding of the last bucket is nan too, so only real gaps count
+    idx = np.sort(np.stack([lows, highs, first_gap], axis=1) + offsets, axis=1).ravel()
+    idx = idx[idx < len(xs)]
+    idx = idx[np.r_[True, idx[1:] != idx[:-1]]]
+    return xs[idx], ys[idx]
+
+def lttb(xs, ys, count, passes=2):
+    """
+    Largest-Triangle-Three-Buckets decimation. Each bucket keeps the point
+    forming the largest triangle with the chosen point of the previous bucket
+    and the mean of the next one. The first pass anchors on the previous
+    bucket's mean so every bucket is chosen at once, later passes re-anchor
+    on the previous pass's choices
+
+    :param xs: sorted x values
+    :param ys: y values (nan for breaks)
+    :param count: number of output points
+    :param passes: refinement passes
+    :returns: decimated (xs, ys) of at most count points
+    """
+    if len(xs) <= count or count < 3:
+        return xs, ys
+
+    # First and last points are always kept, the rest is split into count - 2 buckets
+    bx, by = buckets(xs[1:-1], count - 2), buckets(ys[1:-1], count - 2)
+    mean_x, mean_y = nan_mean(bx), nan_mean(by)
+    next_x = np.r_[mean_x[1:], xs[-1]]
+    next_y = np.r_[mean_y[1:], ys[-1]]
+    prev_x = np.r_[xs[0], mean_x[:-1]]
+    prev_y = np.r_[ys[0], mean_y[:-1]]
+
+    for _ in range(passes):
+        with np.errstate(invalid='ignore'):
+            area = np.abs((prev_x[:, None] - next_x[:, None]) * (by - prev_y[:, None]) -
+                          (prev_x[:, None] - bx) * (next_y[:, None] - prev_y[:, None]))
+        pick = np.where(np.isnan(area), -1, area).argmax(axis=1)
+        sel_x, sel_y = bx[np.arange(len(bx)), pick], by[np.arange(len(by)), pick]
+        prev_x, prev_y = np.r_[xs[0], sel_x[:-1]], np.r_[ys[0], sel_y[:-1]]
+
+    # Buckets with gaps give up their point to a nan so the line still breaks there
+    gaps = np.isnan(by).any(axis=1) & ~np.isnan(bx).any(axis=1)
+    sel_y = np.where(gaps, np.nan, sel_y)
+    return np.r_[xs[0], sel_x, xs[-1]], np.r_[ys[0], sel_y, ys[-1]]
+
+def downsample(xs, ys, pixels, method='minmax'):
+    """
+    Cuts a series to a point count appropriate for pixels of width
+
+    :param xs: sorted x values
+    :param ys: y values
+    :param pixels: drawing width in pixels
+    :param method: 'minmax', 'lttb' or None (no decimation)
+    :returns: decimated (xs, ys)
+    """
+    pixels = max(int(pixels), 3)
+    if method == 'minmax':
+        return minmax(xs, ys, pixels)
+    if method == 'lttb':
+        return lttb(xs, ys, 2 * pixels)
+    return xs, ys
+
+
+# Test:
+if __name__ == '__main__':
+    xs = np.linspace(0, 10, 10 ** 6)
+    ys = np.sin(xs * 50) + (xs > 5) * 3
+    for method in methods:
+        dx, dy = downsample(xs, ys, 800, method)
+        print(method, len(dx), np.nanmax(dy), np.nanmin(dy))
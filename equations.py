@@ -0,0 +1,329 @@
+"""
+File: equations.py
+Description:
+    Solves equations and nonlinear systems over x, y and z for the solve
+    operation of calculator.py. smp.solve runs under a time budget in a
+    worker process (terminated when it runs over), and otherwise roots are
+    found numerically: the Jacobian is lambdified once and Newton iterations
+    run from many starting points as one NumPy batch.
+"""
+
+import threading
+import multiprocessing
+import numpy as np
+import sympy as smp
+import session
+
+
+# Symbolic initialization
+x, y, z = smp.symbols('x y z')
+unknowns = [x, y, z]
+
+# Names users type that sympy spells differently
+solve_locals = {'x': x, 'y': y, 'z': z, 'π': smp.pi, 'e': smp.E, 'ln': smp.log}
+
+# Seconds smp.solve may take before the numeric solver takes over
+SYMBOLIC_SECONDS = 2.0
+
+# Worker process running the time-budgeted sympy calls
+worker = {'process': None, 'conn': None}
+worker_lock = threading.Lock()
+
+# Newton: starting points (spread over [-BOX, BOX] per unknown), steps,
+# residual tolerance and the distance under which roots are the same
+STARTS = 4096
+BOX = 10.0
+NEWTON_STEPS = 60
+TOL = 1e-10
+SAME_ROOT = 1e-6
+
+
+# ------------------ Parsing ------------------
+
+def parse_system(expr):
+    """
+    Parses 'lhs = rhs' equations separated by ';' (a side without '=' equals 0)
+
+    :param expr: cleaned expression string
+    :returns: list of sympy expressions equal to zero
+    """
+    system = []
+    for part in expr.split(';'):
+        if not part.strip():
+            continue
+        sides = part.split('=')
+        if len(sides) > 2:
+            raise ValueError(f'more than one = in {part}')
+        lhs = session.inline(sides[0], solve_locals)
+        rhs = session.inline(sides[1], solve_locals) if len(sides) == 2 else 0
+        system.append(lhs - rhs)
+    if not system:
+        raise ValueError('no equations')
+    return system
+
+def variables_of(system, wrt=None):
+    """
+    Unknowns of a system
+
+    :param system: list of sympy expressions
+    :param wrt: solve for this symbol only (None: every x, y, z that appears)
+    :returns: list of symbols
+    """
+    if wrt is not None:
+        return [wrt]
+    free = set().union(*[eq.free_symbols for eq in system])
+    return [var for var in unknowns if var in free]
+
+
+# ------------------ Symbolic ------------------
+
+def serve(conn):
+    """
+    Worker process loop of within: runs (func, args, kwargs) calls received
+    over conn and sends back the result (None when the call failed)
+    """
+    while True:
+        try:
+            func, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            value = func(*args, **kwargs)
+        except Exception:
+            value = None
+        try:
+            conn.send(value)
+        except Exception:
+            conn.send(None)  # results that can't be pickled
+
+def start_worker():
+    """
+    Starts the worker process of within (forked where possible, so it
+    doesn't re-import sympy and main.py)
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    conn, child = context.Pipe()
+    process = context.Process(target=serve, args=(child,), daemon=True)
+    process.start()
+    child.close()
+    worker['process'], worker['conn'] = process, conn
+
+def stop_worker():
+    """
+    Terminates the worker process of within (its call is abandoned)
+    """
+    if worker['process'] is not None:
+        worker['process'].terminate()
+        worker['process'].join()
+        worker['conn'].close()
+    worker['process'], worker['conn'] = None, None
+
+def within(seconds, func, *args, **kwargs):
+    """
+    Runs a sympy call with a time budget in a worker process. A call that
+    runs over is stopped by terminating the worker, a new one is started
+    for the next call, so no computation is left running
+
+    :param seconds: time budget
+    :param func: function to call (arguments and result must pickle)
+    :returns: func's result, or None when it failed or ran out of time
+    """
+    with worker_lock:
+        if worker['process'] is None or not worker['process'].is_alive():
+            start_worker()
+        conn = worker['conn']
+        try:
+            conn.send((func, args, kwargs))
+            if conn.poll(seconds):
+                return conn.recv()
+        except (EOFError, OSError):
+            pass
+        except Exception:
+            return None  # arguments that can't be pickled
+        stop_worker()
+        return None
+
+def symbolic(system, variables, seconds=SYMBOLIC_SECONDS):
+    """
+    smp.solve with a time budget
+
+    :param system: list of sympy expressions equal to zero
+    :param variables: unknowns
+    :param seconds: time budget
+    :returns: list of {symbol: value} solutions, or None when sympy failed or ran out of time
+    """
+    return within(seconds, smp.solve, system, variables, dict=True)
+
+
+# ------------------ Numeric ------------------
+
+def compile_system(system, variables):
+    """
+    Lambdifies the residuals and their Jacobian once
+
+    :param system: list of m sympy expressions
+    :param variables: n unknowns
+    :returns: (F, J), F maps an (N, n) array to (N, m) residuals, J to (N, m, n) Jacobians
+    """
+    residuals = smp.Matrix(system)
+    jacobian = residuals.jacobian(variables)
+    f = smp.lambdify(variables, list(residuals), 'numpy', cse=True)
+    j = smp.lambdify(variables, list(jacobian), 'numpy', cse=True)
+    m, n = len(system), len(variables)
+
+    def columns(func, points, count):
+        with np.errstate(all='ignore'):
+            values = func(*points.T)
+        # Constant entries come back as scalars, complex values are off the real line
+        values = np.stack([np.broadcast_to(np.asarray(v), (len(points),)) for v in values], axis=-1)
+        if np.iscomplexobj(values):
+            values = np.where(np.abs(values.imag) < 1e-12, values.real, np.nan)
+        return np.asarray(values, dtype=float).reshape(len(points), *count)
+
+    return (lambda points: columns(f, points, (m,)),
+            lambda points: columns(j, points, (m, n)))
+
+def starts(n, count=STARTS, box=BOX, seed=0):
+    """
+    Starting points spread over [-box, box]^n (a grid in 1D, uniform random otherwise)
+
+    :param n: unknowns
+    :param count: points
+    :returns: (count, n) array
+    """
+    if n == 1:
+        return np.linspace(-box, box, count)[:, None]
+    return np.random.default_rng(seed).uniform(-box, box, (count, n))
+
+def newton(F, J, points, steps=NEWTON_STEPS, tol=TOL):
+    """
+    Damped Newton iterations on every starting point at once. Non square or
+    singular Jacobians use the least squares step (pseudo inverse)
+
+    :param F: residual function of compile_system
+    :param J: Jacobian function of compile_system
+    :param points: (N, n) starting points
+    :returns: (N, n) points that converged
+    """
+    points = points.copy()
+    active = np.ones(len(points), dtype=bool)
+    for _ in range(steps):
+        idx = np.flatnonzero(active)
+        if not len(idx):
+            break
+        p = points[idx]
+        f = F(p)
+        with np.errstate(all='ignore'):
+            norm = np.sqrt(np.sum(f * f, axis=1))
+        done = norm < tol
+        active[idx[done | ~np.isfinite(norm)]] = False
+
+        keep = ~done & np.isfinite(norm)
+        idx, p, f, norm = idx[keep], p[keep], f[keep], norm[keep]
+        if not len(idx):
+            break
+        jac = J(p)
+        ok = np.all(np.isfinite(jac), axis=(1, 2))
+        active[idx[~ok]] = False
+        idx, p, f, norm, jac = idx[ok], p[ok], f[ok], norm[ok], jac[ok]
+
+        step = np.einsum('kij,kj->ki', np.linalg.pinv(jac), f)
+
+        # Halve steps that don't reduce the residual (up to 4 times)
+        scale = np.ones(len(idx))
+        for _ in range(4):
+            with np.errstate(all='ignore'):
+                trial = F(p - scale[:, None] * step)
+                worse = ~(np.sqrt(np.sum(trial * trial, axis=1)) < norm)
+            if not worse.any():
+                break
+            scale[worse] /= 2
+        points[idx] = p - scale[:, None] * step
+
+    f = F(points)
+    with np.errstate(all='ignore'):
+        converged = np.sqrt(np.sum(f * f, axis=1)) < np.sqrt(tol)
+    return points[converged & np.all(np.isfinite(points), axis=1)]
+
+def distinct(roots, tol=SAME_ROOT):
+    """
+    Merges roots closer than tol
+
+    :param roots: (N, n) array
+    :returns: (K, n) array sorted lexicographically
+    """
+    roots = roots[np.lexsort(roots.T[::-1])]
+    kept = []
+    for root in roots:
+        scale = tol * max(1.0, np.max(np.abs(root)))
+        if not kept or np.min(np.max(np.abs(np.array(kept) - root), axis=1)) > scale:
+            kept.append(root)
+    return np.array(kept).reshape(-1, roots.shape[1])
+
+def numeric(system, variables, count=STARTS, box=BOX):
+    """
+    Real roots of a system from vectorized Newton on many starting points
+
+    :param system: list of sympy expressions equal to zero
+    :param variables: unknowns (only x, y, z may appear)
+    :returns: list of {symbol: float} solutions, None when other symbols appear
+    """
+    free = set().union(*[eq.free_symbols for eq in system])
+    if not free <= set(variables):
+        return None
+    F, J = compile_system(system, variables)
+    roots = distinct(newton(F, J, starts(len(variables), count, box)))
+    return [dict(zip(variables, map(float, root))) for root in roots]
+
+
+# ------------------ Solve ------------------
+
+def solve(expr, wrt=None, seconds=SYMBOLIC_SECONDS):
+    """
+    Solves an equation or a system
+
+    :param expr: cleaned expression, equations separated by ';'
+    :param wrt: solve for this symbol only
+    :param seconds: time budget of smp.solve
+    :returns: (solutions, 'symbolic' or 'numeric'), solutions as a list of {symbol: value}
+    """
+    system = parse_system(expr)
+    variables = variables_of(system, wrt)
+    if not variables:
+        raise ValueError('nothing to solve for')
+
+    solutions = symbolic(system, variables, seconds)
+    if solutions is not None:
+        return solutions, 'symbolic'
+    return numeric(system, variables), 'numeric'
+
+def format_solutions(solutions):
+    """
+    'x = 1, y = 2; x = -1, y = -2' text of solutions
+
+    :param solutions: list of {symbol: value}
+    :returns: string
+    """
+    if solutions is None:
+        return None
+    if not solutions:
+        return 'no solution'
+
+    def value(v):
+        if isinstance(v, (complex, np.complexfloating)):
+            sign = '-' if v.imag < 0 else '+'
+            imag = 'I' if abs(v.imag) == 1 else f'{abs(v.imag):.12g}*I'
+            if v.real == 0:
+                return imag if sign == '+' else '-' + imag
+            return f'{v.real:.12g} {sign} {imag}'
+        return f'{v:.12g}' if isinstance(v, (float, np.floating)) else str(v)
+
+    return '; '.join(', '.join(f'{var} = {value(v)}' for var, v in solution.items()) for solution in solutions)
+
+
+# Test:
+if __name__ == '__main__':
+    print(solve('x**2-2'))
+    print(solve('x**2+y**2=4;y=x**3'))
+    print(format_solutions(numeric(parse_system('cos(x)=x'), [x])))
@@ -0,0 +1,245 @@
+"""
+File: expansions.py
+Description:
+    Taylor / Laurent expansions of the calculator page. An expression is
+    shifted to its point (x -> x + point) and expanded with sympy's sparse
+    power series rings (ring_series.rs_series), which multiply, compose and
+    invert truncated series instead of differentiating the expression like
+    smp.series. Integer powers of the variable (exp(x)/x^2) are split off so
+    Laurent expansions start below zero, products with reciprocals
+    (exp(x)/sin(x)^3) are expanded factor by factor, and with poles the
+    precision is raised until the kept coefficients stop changing.
+    Expressions ring_series can't expand (sqrt(1 + x), x^x, expansions at
+    oo) go to smp.series. Coefficients are kept per (expression, variable,
+    point) at the highest order computed.
+"""
+
+from collections import OrderedDict
+import sympy as smp
+from sympy.polys.ring_series import rs_series
+import profiling
+import session
+
+
+# Order when none is given (smp.series' default)
+ORDER = 6
+
+# Precision doublings tried with poles before leaving it to smp.series
+POLE_ROUNDS = 4
+
+# Expansions kept per (expression, variable, point)
+SERIES_CACHE = 256
+
+expansions = OrderedDict()  # (expr, var, point) -> (order, {exponent: coefficient})
+
+
+# ------------------ Expanding ------------------
+
+def poles(expr, var):
+    """
+    :returns: total negative power of the factors vanishing (or blowing up)
+              at var = 0, e.g. 3 for exp(x)/sin(x)^3 (ring_series loses
+              orders dividing by them)
+    """
+    total = 0
+    for power in expr.atoms(smp.Pow):
+        if power.exp.is_negative and power.base.has(var):
+            value = power.base.subs(var, 0)
+            if value == 0 or not value.is_finite:
+                total -= power.exp
+    return int(smp.ceiling(total))
+
+def lowest(series, var):
+    """
+    :returns: lowest power of var in a ring series (negative for Laurent series)
+    """
+    at = series.ring.symbols.index(var) if var in series.ring.symbols else None
+    return min((m[at] for m in series.keys()), default=0) if at is not None else 0
+
+def ring_series(expr, var, prec):
+    """
+    rs_series(expr, var, prec). Products with reciprocals (exp(x)/sin(x)^3),
+    which ring_series can't read, are taken factor by factor, each to the
+    precision the lowest powers of the others leave for it
+
+    :returns: ring series (PolyElement), or None when ring_series can't expand it
+    """
+    if expr.is_Mul and any(arg.is_Pow and arg.exp.is_negative for arg in expr.args):
+        factors = [ring_series(arg, var, prec) for arg in expr.args]
+        if None in factors:
+            return None
+        low = [lowest(f, var) for f in factors]
+        product = None
+        for i, (arg, f) in enumerate(zip(expr.args, factors)):
+            others = sum(low) - low[i]
+            if others < 0:
+                f = ring_series(arg, var, prec - others)
+                if f is None:
+                    return None
+            if product is None:
+                product = f
+            else:
+                ring = product.ring.compose(f.ring)
+                product = product.set_ring(ring) * f.set_ring(ring)
+        at = product.ring.symbols.index(var) if var in product.ring.symbols else None
+        return product.ring.from_dict({m: c for m, c in product.items() if at is None or m[at] < prec})
+
+    try:
+        series = rs_series(expr, var, prec)
+    except Exception:
+        return None
+    if not isinstance(series, smp.polys.rings.PolyElement) or not series:
+        # ring_series gives 0 for some arguments it can't read, smp.series checks
+        return None
+    return series
+
+def coefficients(series, var):
+    """
+    :param series: ring series
+    :returns: {exponent: coefficient} in var, or None when a generator still
+              depends on var ((x + 1)**(1/2): it wasn't expanded)
+    """
+    ring = series.ring
+    at = ring.symbols.index(var) if var in ring.symbols else None
+    terms = {}
+    for monomial, c in series.items():
+        coeff = ring.domain.to_sympy(c)
+        for i, (symbol, k) in enumerate(zip(ring.symbols, monomial)):
+            if k and i != at:
+                coeff *= symbol ** k
+        k = monomial[at] if at is not None else 0
+        terms[k] = terms.get(k, 0) + coeff
+    if any(coeff.has(var) for coeff in terms.values()):
+        return None
+    return terms
+
+def ring_terms(expr, var, order):
+    """
+    Expansion of expr at var = 0 with ring_series. Integer powers of var
+    are split off, and with poles the series is taken further until two
+    precisions agree below order
+
+    :param expr: sympy expression
+    :param var: variable
+    :param order: exponents below it are kept
+    :returns: {exponent: coefficient}, or None when ring_series can't expand it
+    """
+    rest, shift = expr.as_coeff_exponent(var)
+    if not shift.is_Integer:
+        rest, shift = expr, smp.Integer(0)
+    prec = int(order - shift)
+
+    def kept(terms):
+        return {k + int(shift): c for k, c in terms.items() if k < prec and c != 0}
+
+    def expanded(prec):
+        series = ring_series(rest, var, prec)
+        return None if series is None else coefficients(series, var)
+
+    extra = 2 * poles(rest, var)
+    terms = expanded(prec + extra)
+    if terms is None or not extra:
+        return None if terms is None else kept(terms)
+    for _ in range(POLE_ROUNDS):
+        extra *= 2
+        further = expanded(prec + extra)
+        if further is None:
+            return None
+        if kept(further) == kept(terms):
+            return kept(terms)
+        terms = further
+    return None
+
+def series_terms(expr, var, order):
+    """
+    Expansion of expr at var = 0 with smp.series (fractional powers allowed)
+
+    :returns: {exponent: coefficient}
+    """
+    terms = {}
+    for term in smp.Add.make_args(smp.series(expr, var, 0, order).removeO()):
+        coeff, k = term.as_coeff_exponent(var)
+        terms[k] = terms.get(k, 0) + coeff
+    return {k: c for k, c in terms.items() if c != 0}
+
+def expand(expr, var, point=0, order=ORDER):
+    """
+    Coefficients of the expansion of expr in powers of (var - point),
+    from the cache when it was expanded at least as far before
+
+    :param expr: sympy expression
+    :param var: variable
+    :param point: finite sympy number
+    :param order: exponents below it are kept
+    :returns: {exponent: coefficient}
+    """
+    key = (expr, var, point)
+    cached = expansions.get(key)
+    if cached is not None and cached[0] >= order:
+        expansions.move_to_end(key)
+        profiling.count('expansions.cached')
+        return {k: c for k, c in cached[1].items() if k < order}
+
+    # Arguments are multiplied out (sin(y*(x + 1)) -> sin(x*y + y)) for ring_series
+    shifted = smp.expand_mul(expr.subs(var, var + point)) if point != 0 else expr
+    terms = ring_terms(shifted, var, order)
+    if terms is None:
+        profiling.count('expansions.series')
+        terms = series_terms(shifted, var, order)
+    else:
+        profiling.count('expansions.ring')
+
+    expansions[key] = (order, terms)
+    expansions.move_to_end(key)
+    while len(expansions) > SERIES_CACHE:
+        expansions.popitem(last=False)
+    return terms
+
+
+# ------------------ Calculator ------------------
+
+def to_text(terms, var, point, order):
+    """
+    Text of an expansion in sympy's series spelling, lowest power first
+
+    :returns: string, e.g. 1 + x + x**2/2 + O(x**3)
+    """
+    base = var - point
+    text = ''
+    for k in sorted(terms):
+        part = str(terms[k] * base ** k)
+        if not text:
+            text = part
+        else:
+            text += ' - ' + part[1:] if part[0] == '-' else ' + ' + part
+    big_o = str(smp.Order(base ** order, (var, point)))
+    return big_o if not text else f'{text} + {big_o}'
+
+def expansion(expr, var, point='', order=''):
+    """
+    Taylor / Laurent expansion for the calculator page
+
+    :param expr: cleaned expression (python syntax)
+    :param var: variable
+    :param point: point text ('' : 0, oo / -oo go to smp.series)
+    :param order: order text ('' : ORDER)
+    :returns: expansion text, e.g. x - x**3/6 + O(x**5)
+    """
+    if isinstance(expr, str):
+        expr = session.inline(expr)
+    point = session.inline(point) if point else smp.Integer(0)
+    order = int(order) if order else ORDER
+    if point.free_symbols:
+        raise ValueError(f'point must be a number: {point}')
+    if not point.is_finite:
+        return str(smp.series(expr, var, point, order))
+    return to_text(expand(expr, var, point, order), var, point, order)
+
+
+# Test:
+if __name__ == '__main__':
+    x = smp.Symbol('x')
+    print(expansion('exp(sin(x))*cos(x)', x, '', '8'))
+    print(expansion('exp(x)/x**2', x, '', '3'), '|', expansion('1/sin(x)', x, '', '4'))
+    print(expansion('sin(x)', x, '1', '4'), '|', expansion('sqrt(1+x)', x, '', '4'))
+    print(expansion('1/x', x, 'oo', '3'))
@@ -0,0 +1,119 @@
+"""
+File: export.py
+Description:
+    Headless batch export of graphs to PNG / SVG files for servers with no display.
+    Graphs are drawn with the non-interactive Agg canvas, each worker process
+    reuses one figure, and batches are spread across processes.
+    Usage: python export.py 'x^2' 'sin(x); cos(x)' -o graphs --format svg --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from graph import draw, X_RANGE
+
+
+formats = ['png', 'svg']
+
+# Figure reused by every render of this (worker) process
+worker = {'figure': None, 'ax': None}
+
+
+def init_worker(size=(7.5, 4.3), dpi=100):
+    """
+    Creates the figure this process renders every graph on
+
+    :param size: figure size in inches
+    :param dpi: resolution of PNG output
+    """
+    figure = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(figure)
+    worker['figure'] = figure
+    worker['ax'] = figure.add_subplot()
+
+def render(job):
+    """
+    Draws one graph onto the worker figure and saves it
+
+    :param job: (expression, output path, xmin, xmax)
+    :returns: output path, or None if the expression can't be graphed
+    """
+    expr, path, xmin, xmax = job
+    if worker['figure'] is None:
+        init_worker()
+    try:
+        draw(worker['ax'], expr, xmin, xmax, refresh=False)
+        worker['figure'].savefig(path, format=os.path.splitext(path)[1][1:])
+    except Exception:
+        return None
+    return path
+
+def export(exprs, out_dir='.', fmt='png', workers=None, x_range=X_RANGE, dpi=100):
+    """
+    Renders many expressions to image files without a display
+
+    :param exprs: list of expression strings (';' overlays several functions in one image)
+    :param out_dir: output directory
+    :param fmt: 'png' or 'svg'
+    :param workers: processes (defaults to cpu count, 1 renders in this process)
+    :param x_range: (xmin, xmax) of every graph
+    :param dpi: resolution of PNG output
+    :returns: list of output paths (None for expressions that failed)
+    """
+    if fmt not in formats:
+        raise ValueError(f'unknown format: {fmt}')
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(expr, os.path.join(out_dir, f'graph_{n:04d}.{fmt}'), *x_range) for n, expr in enumerate(exprs)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(jobs) == 1:
+        init_worker(dpi=dpi)
+        return [render(job) for job in jobs]
+
+    chunk = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=((7.5, 4.3), dpi)) as pool:
+        return list(pool.map(render, jobs, chunksize=chunk))
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: argument list (defaults to sys.argv)
+    :returns: exit code
+    """
+    parser = argparse.ArgumentParser(description='Export graphs to PNG / SVG without a display')
+    parser.add_argument('exprs', nargs='*', help="expressions, several functions per graph separated by ';'")
+    parser.add_argument('-f', '--file', help='file with one expression per line')
+    parser.add_argument('-o', '--out', default='graphs', help='output directory')
+    parser.add_argument('--format', default='png', choices=formats)
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: cpu count)')
+    parser.add_argument('--xmin', type=float, default=X_RANGE[0])
+    parser.add_argument('--xmax', type=float, default=X_RANGE[1])
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    exprs = list(args.exprs)
+    if args.file:
+        with open(args.file) as f:
+            exprs += [line.strip() for line in f if line.strip()]
+    if not exprs:
+        parser.error('no expressions given')
+
+    start = time.perf_counter()
+    paths = export(exprs, args.out, args.format, args.workers, (args.xmin, args.xmax), args.dpi)
+    elapsed = time.perf_counter() - start
+
+    failed = [expr for expr, path in zip(exprs, paths) if path is None]
+    for expr in failed:
+        print(f'ERROR: could not graph {expr}', file=sys.stderr)
+    done = len(paths) - len(failed)
+    print(f'{done} graphs written to {args.out} in {elapsed:.2f} s ({done / elapsed:.1f} images/s)')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
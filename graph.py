@@ -2,36 +2,676 @@
 File: graph.py
 Description:
     Implements graph representation of functions for the 
-    graphs page in main.py.
+    graphs page in main.py. Expressions are lambdified once,
+    sampled with NumPy and drawn onto a matplotlib axes.
 """
 
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
 import sympy as smp
 from calculator import clean
+from downsample import downsample
+from vector import str_to_field, t
+import session
 
 
 # Symbolic initialization
 x, y, z, alpha, beta = smp.symbols('x y z alpha beta', real=True)
 i, j, k = smp.symbols('i j k', integer=True, positive=True)
 
-def graph(expr):
-    """
-    Graphs an expression using sympy's plot method
+# Names users type that sympy spells differently
+graph_locals = {'x': x, 'y': y, 'z': z, 'alpha': alpha, 'beta': beta,
+                'π': smp.pi, 'e': smp.E, 'ln': smp.log}
+
+# Default view and sample count
+X_RANGE = (-10, 10)
+SAMPLES = 2000
+
+# Viewport sampling: tiles across the view, uniform samples per tile
+# and the cap on samples a tile may grow to during refinement
+TILES = 8
+TILE_SAMPLES = 128
+TILE_MAX_SAMPLES = 2048
+BEND_TOL = 1e-3
+
+# 3D: t range of parametric curves, mesh samples per axis of surfaces
+# and on-screen size of a rendered surface cell
+T_RANGE = (0, 2 * np.pi)
+SURFACE_SAMPLES = 512
+PIXELS_PER_CELL = 4
+
+# Decimation between sampling and drawing: 'minmax', 'lttb' or None
+DECIMATE = 'minmax'
 
-    :param expr: expression to be graphed
-    :returns: graph window
+# Sampled tiles keyed by (expressions, x0, x1), least recently used evicted first
+CACHE_SIZE = 512
+sample_cache = OrderedDict()
+cache_stats = {'hits': 0, 'misses': 0}
+
+# Expressions / compiled function / lines currently drawn on each axes
+views = weakref.WeakKeyDictionary()
+
+
+# ------------------ Compile / Sample ------------------
+
+def parse(expr):
     """
+    Cleans user input and parses it into a sympy expression
 
-    # Cleans syntax
+    :param expr: expression string (ex. '4x + x^2')
+    :returns: sympy expression
+    """
     expr = expr.replace(' ', '')
-    f = clean(expr)
+    return session.inline(clean(expr), graph_locals)
+
+def parse_list(exprs):
+    """
+    Parses one or several functions, given as a list or as one
+    string separated by ';' (ex. 'sin(x); x^2')
+
+    :param exprs: expression string or list of expression strings
+    :returns: list of sympy expressions
+    """
+    if isinstance(exprs, str):
+        exprs = exprs.split(';')
+    return [parse(expr) if isinstance(expr, str) else expr for expr in exprs if str(expr).strip()]
+
+def compile_exprs(exprs, variables=(x,)):
+    """
+    Lambdifies a set of expressions once into a single batched NumPy
+    function, common subexpressions are shared across the whole set
+
+    :param exprs: list of expression strings or sympy expressions
+    :param variables: symbols the function takes (x for graphs, x, y for surfaces)
+    :returns: function of one array per variable returning a (len(exprs), *shape) array
+    """
+    exprs = parse_list(exprs)
+    func = smp.lambdify(list(variables), exprs, 'numpy', cse=True)
+
+    def evaluate(*grids):
+        shape = np.broadcast_shapes(*[np.shape(g) for g in grids])
+        with np.errstate(all='ignore'):
+            rows = func(*grids)
+        # Constant expressions come back as scalars, complex values are off the real graph
+        ys = np.stack([np.broadcast_to(np.asarray(row), shape) for row in rows])
+        if np.iscomplexobj(ys):
+            ys = np.where(np.abs(ys.imag) < 1e-12, ys.real, np.nan)
+        return np.asarray(ys, dtype=float)
+
+    return evaluate
+
+def compile_expr(expr):
+    """
+    Lambdifies an expression once into a vectorized NumPy function
+
+    :param expr: expression string or sympy expression in x
+    :returns: function of an x array returning a y array
+    """
+    func = compile_exprs([expr])
+    return lambda xs: func(xs)[0]
+
+def mask_breaks(xs, ys):
+    """
+    Masks values that should not be joined by a line: non-finite values
+    and jumps across vertical asymptotes (sign change with a huge step)
+
+    :param xs: sample x values
+    :param ys: sample y values, or one row of y values per function
+    :returns: copy of ys with breaks set to nan
+    """
+    if np.ndim(ys) > 1:
+        return np.array([mask_breaks(xs, row) for row in ys])
+
+    ys = np.where(np.isfinite(ys), ys, np.nan)
+    finite = ys[np.isfinite(ys)]
+    if len(finite) < 2:
+        return ys
+
+    # A jump far larger than the curve's typical spread marks an asymptote
+    lo, hi = np.percentile(finite, [25, 75])
+    limit = 10 * max(hi - lo, 1e-12)
+    step = np.abs(np.diff(ys))
+    jump = (step > limit) & (np.sign(ys[1:]) != np.sign(ys[:-1]))
+    idx = np.nonzero(jump)[0]
+
+    # Break at whichever side of the jump is further out
+    side = np.where(np.abs(ys[idx]) > np.abs(ys[idx + 1]), idx, idx + 1)
+    ys[side] = np.nan
+    return ys
+
+def view_limits(ys):
+    """
+    y limits that keep the curve readable near asymptotes
+    :param ys: masked y values
+    :returns: (ymin, ymax) or None if nothing is finite
+    """
+    finite = ys[np.isfinite(ys)]
+    if len(finite) == 0:
+        return None
+    lo, hi = np.percentile(finite, [1, 99])
+    pad = max(hi - lo, 1e-9) * 0.1
+    return lo - pad, hi + pad
+
+def sample(func, xmin, xmax, n=SAMPLES):
+    """
+    Samples a compiled function on a uniform grid
+
+    :param func: function from compile_expr / compile_exprs
+    :param xmin: left end of the range
+    :param xmax: right end of the range
+    :param n: number of samples
+    :returns: (xs, masked ys)
+    """
+    xs = np.linspace(xmin, xmax, n)
+    return xs, mask_breaks(xs, func(xs))
+
+
+# ------------------ Viewport Sampling ------------------
+
+def refine(func, xs, ys, tol=BEND_TOL, max_samples=TILE_MAX_SAMPLES):
+    """
+    Curvature based refinement: intervals next to points where a curve
+    bends away from its chord get midpoints, all new midpoints of a pass
+    are evaluated in one vectorized call
+
+    :param func: function from compile_expr / compile_exprs
+    :param xs: sorted sample x values
+    :param ys: sample y values (one row per function for compile_exprs)
+    :param tol: allowed bend relative to the curve's y spread
+    :param max_samples: sample cap
+    :returns: refined (xs, ys)
+    """
+    rows = np.atleast_2d(ys)
+    lo, hi = np.full(len(rows), np.nan), np.full(len(rows), np.nan)
+    for n, row in enumerate(rows):
+        finite = row[np.isfinite(row)]
+        if len(finite) >= 3:
+            lo[n], hi[n] = np.percentile(finite, [5, 95])
+    scale = (hi - lo)[:, None]
+    lo, hi = lo[:, None], hi[:, None]
+    if not np.any(scale > 0):
+        return xs, ys
+
+    while len(xs) < max_samples:
+        # Distance of each interior point from the chord of its neighbours
+        frac = (xs[1:-1] - xs[:-2]) / (xs[2:] - xs[:-2])
+        mid = rows[:, 1:-1]
+        with np.errstate(invalid='ignore'):
+            chord = rows[:, :-2] + frac * (rows[:, 2:] - rows[:, :-2])
+            bend = np.abs(mid - chord) > tol * scale
+            # Points far off screen (ex. next to an asymptote) are not worth refining
+            bend &= (mid > lo - 2 * scale) & (mid < hi + 2 * scale)
+        bend = bend.any(axis=0)
+
+        split = np.zeros(len(xs) - 1, dtype=bool)
+        split[:-1] |= bend
+        split[1:] |= bend
+        mids = (xs[:-1][split] + xs[1:][split]) / 2
+        if len(mids) == 0 or len(xs) + len(mids) > max_samples:
+            break
+
+        xs = np.concatenate([xs, mids])
+        rows = np.concatenate([rows, np.atleast_2d(func(mids))], axis=1)
+        order = np.argsort(xs, kind='stable')
+        xs, rows = xs[order], rows[:, order]
+    return xs, rows.reshape(rows.shape[1:]) if np.ndim(ys) == 1 else rows
+
+def tiles(xmin, xmax):
+    """
+    Splits a viewport into aligned tiles whose width is a power of two,
+    panning reuses tiles and zooming switches to finer / coarser tiles
+
+    :param xmin: left end of the view
+    :param xmax: right end of the view
+    :returns: list of (x0, x1) tiles covering the view
+    """
+    width = 2.0 ** np.floor(np.log2((xmax - xmin) / TILES))
+    first, last = int(np.floor(xmin / width)), int(np.ceil(xmax / width))
+    return [(n * width, (n + 1) * width) for n in range(first, last)]
+
+def cached_tile(key, func, x0, x1):
+    """
+    Samples (and refines) one tile, or returns it from the cache
+
+    :param key: expression key
+    :param func: function from compile_exprs
+    :param x0: left end of the tile
+    :param x1: right end of the tile
+    :returns: (xs, ys) of the tile, one row of ys per function
+    """
+    entry = (key, x0, x1)
+    if entry in sample_cache:
+        cache_stats['hits'] += 1
+        sample_cache.move_to_end(entry)
+        return sample_cache[entry]
+
+    cache_stats['misses'] += 1
+    xs = np.linspace(x0, x1, TILE_SAMPLES)
+    segment = refine(func, xs, func(xs))
+    sample_cache[entry] = segment
+    while len(sample_cache) > CACHE_SIZE:
+        sample_cache.popitem(last=False)
+    return segment
+
+def viewport_sample(key, func, xmin, xmax):
+    """
+    Samples a viewport from cached tiles, only tiles that are newly
+    exposed (pan) or newly magnified (zoom) are evaluated
+
+    :param key: expression key
+    :param func: function from compile_exprs
+    :param xmin: left end of the view
+    :param xmax: right end of the view
+    :returns: (xs, masked ys) with one row of ys per function
+    """
+    segments = [cached_tile(key, func, x0, x1) for x0, x1 in tiles(xmin, xmax)]
+    xs = np.concatenate([s[0] for s in segments])
+    ys = np.concatenate([s[1] for s in segments], axis=-1)
+    return xs, mask_breaks(xs, ys)
+
+def clear_cache():
+    """Empties the tile cache"""
+    sample_cache.clear()
+    cache_stats.update(hits=0, misses=0)
+
+
+# ------------------ Drawing ------------------
+
+def draw(ax, exprs, xmin=X_RANGE[0], xmax=X_RANGE[1], n=None, refresh=True):
+    """
+    Samples one or several expressions on a shared x grid and draws them
+    onto a matplotlib axes, later zooms / pans of the axes resample through redraw
+
+    :param ax: matplotlib axes
+    :param exprs: expression string (functions separated by ';') or list of them
+    :param xmin: left end of the range
+    :param xmax: right end of the range
+    :param n: number of uniform samples (None for cached viewport sampling)
+    :param refresh: render the canvas now (savefig renders on its own)
+    :returns: dict of timings in ms ('compile', 'sample', 'draw')
+    """
+    timings = {}
+    start = time.perf_counter()
+    fs = parse_list(exprs)
+    func = compile_exprs(fs)
+    key = tuple(str(f) for f in fs)
+    timings['compile'] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    if n is None:
+        xs, ys = viewport_sample(key, func, xmin, xmax)
+    else:
+        xs, ys = sample(func, xmin, xmax, n)
+    timings['sample'] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    ax.clear()
+    lines = []
+    for m, (f, row) in enumerate(zip(fs, ys)):
+        label = f'$f_{{{m + 1}}}(x) = {smp.latex(f)}$' if len(fs) > 1 else f'$f(x) = {smp.latex(f)}$'
+        lines.append(ax.plot(*downsample(xs, row, ax.bbox.width, DECIMATE), label=label)[0])
+
+    # y-limits from uniform samples, refinement clusters points where the curve bends
+    if n is None:
+        uniform = np.linspace(xmin, xmax, SAMPLES)
+        limits = view_limits(mask_breaks(uniform, func(uniform)))
+    else:
+        limits = view_limits(ys)
+    if limits is not None:
+        ax.set_ylim(*limits)
+    ax.set_xlim(xmin, xmax)
+    ax.axhline(0, color='gray', linewidth=0.5)
+    ax.axvline(0, color='gray', linewidth=0.5)
+    ax.legend(loc='upper right')
+
+    # Clearing the axes drops its callbacks, so hook zoom / pan up again
+    views[ax] = {'key': key, 'func': func, 'lines': lines, 'exprs': fs,
+                 'samples': (xs, ys), 'markers': [], 'solved': None}
+    ax.callbacks.connect('xlim_changed', redraw)
+    if refresh:
+        ax.figure.canvas.draw()
+    timings['draw'] = (time.perf_counter() - start) * 1e3
+    return timings
+
+def redraw(ax):
+    """
+    Resamples the drawn expressions for the current x-limits of ax
+    (xlim_changed callback of zoom / pan)
+
+    :param ax: matplotlib axes
+    :returns: sample time in ms, or None if nothing is drawn on ax
+    """
+    view = views.get(ax)
+    if view is None:
+        return None
+    start = time.perf_counter()
+    xmin, xmax = ax.get_xlim()
+    xs, ys = viewport_sample(view['key'], view['func'], xmin, xmax)
+    view['samples'] = (xs, ys)
+    for line, row in zip(view['lines'], ys):
+        line.set_data(*downsample(xs, row, ax.bbox.width, DECIMATE))
+    if view['solved'] is not None:
+        solve(ax, refresh=False)
+    ax.figure.canvas.draw_idle()
+    return (time.perf_counter() - start) * 1e3
+
+def zoom(ax, center, factor):
+    """
+    Zooms the axes around a point (scroll wheel), resampling via redraw
+
+    :param ax: matplotlib axes
+    :param center: (x, y) point kept fixed
+    :param factor: < 1 zooms in, > 1 zooms out
+    """
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    cx, cy = center
+    ax.set_ylim(cy - (cy - y0) * factor, cy + (y1 - cy) * factor)
+    ax.set_xlim(cx - (cx - x0) * factor, cx + (x1 - cx) * factor)
+
+
+
+# ------------------ Roots / Extrema ------------------
+
+def compile_derivatives(f):
+    """
+    Compiles f, f' and f'' (symbolic derivatives) once into one batched function
+
+    :param f: sympy expression in x
+    :returns: function of an x array returning a (3, len(x)) array
+    """
+    df = smp.diff(f, x)
+    return compile_exprs([f, df, smp.diff(df, x)])
+
+def brackets(xs, ys):
+    """
+    Sign changes of sampled values, masked breaks (nan) never form a bracket
+
+    :param xs: sample x values
+    :param ys: sample y values
+    :returns: (left x, right x, left y, exact zeros) arrays
+    """
+    with np.errstate(invalid='ignore'):
+        change = np.sign(ys[:-1]) * np.sign(ys[1:]) < 0
+    idx = np.nonzero(change)[0]
+    return xs[idx], xs[idx + 1], ys[idx], xs[ys == 0]
+
+def polish(func, a, b, fa, tol=1e-13, iterations=60):
+    """
+    Safeguarded Newton on all brackets at once: Newton steps that leave
+    their bracket fall back to bisection, the bracket shrinks every step
+
+    :param func: function of an x array returning (values, slopes)
+    :param a: left ends of the brackets
+    :param b: right ends of the brackets
+    :param fa: values at the left ends
+    :param tol: relative step tolerance
+    :param iterations: maximum iterations
+    :returns: roots, one per bracket
+    """
+    xr = (a + b) / 2
+    for _ in range(iterations):
+        value, slope = func(xr)
+
+        # Keep the half of the bracket that still has the sign change
+        same = np.sign(value) == np.sign(fa)
+        a, fa = np.where(same, xr, a), np.where(same, value, fa)
+        b = np.where(same, b, xr)
+
+        with np.errstate(all='ignore'):
+            step = xr - value / slope
+        inside = (step >= a) & (step <= b)
+        new = np.where(value == 0, xr, np.where(inside, step, (a + b) / 2))
+        converged = np.abs(new - xr) <= tol * (1 + np.abs(xr))
+        xr = new
+        if converged.all():
+            break
+    return xr
+
+def distinct(points, tol=1e-9):
+    """
+    Sorted points without near duplicates (tile edges are sampled twice)
+    :param points: x values
+    :param tol: relative distance under which points are the same
+    :returns: sorted distinct points
+    """
+    points = np.sort(points)
+    keep = np.diff(points, prepend=-np.inf) > tol * (1 + np.abs(points))
+    return points[keep]
+
+def find_roots(func, xs, ys=None):
+    """
+    All real roots and local extrema on a sampled grid: sign changes of f
+    and f' are found on the grid then polished with Newton / bisection
+
+    :param func: function from compile_derivatives
+    :param xs: sorted sample x values
+    :param ys: masked samples of f on xs (sampled here if None)
+    :returns: dict of 'roots', 'minima' and 'maxima' x arrays
+    """
+    rows = func(xs)
+    rows[0] = mask_breaks(xs, rows[0]) if ys is None else ys
+    rows[1] = mask_breaks(xs, rows[1])
+    values = lambda pts: func(pts)[:2]
+    slopes = lambda pts: func(pts)[1:]
+
+    a, b, fa, exact = brackets(xs, rows[0])
+    roots = np.concatenate([polish(values, a, b, fa), exact])
+
+    a, b, fa, exact = brackets(xs, rows[1])
+    extrema = np.concatenate([polish(slopes, a, b, fa), exact])
+    f, df, d2f = func(extrema)
+
+    # Poles have a sign change too, only keep true zeros
+    scale = np.nanmax(np.abs(rows[0])) if np.isfinite(rows[0]).any() else 1.0
+    with np.errstate(invalid='ignore'):
+        roots = roots[np.abs(func(roots)[0]) <= 1e-8 * (1 + scale)]
+        # Double roots (ex. x^2 at 0) touch zero without a sign change
+        touching = extrema[np.abs(f) <= 1e-10 * (1 + scale)]
+        minima, maxima = extrema[d2f > 0], extrema[d2f < 0]
+    return {'roots': distinct(np.concatenate([roots, touching])),
+            'minima': distinct(minima), 'maxima': distinct(maxima)}
+
+def solve(ax, refresh=True):
+    """
+    Finds and marks the roots and local extrema of every function drawn
+    on ax within its visible x range, zooms / pans keep them updated
+
+    :param ax: matplotlib axes drawn by draw
+    :param refresh: render the canvas now
+    :returns: list with one find_roots dict per function (plus 'ms' timing), or None
+    """
+    view = views.get(ax)
+    if view is None:
+        return None
+    start = time.perf_counter()
+    if 'derivatives' not in view:
+        view['derivatives'] = [compile_derivatives(f) for f in view['exprs']]
+    for marker in view['markers']:
+        marker.remove()
+    view['markers'] = []
+
+    xmin, xmax = ax.get_xlim()
+    xs, ys = view['samples']
+    visible = (xs >= xmin) & (xs <= xmax)
+    results = []
+    for func, row, line in zip(view['derivatives'], ys, view['lines']):
+        found = find_roots(func, xs[visible], row[visible])
+        color = line.get_color()
+        view['markers'] += [
+            ax.plot(found['roots'], np.zeros(len(found['roots'])), 'o', color=color, markersize=5)[0],
+            ax.plot(found['minima'], func(found['minima'])[0], 'v', color=color, markersize=5)[0],
+            ax.plot(found['maxima'], func(found['maxima'])[0], '^', color=color, markersize=5)[0]]
+        results.append(found)
+
+    elapsed = (time.perf_counter() - start) * 1e3
+    for found in results:
+        found['ms'] = elapsed
+    view['solved'] = results
+    if refresh:
+        ax.figure.canvas.draw_idle()
+    return results
+
+
+# ------------------ 3D Drawing ------------------
+
+def kind(expr):
+    """
+    Kind of graph an input asks for
+
+    :param expr: user input
+    :returns: 'curve' for [x(t), y(t), z(t)], 'surface' for f(x, y), '2d' otherwise
+    """
+    if expr.strip().startswith('['):
+        return 'curve'
+    if any(y in f.free_symbols for f in parse_list(expr)):
+        return 'surface'
+    return '2d'
+
+def axes_for(ax, three_d):
+    """
+    Returns ax, or swaps it in its figure for a 3D / 2D axes as needed
+
+    :param ax: matplotlib axes
+    :param three_d: whether a 3D axes is needed
+    :returns: axes to draw on
+    """
+    if (ax.name == '3d') == three_d:
+        return ax
+    figure, spec = ax.figure, ax.get_subplotspec()
+    figure.delaxes(ax)
+    return figure.add_subplot(spec, projection='3d' if three_d else None)
+
+def surface_resolution(ax):
+    """
+    Rendered cells per axis of a surface, scaled to the viewport
+    :param ax: 3D axes
+    :returns: rows / columns to render
+    """
+    pixels = min(ax.bbox.width, ax.bbox.height)
+    return int(np.clip(pixels / PIXELS_PER_CELL, 16, SURFACE_SAMPLES))
+
+def draw_surface(ax, expr, x_range=X_RANGE, y_range=X_RANGE, n=SURFACE_SAMPLES, refresh=True):
+    """
+    Draws z = f(x, y), the whole mesh is evaluated in one vectorized call
+    and rendered at a resolution scaled to the viewport
+
+    :param ax: 3D axes
+    :param expr: expression in x and y
+    :param x_range: (xmin, xmax)
+    :param y_range: (ymin, ymax)
+    :param n: mesh samples per axis
+    :param refresh: render the canvas now
+    :returns: dict of timings in ms ('compile', 'sample', 'draw')
+    """
+    timings = {}
+    start = time.perf_counter()
+    f = parse(expr)
+    func = compile_exprs([f], (x, y))
+    timings['compile'] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    X, Y = np.meshgrid(np.linspace(*x_range, n), np.linspace(*y_range, n))
+    Z = func(X, Y)[0]
+    Z[~np.isfinite(Z)] = np.nan
+    timings['sample'] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    ax.clear()
+    res = surface_resolution(ax)
+    ax.plot_surface(X, Y, Z, rcount=res, ccount=res, cmap='viridis', linewidth=0)
+    limits = view_limits(Z.ravel())
+    if limits is not None:
+        ax.set_zlim(*limits)
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.set_title(f'$z = {smp.latex(f)}$')
+    if refresh:
+        ax.figure.canvas.draw()
+    timings['draw'] = (time.perf_counter() - start) * 1e3
+    return timings
+
+def draw_curve(ax, vec, t_range=T_RANGE, n=SAMPLES, refresh=True):
+    """
+    Draws a parametric curve r(t) = [x(t), y(t), z(t)] (as entered on the functions page)
+
+    :param ax: 3D axes
+    :param vec: curve expression
+    :param t_range: (t0, t1)
+    :param n: number of samples
+    :param refresh: render the canvas now
+    :returns: dict of timings in ms ('compile', 'sample', 'draw')
+    """
+    timings = {}
+    start = time.perf_counter()
+    r = str_to_field(vec)
+    func = compile_exprs(r, (t,))
+    timings['compile'] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    points = func(np.linspace(*t_range, n))
+    points[:, ~np.isfinite(points).all(axis=0)] = np.nan
+    timings['sample'] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    ax.clear()
+    ax.plot(*points, label=f'$r(t) = ({", ".join(smp.latex(c) for c in r)})$')
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.set_zlabel('z')
+    ax.legend(loc='upper right')
+    if refresh:
+        ax.figure.canvas.draw()
+    timings['draw'] = (time.perf_counter() - start) * 1e3
+    return timings
+
+def plot(ax, expr):
+    """
+    Draws any graph kind, swapping ax for a 3D axes when needed
+
+    :param ax: matplotlib axes
+    :param expr: user input
+    :returns: (axes drawn on, timings)
+    """
+    graph_kind = kind(expr)
+    ax = axes_for(ax, graph_kind != '2d')
+    if graph_kind == 'curve':
+        return ax, draw_curve(ax, expr)
+    if graph_kind == 'surface':
+        return ax, draw_surface(ax, expr)
+    return ax, draw(ax, expr)
+
+def graph(expr, ax=None):
+    """
+    Graphs an expression (or several separated by ';'), a surface z = f(x, y)
+    or a parametric curve [x(t), y(t), z(t)], onto ax when given
+    (embedded canvas, replaced by a 3D axes for 3D graphs),
+    otherwise in a separate matplotlib window
+
+    :param expr: expression(s) to be graphed
+    :param ax: matplotlib axes to draw on
+    :returns: timings in ms, or None if the expression can't be graphed
+    """
+
+    if ax is None:
+        import matplotlib.pyplot as plt
+        ax = plt.figure().add_subplot()
+        try:
+            timings = plot(ax, expr)[1]
+        except Exception:
+            plt.close(ax.figure)
+            return None
+        plt.show()
+        return timings
+
     try:
-        plot = smp.plot(f, legend=True, show=False)
-    except:
-        return
-    plot.show()
+        return plot(ax, expr)[1]
+    except Exception:
+        return None
 
 
 # Test:
 if __name__ == '__main__':
     expression = '4x + x^2'
-    print(graph(expression))
\ No newline at end of file
+    print(graph(expression))
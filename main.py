@@ -9,10 +9,14 @@ Description:
 """
 
 import customtkinter as ctk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from calculator import calculate
+from worksheet import Worksheet
 from vector import vector_calc
-from graph import graph
+from graph import graph, zoom, solve
 from solver_ai import generate
+import profiling
 
 
 # Setup window
@@ -53,21 +57,30 @@ wp_menu.pack(padx=15, pady=(50, 30))
 main_frame = ctk.CTkFrame(root, fg_color='#3f3f3f')
 main_frame.pack(fill='x', padx=20)
 
+# Built page frames, page function -> frame (False rebuilds pages on every switch)
+RETAIN_PAGES = True
+pages = {}
 
-def calc_page():
+
+def calc_page(page_frame):
     """
     Creates calculator page (p.1) using customtkinter as well as implements 
     calculation functions
+
+    :param page_frame: frame the page is built in
     """
 
     # Calculator buttons
-    top_frame = ctk.CTkFrame(main_frame, fg_color='#3f3f3f')
+    top_frame = ctk.CTkFrame(page_frame, fg_color='#3f3f3f')
     top_frame.pack(fill='x', padx=20)
     b1_frame = ctk.CTkFrame(top_frame, fg_color='#545454')
     b1_frame.pack(fill='x', padx=(15, 15), pady=(15, 10))
     b2_frame = ctk.CTkFrame(top_frame, fg_color='#545454')
     b2_frame.pack(fill='x', padx=(15, 15), pady=(0, 15))
 
+    # Named cells of the worksheet (name := expr)
+    sheet = Worksheet()
+
     def click_button(value):
         """
         Command called by any button press
@@ -93,7 +106,17 @@ def calc_page():
             # Get conditions array
             condi = [wrt.get(), lim.get(), integral_l.get(),
                           integral_r.get(), sum_i.get(), sum_n.get()]
-            result = calculate(expr, condi)
+
+            # name := expr edits a worksheet cell, cells depending on it are recomputed
+            if ':=' in expr:
+                name, cell = [part.strip() for part in expr.split(':=', 1)]
+                try:
+                    sheet.set(name, cell, condi)
+                    result = f'{name} = {sheet.display(name)}'
+                except ValueError:
+                    result = 'ERROR'
+            else:
+                result = calculate(expr, condi)
             entrybox.delete(0, ctk.END)
 
             if str(result) == None:
@@ -149,6 +172,9 @@ def calc_page():
     sec = calc_buttons(b2_frame, 'sec', lambda: click_button('sec('))
     csc = calc_buttons(b2_frame, 'csc', lambda: click_button('csc('))
     cot = calc_buttons(b2_frame, 'cot', lambda: click_button('cot('))
+    solve_eq = calc_buttons(b2_frame, 'solve', lambda: click_button('solve['))  # conditional: wrt, equations split by ;
+    ode = calc_buttons(b2_frame, 'ode', lambda: click_button('ode['))  # conditional: upper ∫ bound = t the numeric result is reported at
+    taylor = calc_buttons(b2_frame, 'taylor', lambda: click_button('taylor['))  # conditional: wrt, lim -> point, Σ n = order
 
     sigma.pack(padx=(20,10), pady=10, side='left')
     pow.pack(padx=(20,10), pady=10, side='left')
@@ -159,10 +185,13 @@ def calc_page():
     sec.pack(padx=(20,10), pady=10, side='left')
     csc.pack(padx=(20,10), pady=10, side='left')
     cot.pack(padx=(20,10), pady=10, side='left')
+    solve_eq.pack(padx=(20,10), pady=10, side='left')
+    ode.pack(padx=(20,10), pady=10, side='left')
+    taylor.pack(padx=(20,10), pady=10, side='left')
 
 
     # Conditional select
-    mid_frame = ctk.CTkFrame(main_frame, border_width=5)
+    mid_frame = ctk.CTkFrame(page_frame, border_width=5)
     mid_frame.pack(padx=140, pady=(20,5), fill='both')
     vars_title = ctk.CTkLabel(mid_frame, text='Conditions:', font=ctk.CTkFont(weight='bold'))
     vars_title.pack(pady=(5, 10))
@@ -180,7 +209,7 @@ def calc_page():
     lim.pack(side='left', pady=(0, 15))
 
     # integral conditional entryboxes
-    integral_lbl = ctk.CTkLabel(mid_frame, text='∫:')
+    integral_lbl = ctk.CTkLabel(mid_frame, text='∫ (top = ode t):')  # ode reports numeric solutions at the upper bound
     integral_l = ctk.CTkEntry(mid_frame, width=40, height=25)  # left bound = _
     integral_r = ctk.CTkEntry(mid_frame, width=40, height=25)  # right bound = _
     integral_lbl.pack(side='left', padx=(20, 10), pady=(0, 15))
@@ -200,12 +229,12 @@ def calc_page():
     sum_n.pack(side='left', pady=(0, 15), padx=(0, 15))
 
     # EntryBox
-    entrybox = ctk.CTkEntry(main_frame, width=700, height=100, font=ctk.CTkFont(size=30))
+    entrybox = ctk.CTkEntry(page_frame, width=700, height=100, font=ctk.CTkFont(size=30))
     entrybox.pack(pady=(30, 15))
 
     # Calculate / clear buttons
-    calc_btn = ctk.CTkButton(main_frame, text='calculate', command = lambda: click_button('calculate'))
-    clear_btn = ctk.CTkButton(main_frame, text='clear', fg_color='#ff4f4b', command = lambda: click_button('clear'))
+    calc_btn = ctk.CTkButton(page_frame, text='calculate', command = lambda: click_button('calculate'))
+    clear_btn = ctk.CTkButton(page_frame, text='clear', fg_color='#ff4f4b', command = lambda: click_button('clear'))
     calc_btn.pack(padx=150, fill='x', pady=(5, 20))
     clear_btn.pack(pady=(0, 20))
 
@@ -213,25 +242,31 @@ def calc_page():
 # Initialize entryboxes for vector_page to be accessed in build()
 a_entry, b_entry, result_entry = None, None, None
 
-def vector_page():
-    """Creates vector function page (p.2) using customtkinter and handles input"""
+def vector_page(page_frame):
+    """
+    Creates vector function page (p.2) using customtkinter and handles input
+
+    :param page_frame: frame the page is built in
+    """
 
     # Choose operation menu drop-down
     fnction_lst = ['[select]', 'vector addition', 'dot product', 'cross product', 'projection', 
-                   'determinant', 'norm of vector', 'arc length', 'derivative']
-    vector_title = ctk.CTkLabel(main_frame, text='Vector Calculator', 
+                   'determinant', 'inverse', 'norm of vector', 'arc length', 'derivative', 'gradient',
+                   'divergence', 'curl', 'laplacian', 'directional deriv', 'line integral',
+                   'surface integral']
+    vector_title = ctk.CTkLabel(page_frame, text='Vector Calculator', 
                                 font = ctk.CTkFont(weight='bold', size=40))
-    drop_frame = ctk.CTkFrame(main_frame, border_width=5, width=100, height=50, fg_color='#545454')
+    drop_frame = ctk.CTkFrame(page_frame, border_width=5, width=100, height=50, fg_color='#545454')
     drop_title = ctk.CTkLabel(drop_frame, text='Choose Operation:', 
                               font=ctk.CTkFont(weight='bold', size=15))
     vector_drop = ctk.CTkComboBox(drop_frame, values=fnction_lst, width=200)  # Drop down select
-    func_frame = ctk.CTkFrame(main_frame, border_width=5, height=240)
+    func_frame = ctk.CTkFrame(page_frame, border_width=5, height=240)
     reset_btn = ctk.CTkButton(drop_frame, text='reset', width=40, fg_color='#36454f', 
                               font=ctk.CTkFont(size=10, weight='bold'), command = lambda: reset())
     choose_btn = ctk.CTkButton(drop_frame, text='☑', width=40, command = lambda: select())  # Choose from drop down
-    calc_btn = ctk.CTkButton(main_frame, text='calculate', width=400,
+    calc_btn = ctk.CTkButton(page_frame, text='calculate', width=400,
                              command = lambda: calc(vector_drop.get()))  # Calculate (based on drop down)
-    clear_btn = ctk.CTkButton(main_frame, text='clear', fg_color='#ff4f4b', width=100, 
+    clear_btn = ctk.CTkButton(page_frame, text='clear', fg_color='#ff4f4b', width=100, 
                               command = lambda: clear())
 
     vector_title.pack(fill='x', padx=20, pady=(30, 0))
@@ -256,10 +291,11 @@ def vector_page():
             build(vector_drop.get())  # Call build
 
     def reset():
-        """Resets entire page for new select"""
+        """Resets page to the base page for new select (widgets are kept)"""
 
-        delete_frames(main_frame)
-        vector_page()  # Rebuild to base page
+        delete_frames(vec_frame)
+        vec_frame.pack_forget()
+        vector_drop.set('[select]')
 
     def clear():
         """Clear all input fields in vec_frame (housing user text input)"""
@@ -289,12 +325,28 @@ def vector_page():
             result_entry.insert(0, str(vector_calc('cross', a_entry.get(), b_entry.get())))
         elif func_selected == 'determinant':
             result_entry.insert(0, str(vector_calc('det', a_entry.get())))
+        elif func_selected == 'inverse':
+            result_entry.insert(0, str(vector_calc('inv', a_entry.get())))
         elif func_selected == 'norm of vector':
             result_entry.insert(0, str(vector_calc('norm', a_entry.get())))
         elif func_selected == 'arc length':
             result_entry.insert(0, str(vector_calc('length', a_entry.get())))
         elif func_selected == 'derivative':
             result_entry.insert(0, str(vector_calc('deriv', a_entry.get())))
+        elif func_selected == 'gradient':
+            result_entry.insert(0, str(vector_calc('grad', a_entry.get())))
+        elif func_selected == 'divergence':
+            result_entry.insert(0, str(vector_calc('div', a_entry.get())))
+        elif func_selected == 'curl':
+            result_entry.insert(0, str(vector_calc('curl', a_entry.get())))
+        elif func_selected == 'laplacian':
+            result_entry.insert(0, str(vector_calc('laplacian', a_entry.get())))
+        elif func_selected == 'directional deriv':
+            result_entry.insert(0, str(vector_calc('directional', a_entry.get(), b_entry.get())))
+        elif func_selected == 'line integral':
+            result_entry.insert(0, str(vector_calc('line', a_entry.get(), b_entry.get())))
+        elif func_selected == 'surface integral':
+            result_entry.insert(0, str(vector_calc('surface', a_entry.get(), b_entry.get())))
 
     def build(drop_type):
         """
@@ -313,13 +365,22 @@ def vector_page():
                 'cross product': 'a x b  = ', 
                 'projection': 'proj  = ',
                 'determinant': 'det  =',
+                'inverse': 'a⁻¹  =',
                 'norm of vector': '||a||  =',
                 'arc length': 'L  =',
-                'derivative': 'deriv  ='}
+                'derivative': 'deriv  =',
+                'gradient': '∇f  =',
+                'divergence': '∇·F  =',
+                'curl': '∇×F  =',
+                'laplacian': '∇²f  =',
+                'directional deriv': 'D_b a  =',
+                'line integral': '∫_b a  =',
+                'surface integral': '∬_b a  ='}
         
         # Frame / page structure for vector addition, dot product, cross product, and projection function selections
         if drop_type == 'vector addition' or drop_type == 'dot product' or \
-            drop_type =='cross product' or drop_type == 'projection':
+            drop_type =='cross product' or drop_type == 'projection' or \
+            drop_type in ('directional deriv', 'line integral', 'surface integral'):
             
             seper_1 = ctk.CTkFrame(vec_frame, width=450, height=50)
             seper_2 = ctk.CTkFrame(vec_frame, width=450, height=50)
@@ -339,9 +400,10 @@ def vector_page():
             vec_b.pack(padx=(20, 10), pady=10, side='left')
             b_entry.pack(padx=(0, 20), pady=10, side='left')
         
-        # Frame / page structure for determinant, norm of vector, arc length, and derivative function selections
-        elif drop_type == 'determinant' or drop_type == 'norm of vector' or \
-            drop_type == 'arc length' or drop_type == 'derivative':
+        # Frame / page structure for determinant, inverse, norm of vector, arc length, derivative and field function selections
+        elif drop_type in ('determinant', 'inverse') or drop_type == 'norm of vector' or \
+            drop_type == 'arc length' or drop_type == 'derivative' or \
+            drop_type in ('gradient', 'divergence', 'curl', 'laplacian'):
 
             seper = ctk.CTkFrame(vec_frame, width=450, height=50)
             result_entry = ctk.CTkEntry(vec_frame, width=520, height=40, border_width=3, font = ctk.CTkFont(size=20),
@@ -356,42 +418,96 @@ def vector_page():
             a_entry.pack(padx=(0, 20), side='left')
 
 
-def graphs_page():
+def graphs_page(page_frame):
     """
     Creates graph page (p.3) using customtkinter 
     to represent graphs from user input functions
+
+    :param page_frame: frame the page is built in
     """
 
     # f(x) entrybox
-    graph_title = ctk.CTkLabel(main_frame, text='function:', 
+    graph_title = ctk.CTkLabel(page_frame, text='function:', 
                                font = ctk.CTkFont(size=20, weight='bold'))
-    func_frame = ctk.CTkFrame(main_frame, height=50, fg_color='#545454', 
+    func_frame = ctk.CTkFrame(page_frame, height=50, fg_color='#545454', 
                               border_width=3, border_color='#aaaaaa')
     f_enter = ctk.CTkButton(func_frame, text='☑', width=40, 
                             command = lambda: draw(f_entry.get()))
     f_title = ctk.CTkLabel(func_frame, text='f ( x )  =', 
                            font = ctk.CTkFont(size=15, slant='italic'))
-    f_entry = ctk.CTkEntry(func_frame)
-    graph_title.pack(fill='x', padx=20, pady=(200, 15))
-    func_frame.pack(fill='x', padx=100, pady=(0, 235))
+    f_entry = ctk.CTkEntry(func_frame, placeholder_text='f(x), several separated by ;  |  f(x, y)  |  [x(t), y(t), z(t)]')
+    f_solve = ctk.CTkButton(func_frame, text='solve', width=60, fg_color='#36454f',
+                            command = lambda: find())
+    graph_title.pack(fill='x', padx=20, pady=(15, 5))
+    func_frame.pack(fill='x', padx=100, pady=(0, 10))
+    f_solve.pack(padx=(0, 20), pady=15, side='right')
     f_enter.pack(padx=(20, 0), pady=15, side='left')
     f_title.pack(padx=20, pady=15, side='left')
     f_entry.pack(fill='x', padx=(0, 50), pady=15)
 
+    # Embedded matplotlib canvas
+    figure = Figure(figsize=(7.5, 4.3), dpi=100, facecolor='#3f3f3f')
+    figure.add_subplot()
+    canvas = FigureCanvasTkAgg(figure, master=page_frame)
+    canvas.get_tk_widget().pack(padx=20, pady=(0, 5))
+
+    # Zoom / pan from the toolbar or scroll wheel, curves resample for the new view
+    toolbar = NavigationToolbar2Tk(canvas, page_frame, pack_toolbar=False)
+    toolbar.pack(pady=(0, 5))
+    canvas.mpl_connect('scroll_event', lambda event: scroll(event))
+    time_lbl = ctk.CTkLabel(page_frame, text='', font = ctk.CTkFont(size=12))
+    time_lbl.pack(pady=(0, 10))
+
+    def scroll(event):
+        """
+        Zooms in / out around the cursor on mouse scroll
+
+        :param event: matplotlib scroll event
+        """
+
+        # 3D graphs zoom / rotate with matplotlib's own mouse handling
+        ax = figure.axes[0]
+        if event.inaxes is ax and ax.name != '3d':
+            zoom(ax, (event.xdata, event.ydata), 0.8 if event.button == 'up' else 1.25)
+
+    def find():
+        """Finds and marks roots / extrema of the graphed functions in the visible range"""
+
+        results = solve(figure.axes[0])
+        if results is None:
+            # Nothing drawn, or a 3D graph
+            return
+
+        def listed(points):
+            shown = ', '.join(f'{p:.4g}' for p in points[:4])
+            return shown + (f' (+{len(points) - 4})' if len(points) > 4 else '')
+
+        found = results[0]
+        time_lbl.configure(text=f"roots: {listed(found['roots'])}  |  min: {listed(found['minima'])}  |  "
+                                f"max: {listed(found['maxima'])}  ({found['ms']:.1f} ms)")
+
     def draw(expr):
         """
-        Outputs a graph using user input function upon press 
-        of f_enter & clear f_entry after graph displayed
+        Draws a graph of the user input function onto the embedded 
+        canvas upon press of f_enter & clear f_entry after graph displayed
 
         :param expr: user input function
         """
 
         f_entry.delete(0, ctk.END)
-        graph(expr)
+        timings = graph(expr, figure.axes[0])  # axes is swapped for 3D graphs
+        if timings is None:
+            time_lbl.configure(text='ERROR')
+        else:
+            time_lbl.configure(text=f"sampled in {timings['sample']:.1f} ms, drawn in {timings['draw']:.1f} ms")
 
 
-def wp_page():
-    """Creates word problem page (p.4) using costumtkinter"""
+def wp_page(page_frame):
+    """
+    Creates word problem page (p.4) using costumtkinter
+
+    :param page_frame: frame the page is built in
+    """
 
     def solve():
         """
@@ -405,16 +521,16 @@ def wp_page():
         chat_text.insert('1.0', answer)
 
     # Construct page
-    problem_lbl = ctk.CTkLabel(main_frame, text='Enter Problem:', font = ctk.CTkFont(size=15, weight='bold'))
-    problem_text = ctk.CTkTextbox(main_frame, border_width=5, width=600, height=110, font = ctk.CTkFont(size=20))
-    enter_btn = ctk.CTkButton(main_frame, text='solve', command = lambda: solve())
+    problem_lbl = ctk.CTkLabel(page_frame, text='Enter Problem:', font = ctk.CTkFont(size=15, weight='bold'))
+    problem_text = ctk.CTkTextbox(page_frame, border_width=5, width=600, height=110, font = ctk.CTkFont(size=20))
+    enter_btn = ctk.CTkButton(page_frame, text='solve', command = lambda: solve())
     problem_lbl.pack(pady=(20, 10))
     problem_text.configure(spacing1=5, spacing2=5)
     problem_text.pack(padx=30)
     problem_text.mark_set('insert', '1.0')
     enter_btn.pack(pady=(10, 10), fill='x', padx=110)
 
-    chat_text = ctk.CTkTextbox(main_frame, border_width=5, width=500, height=245, font = ctk.CTkFont(size=20))
+    chat_text = ctk.CTkTextbox(page_frame, border_width=5, width=500, height=245, font = ctk.CTkFont(size=20))
     chat_text.configure(spacing1=5, spacing2=5)
     chat_text.pack(padx=50, pady=(35, 40))
     chat_text.mark_set('insert', '1.0')
@@ -437,6 +553,24 @@ def delete_frames(frame):
     for f in frame.winfo_children():
         f.destroy()
 
+def show_page(page):
+    """
+    Shows a page's frame, hiding the others. Each page is built on
+    its first visit and then kept, so its input state survives switches
+
+    :param page: page function, builds the page into the frame it is given
+    """
+
+    frame = pages.get(page)
+    if frame is None:
+        frame = ctk.CTkFrame(main_frame, fg_color='#3f3f3f')
+        page(frame)
+        pages[page] = frame
+    for other in pages.values():
+        if other is not frame:
+            other.pack_forget()
+    frame.pack(fill='x')
+
 def indicate(menu, page):
     """
     Switches pages and updates button color
@@ -447,10 +581,19 @@ def indicate(menu, page):
 
     reset_indicators()
     menu.configure(fg_color='#624aa1', border_width=3)  # Change selected button to purple
-    delete_frames(main_frame)
-    page()  # Calls page's function
+
+    # Switch latency (until the page is laid out) is recorded as main.page_switch
+    start = profiling.now()
+    if RETAIN_PAGES:
+        show_page(page)
+    else:
+        delete_frames(main_frame)
+        page(main_frame)  # Calls page's function
+    main_frame.update_idletasks()
+    profiling.record('main.page_switch', profiling.now() - start)
 
 
 # Create & run window:
-indicate(calc_menu, calc_page)  # Always start on calculator page
-root.mainloop()
+if __name__ == '__main__':
+    indicate(calc_menu, calc_page)  # Always start on calculator page
+    root.mainloop()
@@ -0,0 +1,141 @@
+"""
+File: memory.py
+Description:
+    Memory budget for long-running processes. sympy keeps one LRU cache per cached
+    function (SYMPY_CACHE_SIZE entries each, read once at import), so their total
+    is capped here and cleared when over budget, on a timer, or when process RSS
+    passes a limit. Exposes current cache sizes and RSS.
+"""
+
+import gc
+import os
+import sys
+import time
+import sympy as smp
+from sympy.core.cache import CACHE
+
+
+# cache_entries: total entries across sympy caches before clearing, rss_mb: clear when
+# RSS is above this (None = off), clear_seconds: clear at least this often (None = off),
+# check_every: requests between checks
+settings = {'cache_entries': 20_000, 'rss_mb': None, 'clear_seconds': 600, 'check_every': 256}
+
+state = {'requests': 0, 'cleared_at': time.monotonic(), 'clears': 0}
+
+
+# ------------------ Reading ------------------
+
+def currsize(func):
+    """
+    :param func: cached sympy function (SYMPY_USE_CACHE=debug wrappers have no cache_info)
+    :returns: entries held
+    """
+    info = getattr(func, 'cache_info', None)
+    return info().currsize if info else 0
+
+def cache_sizes():
+    """
+    Entries held by each sympy cache
+
+    :returns: {function name: current size}, only non-empty caches
+    """
+    sizes = {}
+    for func in CACHE:
+        size = currsize(func)
+        if size:
+            name = getattr(func, '__qualname__', repr(func))
+            sizes[name] = sizes.get(name, 0) + size
+    return sizes
+
+def cache_entries():
+    """
+    :returns: total entries across sympy caches
+    """
+    return sum(currsize(func) for func in CACHE)
+
+def rss_mb():
+    """
+    Resident set size of this process
+
+    :returns: MB, or None when the platform has no way to read it
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        return None
+
+def usage():
+    """
+    Current memory use
+
+    :returns: {'rss_mb', 'sympy_cache_entries', 'sympy_caches', 'graph_tiles', 'clears'}
+    """
+    graph = sys.modules.get('graph')
+    return {'rss_mb': rss_mb(), 'sympy_cache_entries': cache_entries(), 'sympy_caches': cache_sizes(),
+            'graph_tiles': len(graph.sample_cache) if graph else 0, 'clears': state['clears']}
+
+
+# ------------------ Budget ------------------
+
+def clear():
+    """Empties the sympy caches (and graph tiles if graphing is loaded) and collects garbage"""
+    smp.core.cache.clear_cache()
+    graph = sys.modules.get('graph')
+    if graph:
+        graph.clear_cache()
+    gc.collect()
+    state['cleared_at'] = time.monotonic()
+    state['clears'] += 1
+
+def tick():
+    """
+    Counts a request, and every check_every requests clears the caches if
+    they are over budget, RSS is over its limit, or the clear interval passed
+
+    :returns: whether caches were cleared
+    """
+    state['requests'] += 1
+    if state['requests'] % settings['check_every']:
+        return False
+
+    over = cache_entries() > settings['cache_entries']
+    if not over and settings['clear_seconds'] is not None:
+        over = time.monotonic() - state['cleared_at'] > settings['clear_seconds']
+    if not over and settings['rss_mb'] is not None:
+        rss = rss_mb()
+        over = rss is not None and rss > settings['rss_mb']
+    if over:
+        clear()
+    return over
+
+def set_budget(cache_entries=None, rss_mb=None, clear_seconds=None, check_every=None):
+    """
+    Updates the memory budget (None keeps current value, negative rss_mb /
+    clear_seconds turns that trigger off)
+
+    :param cache_entries: total sympy cache entries allowed
+    :param rss_mb: RSS that forces a clear
+    :param clear_seconds: longest time between clears
+    :param check_every: requests between checks
+    :returns: updated settings
+    """
+    if cache_entries is not None:
+        settings['cache_entries'] = int(cache_entries)
+    if rss_mb is not None:
+        settings['rss_mb'] = None if rss_mb < 0 else rss_mb
+    if clear_seconds is not None:
+        settings['clear_seconds'] = None if clear_seconds < 0 else clear_seconds
+    if check_every is not None:
+        settings['check_every'] = max(int(check_every), 1)
+    return dict(settings)
+
+
+# Test:
+if __name__ == '__main__':
+    print(usage())
@@ -0,0 +1,291 @@
+"""
+File: odes.py
+Description:
+    Solves ordinary differential equations for the ode operation of calculator.py.
+    Equations in x(t), y(t), z(t) with primes for derivatives (y'' + y = 0) are
+    reduced to a first order system. smp.dsolve is tried for a closed form under
+    a time budget, otherwise the system is integrated with scipy's solve_ivp using
+    a lambdified vectorized right-hand side and a symbolic Jacobian. Batches of
+    initial conditions (parameter sweeps) are integrated as one block diagonal system.
+"""
+
+import re
+import numpy as np
+import sympy as smp
+from scipy import sparse
+from scipy.integrate import solve_ivp
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication
+from equations import within
+import session
+
+
+# Symbolic initialization
+t = smp.symbols('t')
+dependent = ['x', 'y', 'z']
+MAX_ORDER = 9
+
+# Names users type that sympy spells differently, y' is read as y_1, y'' as y_2 ...
+ode_locals = {'t': t, 'π': smp.pi, 'e': smp.E, 'ln': smp.log}
+ode_locals.update({f'{v}_{k}': smp.Symbol(f'{v}_{k}') for v in dependent for k in range(MAX_ORDER + 1)})
+transformations = standard_transformations + (implicit_multiplication,)
+
+# Seconds smp.dsolve may take before integrating numerically, default span
+# past t0 when no end is given, tolerances and the size of a batched system
+# above which the sparse Jacobian / BDF is used instead of LSODA
+SYMBOLIC_SECONDS = 2.0
+T_SPAN = 10.0
+RTOL = 1e-8
+ATOL = 1e-10
+DENSE_STATES = 64
+
+# Methods that use the Jacobian
+implicit = ['Radau', 'BDF', 'LSODA']
+
+# y(0) = 1, y'(2) = 0 (clean may have put a '*' before the parenthesis)
+initial = re.compile(r"^([xyz])('*)\*?\((.+)\)$")
+
+
+# ------------------ Parsing ------------------
+
+def state(name, order):
+    """
+    :param name: dependent variable
+    :param order: derivative order
+    :returns: symbol standing for the order-th derivative of name
+    """
+    return ode_locals[f'{name}_{order}']
+
+def to_symbols(text):
+    """
+    Rewrites y'' -> y_2, y' -> y_1, y(t) / y -> y_0 and parses the result
+
+    :param text: one side of an equation
+    :returns: sympy expression
+    """
+    text = re.sub(r"(?<![A-Za-z_])([xyz]'*)\*?\(t\)", r'\1', text)
+    text = re.sub(r"(?<![A-Za-z_])([xyz])('+)", lambda m: f'{m[1]}_{len(m[2])}', text)
+    text = re.sub(r'(?<![A-Za-z_])([xyz])(?![A-Za-z_0-9])', r'\1_0', text)
+    return parse_expr(text, local_dict={**ode_locals, **session.names}, transformations=transformations)
+
+def parse_ode(expr):
+    """
+    Parses equations and initial conditions separated by ';'
+
+    :param expr: e.g. y'' + y = 0; y(0) = 1; y'(0) = 0
+    :returns: (list of sympy expressions equal to zero, {state symbol: (t0, value)})
+    """
+    system, ics = [], {}
+    for part in expr.replace(' ', '').split(';'):
+        if not part:
+            continue
+        sides = part.split('=')
+        if len(sides) > 2:
+            raise ValueError(f'more than one = in {part}')
+        condition = initial.match(sides[0])
+        if condition and len(sides) == 2 and condition[3] != 't':
+            name, primes, at = condition[1], condition[2], condition[3]
+            ics[state(name, len(primes))] = (smp.sympify(at, locals=ode_locals), smp.sympify(sides[1], locals=ode_locals))
+            continue
+        rhs = to_symbols(sides[1]) if len(sides) == 2 else 0
+        system.append(to_symbols(sides[0]) - rhs)
+    if not system:
+        raise ValueError('no equations')
+    return system, ics
+
+def orders(system):
+    """
+    :param system: list of sympy expressions
+    :returns: {dependent variable: highest derivative order}
+    """
+    found = {}
+    for symbol in set().union(*[eq.free_symbols for eq in system]):
+        name, _, k = symbol.name.partition('_')
+        if name in dependent and k.isdigit():
+            found[name] = max(found.get(name, 0), int(k))
+    return dict(sorted(found.items()))
+
+def first_order(system):
+    """
+    Reduces a system to first order: y'' = f becomes y_0' = y_1, y_1' = f
+
+    :param system: list of sympy expressions equal to zero
+    :returns: (states, rhs), d/dt states[i] = rhs[i]
+    """
+    highest = orders(system)
+    if not highest or min(highest.values()) < 1:
+        raise ValueError('every dependent variable needs a derivative')
+    tops = [state(name, k) for name, k in highest.items()]
+    solved = smp.solve(system, tops, dict=True)
+    if not solved:
+        raise ValueError('could not solve for the highest derivatives')
+
+    states, rhs = [], []
+    for name, k in highest.items():
+        for order in range(k):
+            states.append(state(name, order))
+            rhs.append(state(name, order + 1) if order < k - 1 else solved[0][state(name, k)])
+    return states, rhs
+
+
+# ------------------ Closed form ------------------
+
+def closed_form(system, ics=None, seconds=SYMBOLIC_SECONDS):
+    """
+    smp.dsolve with a time budget
+
+    :param system: list of sympy expressions equal to zero
+    :param ics: {state symbol: (t0, value)}
+    :param seconds: time budget
+    :returns: list of sympy Eq, or None when dsolve failed or ran out of time
+    """
+    funcs = {name: smp.Function(name)(t) for name in orders(system)}
+    derivs = {state(name, k): f.diff(t, k) if k else f for name, f in funcs.items() for k in range(MAX_ORDER + 1)}
+    eqs = [smp.Eq(eq.xreplace(derivs), 0) for eq in system]
+    conditions = {derivs[s].subs(t, t0): value for s, (t0, value) in (ics or {}).items()} or None
+
+    if len(eqs) == 1:
+        result = within(seconds, smp.dsolve, eqs[0], list(funcs.values())[0], ics=conditions)
+    else:
+        result = within(seconds, smp.dsolve, eqs, list(funcs.values()), ics=conditions)
+    if result is None:
+        return None
+    return result if isinstance(result, list) else [result]
+
+
+# ------------------ Numeric ------------------
+
+def compile_rhs(states, rhs):
+    """
+    Lambdifies the right-hand side and its Jacobian once
+
+    :param states: n state symbols
+    :param rhs: n expressions of t and the states
+    :returns: (f, jac), f(t, rows) maps n rows of states to n rows of derivatives,
+              jac(t, rows) gives the (n, n, *row shape) Jacobian
+    """
+    f = smp.lambdify([t] + states, rhs, 'numpy', cse=True)
+    j = smp.lambdify([t] + states, list(smp.Matrix(rhs).jacobian(states)), 'numpy', cse=True)
+    n = len(states)
+
+    def evaluate(func, time, rows):
+        # Constant entries come back as scalars
+        shape = np.shape(rows[0])
+        return np.stack([np.broadcast_to(np.asarray(v, dtype=float), shape) for v in func(time, *rows)])
+
+    return (lambda time, rows: evaluate(f, time, rows),
+            lambda time, rows: evaluate(j, time, rows).reshape(n, n, *np.shape(rows[0])))
+
+def run_batch(f, jac, batch, t_span, t_eval, method, rtol, atol):
+    """
+    One solve_ivp call for a (B, n) batch as a block diagonal system
+
+    :returns: (ts, ys of shape (B, n, len(ts)))
+    """
+    B, n = batch.shape
+
+    # State i of member b sits at i * B + b
+    rows, cols = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    members = np.arange(B)
+    index_rows = (rows[..., None] * B + members).ravel()
+    index_cols = (cols[..., None] * B + members).ravel()
+
+    def fun(time, state):
+        out = f(time, state.reshape(n, B, *state.shape[1:]))
+        return out.reshape(n * B, *state.shape[1:])
+
+    def jacobian(time, state):
+        blocks = jac(time, state.reshape(n, B)).ravel()
+        matrix = sparse.csc_matrix((blocks, (index_rows, index_cols)), shape=(n * B, n * B))
+        return matrix.toarray() if method == 'LSODA' else matrix
+
+    options = {'jac': jacobian} if method in implicit else {}
+    result = solve_ivp(fun, t_span, batch.T.ravel(), method=method, t_eval=t_eval,
+                       vectorized=True, rtol=rtol, atol=atol, **options)
+    if not result.success:
+        raise RuntimeError(result.message)
+    return result.t, result.y.reshape(n, B, -1).transpose(1, 0, 2)
+
+def integrate(states, rhs, y0, t_span, t_eval=None, method=None, together=True, rtol=RTOL, atol=ATOL):
+    """
+    Integrates a first order system for one or a batch of initial conditions.
+    The right-hand side and Jacobian are compiled once for the whole batch.
+    Together, the batch is one block diagonal system evaluated for every member
+    in one vectorized call, which is fastest when members behave alike. Stiff
+    members with fast transitions at different times force small steps on the
+    whole batch, and are better integrated separately (together=False)
+
+    :param states: n state symbols (from first_order)
+    :param rhs: n right-hand side expressions
+    :param y0: (n,) initial state, or (B, n) for a batch
+    :param t_span: (t0, t1)
+    :param t_eval: times to report (None: the solver's steps, needs together)
+    :param method: solve_ivp method (None: LSODA, BDF with a sparse Jacobian for large batches)
+    :param together: integrate a batch as one system
+    :returns: (ts, ys), ys of shape (n, len(ts)) or (B, n, len(ts))
+    """
+    f, jac = compile_rhs(states, rhs)
+    y0 = np.asarray(y0, dtype=float)
+    batch = np.atleast_2d(y0)
+    if not together and t_eval is None and len(batch) > 1:
+        raise ValueError('t_eval is needed to integrate a batch separately')
+
+    if together:
+        if method is None:
+            method = 'LSODA' if batch.size <= DENSE_STATES else 'BDF'
+        ts, ys = run_batch(f, jac, batch, t_span, t_eval, method, rtol, atol)
+    else:
+        runs = [run_batch(f, jac, member[None], t_span, t_eval, method or 'LSODA', rtol, atol) for member in batch]
+        ts, ys = runs[0][0], np.concatenate([run[1] for run in runs])
+    return ts, ys[0] if y0.ndim == 1 else ys
+
+
+# ------------------ Solve ------------------
+
+def solve_ode(expr, t_end=None, seconds=SYMBOLIC_SECONDS):
+    """
+    Closed form when dsolve finds one, otherwise values at t_end from
+    integrating the initial value problem
+
+    :param expr: equations and initial conditions separated by ';'
+    :param t_end: time the numeric solution is reported at (default t0 + T_SPAN)
+    :param seconds: time budget of dsolve
+    :returns: (list of sympy Eq or {'y(t_end)': value}, 'symbolic' or 'numeric')
+    """
+    system, ics = parse_ode(expr)
+    solution = closed_form(system, ics, seconds)
+    if solution is not None:
+        return solution, 'symbolic'
+
+    states, rhs = first_order(system)
+    missing = [s for s in states if s not in ics]
+    if missing:
+        raise ValueError(f'initial conditions needed for {missing}')
+    starts = {float(t0) for t0, _ in ics.values()}
+    if len(starts) > 1:
+        raise ValueError('initial conditions must be at one t')
+    t0 = starts.pop()
+    t1 = float(t_end) if t_end is not None else t0 + T_SPAN
+    y0 = [float(ics[s][1]) for s in states]
+
+    ts, ys = integrate(states, rhs, y0, (t0, t1), t_eval=[t1])
+    return {f'{s.name.split("_")[0]}({t1:g})': float(ys[i, -1]) for i, s in enumerate(states) if s.name.endswith('_0')}, 'numeric'
+
+def format_solution(solution):
+    """
+    'y(t) = cos(t)' / 'y(10) = -0.839071529' text of a solution
+
+    :param solution: list of sympy Eq or {name: value}
+    :returns: string
+    """
+    if isinstance(solution, dict):
+        return '; '.join(f'{name} = {value:.12g}' for name, value in solution.items())
+    return '; '.join(f'{eq.lhs} = {eq.rhs}' for eq in solution)
+
+
+# Test:
+if __name__ == '__main__':
+    print(format_solution(solve_ode("y' = -2y; y(0) = 1")[0]))
+    print(format_solution(solve_ode("y'' + y = 0")[0]))
+    print(solve_ode("y'' = -sin(y); y(0) = 1; y'(0) = 0", 10))
+    states, rhs = first_order(parse_ode("y' = -y")[0])
+    print(integrate(states, rhs, [[1.0], [2.0], [3.0]], (0, 1), t_eval=[1])[1].ravel() * np.e)
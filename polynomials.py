@@ -0,0 +1,363 @@
+"""
+File: polynomials.py
+Description:
+    Polynomial fast path of the calculator page. Polynomials in one of x, y, z
+    typed as sums of terms (3x^2 - x/2 + 1), or products of such sums in
+    parentheses, are read straight into exact coefficients instead of going
+    through sympify, and evaluation, d/dx, ∫, lim and solve run on them. Few
+    terms of high degree stay sparse ({degree: coefficient}), others are dense.
+    Values use Horner's method, roots the eigenvalues of the companion matrix
+    and high degree products an FFT convolution.
+"""
+
+import re
+from fractions import Fraction
+from math import lcm
+import numpy as np
+import sympy as smp
+import equations
+
+
+# The fast path can be switched off (benchmarks compare it with sympy)
+settings = {'enabled': True}
+
+# Sparse when fewer than 1 / SPARSE_RATIO of the coefficients up to the degree are nonzero
+SPARSE_RATIO = 8
+
+# Dense products above FFT_TERMS coefficients per factor use the FFT while
+# max |a| * max |b| * terms stays below FFT_EXACT (float64 still rounds exactly)
+FFT_TERMS = 64
+FFT_EXACT = 2 ** 40
+
+# solve leaves degrees up to SYMBOLIC_DEGREE to smp.solve, companion matrices
+# above it are only built up to MAX_ROOTS_DEGREE
+SYMBOLIC_DEGREE = 8
+MAX_ROOTS_DEGREE = 2000
+REAL_TOL = 1e-9
+
+poss_vars = ['x', 'y', 'z']
+
+# One term of a cleaned sum: 3, 3/2, x, 3*x**2, 3/2*x, x**2/2, 3*x**2/2 (sign split off)
+term = re.compile(r'(?:(\d+)(?:/(\d+))?(?:\*(?=[xyz]))?)?(?:([xyz])(?:\*\*(\d+))?)?(?:/(\d+))?')
+signed = re.compile(r'[+-]?[^+-]+')
+factors = re.compile(r'\(([^()]*)\)')
+factored = re.compile(r'\([^()]*\)(?:\*?\([^()]*\))*')
+number_text = re.compile(r'^-?\d+(?:/\d+)?$')
+
+
+# ------------------ Parsing ------------------
+
+def variable_of(text):
+    """
+    :param text: cleaned expression
+    :returns: the one variable (x, y or z) it is written in, or None
+    """
+    letters = set(re.findall(r'[A-Za-z_π]', text))
+    if len(letters) == 1 and letters <= set(poss_vars):
+        return letters.pop()
+    return None
+
+def parse_sum(text, var):
+    """
+    Reads a sum of terms c*var**k into exact coefficients
+
+    :param text: cleaned sum, e.g. 3*x**2-x/2+1
+    :param var: variable name
+    :returns: {degree: coefficient}, or None when text isn't such a sum
+    """
+    parts = signed.findall(text)
+    if not parts or ''.join(parts) != text:
+        return None
+    terms = {}
+    for part in parts:
+        sign = -1 if part[0] == '-' else 1
+        match = term.fullmatch(part.lstrip('+-'))
+        if not match:
+            return None
+        num, den, name, power, under = match.groups()
+        if (num is None and name is None) or (name is not None and name != var) or (under and name is None):
+            return None
+        divisor = int(den or 1) * int(under or 1)
+        if divisor == 0:
+            return None  # x/0 is left to sympy (zoo*x)
+        coeff = Fraction(sign * int(num or 1), divisor)
+        degree = 0 if name is None else int(power or 1)
+        terms[degree] = terms.get(degree, 0) + coeff
+    return {k: c for k, c in terms.items() if c}
+
+def parse(text, products=True, var=None):
+    """
+    Reads a polynomial, a sum or a product of parenthesized sums
+
+    :param text: cleaned expression
+    :param products: multiply out products of sums (off: only a single sum)
+    :param var: variable name (None: the one in text)
+    :returns: (variable, {degree: coefficient}), or None when text isn't a polynomial
+    """
+    var = var or variable_of(text)
+    if var is None:
+        return None
+    if '(' not in text:
+        terms = parse_sum(text, var)
+        return None if terms is None else (var, terms)
+
+    parts = factors.findall(text)
+    if not factored.fullmatch(text) or (len(parts) > 1 and not products):
+        return None
+    terms = {0: Fraction(1)}
+    for part in parts:
+        factor = parse_sum(part, var)
+        if factor is None:
+            return None
+        terms = multiply(terms, factor)
+    return var, terms
+
+def number(text):
+    """
+    :param text: bound / limit point, e.g. -3 or 1/2
+    :returns: Fraction, or None when it isn't a rational number
+    """
+    text = text.replace(' ', '')
+    if not number_text.match(text):
+        return None
+    try:
+        return Fraction(text)
+    except ZeroDivisionError:
+        return None
+
+
+# ------------------ Representation ------------------
+
+def is_sparse(terms):
+    """
+    :param terms: {degree: coefficient}
+    :returns: whether few of the coefficients up to the degree are nonzero
+    """
+    return bool(terms) and len(terms) * SPARSE_RATIO < max(terms) + 1
+
+def dense(terms):
+    """
+    :param terms: {degree: coefficient}
+    :returns: coefficient list, lowest degree first
+    """
+    coeffs = [0] * (max(terms) + 1 if terms else 1)
+    for k, c in terms.items():
+        coeffs[k] = c
+    return coeffs
+
+def integer_coeffs(terms):
+    """
+    Clears denominators
+
+    :param terms: {degree: coefficient}
+    :returns: (dense integer coefficients lowest degree first, common denominator)
+    """
+    den = lcm(*[Fraction(c).denominator for c in terms.values()]) if terms else 1
+    return [int(c * den) for c in dense(terms)], den
+
+
+# ------------------ Arithmetic ------------------
+
+def derivative(terms):
+    """
+    :param terms: {degree: coefficient}
+    :returns: derivative {degree: coefficient}
+    """
+    return {k - 1: c * k for k, c in terms.items() if k}
+
+def integral(terms):
+    """
+    :param terms: {degree: coefficient}
+    :returns: antiderivative without constant
+    """
+    return {k + 1: Fraction(c) / (k + 1) for k, c in terms.items()}
+
+def horner(terms, point):
+    """
+    Exact value at a point (Horner's method for dense polynomials,
+    term by term powers for sparse ones)
+
+    :param terms: {degree: coefficient}
+    :param point: Fraction
+    :returns: Fraction
+    """
+    if is_sparse(terms):
+        return sum((c * point ** k for k, c in terms.items()), Fraction(0))
+    value = Fraction(0)
+    for c in reversed(dense(terms)):
+        value = value * point + c
+    return value
+
+def fft_multiply(a, b):
+    """
+    Product of integer coefficient lists by FFT convolution, exact
+    while the coefficients stay below FFT_EXACT
+
+    :param a: integer coefficients, lowest degree first
+    :param b: integer coefficients, lowest degree first
+    :returns: integer coefficients of a * b
+    """
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+    product = np.fft.irfft(np.fft.rfft(np.array(a, dtype=float), n) * np.fft.rfft(np.array(b, dtype=float), n), n)
+    return [int(c) for c in np.rint(product[:size])]
+
+def multiply(a, b):
+    """
+    Product of two polynomials, term by term when that is cheaper than
+    a dense product, else FFT (or sympy's Karatsuba when the FFT can't
+    be exact) over integer coefficients
+
+    :param a: {degree: coefficient}
+    :param b: {degree: coefficient}
+    :returns: {degree: coefficient}
+    """
+    if not a or not b:
+        return {}
+    if len(a) * len(b) <= SPARSE_RATIO * (max(a) + max(b) + 1) or min(len(a), len(b)) <= FFT_TERMS:
+        product = {}
+        for i, ca in a.items():
+            for j, cb in b.items():
+                product[i + j] = product.get(i + j, 0) + ca * cb
+        return {k: c for k, c in product.items() if c}
+
+    (ia, da), (ib, db) = integer_coeffs(a), integer_coeffs(b)
+    bound = max(map(abs, ia)) * max(map(abs, ib)) * min(len(ia), len(ib))
+    if bound < FFT_EXACT:
+        coeffs = fft_multiply(ia, ib)
+    else:
+        gen = smp.Symbol('x')
+        product = smp.Poly(ia[::-1], gen, domain='ZZ') * smp.Poly(ib[::-1], gen, domain='ZZ')
+        coeffs = [int(c) for c in product.all_coeffs()[::-1]]
+    return {k: Fraction(c, da * db) for k, c in enumerate(coeffs) if c}
+
+def roots(terms):
+    """
+    Roots as eigenvalues of the companion matrix (np.roots) of the
+    square-free part, so repeated roots don't split into clusters
+
+    :param terms: {degree: coefficient}
+    :returns: real roots (floats, ascending), then complex roots (by real, imaginary part)
+    """
+    coeffs, _ = integer_coeffs(terms)
+    square_free = smp.Poly(coeffs[::-1], smp.Symbol('x'), domain='ZZ').sqf_part()
+    found = np.roots([float(c) for c in square_free.all_coeffs()])
+    scale = REAL_TOL * np.maximum(1.0, np.abs(found))
+    parts = np.column_stack([np.where(np.abs(found.real) <= scale, 0.0, found.real),
+                             np.where(np.abs(found.imag) <= scale, 0.0, found.imag)])
+    parts = equations.distinct(parts)
+    real = sorted(float(re) for re, im in parts if im == 0)
+    return real + sorted((complex(re, im) for re, im in parts if im != 0), key=lambda r: (r.real, r.imag))
+
+
+# ------------------ Formatting ------------------
+
+def term_text(k, c, var):
+    """
+    :returns: sympy's text of the term c*var**k (3*x**2/2, -x, 7 ...)
+    """
+    c = Fraction(c)
+    if k == 0:
+        return str(c)
+    power = var if k == 1 else f'{var}**{k}'
+    sign = '-' if c < 0 else ''
+    num, den = abs(c.numerator), c.denominator
+    text = power if num == 1 else f'{num}*{power}'
+    return f'{sign}{text}' if den == 1 else f'{sign}{text}/{den}'
+
+def to_text(terms, var):
+    """
+    Text of a polynomial in the order and spelling sympy prints it
+    (highest degree first, except a positive constant minus a term)
+
+    :param terms: {degree: coefficient}
+    :param var: variable name
+    :returns: string, e.g. 3*x**2 - x/2 + 1
+    """
+    if not terms:
+        return '0'
+    order = sorted(terms, reverse=True)
+    if len(order) == 2 and order[1] == 0 and terms[0] > 0 and terms[order[0]] < 0:
+        order.reverse()
+    text = term_text(order[0], terms[order[0]], var)
+    for k in order[1:]:
+        part = term_text(k, terms[k], var)
+        text += ' - ' + part[1:] if part[0] == '-' else ' + ' + part
+    return text
+
+
+# ------------------ Calculator ------------------
+
+def solve(expr, wrt=None):
+    """
+    Roots (real and complex) of one polynomial equation above SYMBOLIC_DEGREE
+
+    :param expr: cleaned equation, e.g. x**12-1=0 (no '=': equal to zero)
+    :param wrt: variable to solve for (None: the one in the equation)
+    :returns: solutions text, or None when the equation is left to equations.solve
+    """
+    sides = expr.split('=')
+    if len(sides) > 2 or ';' in expr:
+        return None
+    var = variable_of(expr.replace('=', ''))
+    if var is None or (wrt is not None and str(wrt) != var):
+        return None
+    parsed = [parse(side, var=var) for side in sides]
+    if any(side is None for side in parsed):
+        return None
+    terms = parsed[0][1]
+    if len(parsed) == 2:
+        terms = dict(terms)
+        for k, c in parsed[1][1].items():
+            terms[k] = terms.get(k, 0) - c
+        terms = {k: c for k, c in terms.items() if c}
+    if not terms or not SYMBOLIC_DEGREE < max(terms) <= MAX_ROOTS_DEGREE:
+        return None
+    symbol = smp.Symbol(var)
+    return equations.format_solutions([{symbol: root} for root in roots(terms)])
+
+def calculate(operation, expr, wrt, c):
+    """
+    Runs a calculator operation on a polynomial
+
+    :param operation: 'regular', 'd/dx', '∫', 'lim' or 'solve'
+    :param expr: cleaned expression
+    :param wrt: with respect to (sympy symbol)
+    :param c: calculator conditions
+    :returns: result text (python syntax), or None when expr isn't a polynomial
+              in wrt or the operation isn't covered
+    """
+    if not settings['enabled']:
+        return None
+    if operation == 'solve':
+        return solve(expr, wrt if c[0] in poss_vars else None)
+    if operation not in ('regular', 'd/dx', '∫', 'lim'):
+        return None
+    parsed = parse(expr, products=operation != 'regular')
+    if parsed is None:
+        return None
+    var, terms = parsed
+    if operation == 'regular':
+        return to_text(terms, var)
+    if var != str(wrt):
+        return None
+
+    if operation == 'd/dx':
+        return to_text(derivative(terms), var)
+    if operation == '∫':
+        if c[2] == '' and c[3] == '':
+            return to_text(integral(terms), var)
+        a, b = number(c[2]), number(c[3])
+        if a is None or b is None:
+            return None
+        antiderivative = integral(terms)
+        return str(horner(antiderivative, b) - horner(antiderivative, a))
+    point = number(c[1])
+    return None if point is None else str(horner(terms, point))
+
+
+# Test:
+if __name__ == '__main__':
+    print(calculate('d/dx', '3*x**4-x/2+1', smp.Symbol('x'), ['', '', '', '', '', '']))
+    print(calculate('∫', '(x+1)*(x-1)', smp.Symbol('x'), ['', '', '0', '3', '', '']))
+    print(solve('x**10-1=0'))
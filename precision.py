@@ -0,0 +1,171 @@
+"""
+File: precision.py
+Description:
+    Shared numeric precision setting for calculator.py and vector.py.
+    float32 for throughput, float64 (default) and mpmath arbitrary precision
+    with a configurable number of digits. Numeric kernels dispatch on it.
+    mp mode only raises mpmath's digits inside the kernels (mpmath.workdps),
+    the global mpmath context is left alone.
+"""
+
+from contextlib import nullcontext
+from fractions import Fraction
+import mpmath
+import numpy as np
+import sympy as smp
+
+
+modes = ['float32', 'float64', 'mp']
+
+# mode: numeric type used by kernels, digits: mp digits,
+# approximate: calculator.regular returns numbers instead of exact sympy objects
+settings = {'mode': 'float64', 'digits': 50, 'approximate': False}
+
+
+# ------------------ Setting ------------------
+
+def set_precision(mode=None, digits=None, approximate=None):
+    """
+    Updates the shared precision setting (None keeps current value)
+
+    :param mode: 'float32', 'float64' or 'mp'
+    :param digits: significant digits for 'mp'
+    :param approximate: whether calculator results are converted to numbers
+    :returns: updated settings
+    """
+    if mode is not None:
+        if mode not in modes:
+            raise ValueError(f'unknown precision mode: {mode}')
+        settings['mode'] = mode
+    if digits is not None:
+        settings['digits'] = int(digits)
+    if approximate is not None:
+        settings['approximate'] = bool(approximate)
+    return dict(settings)
+
+def get_precision():
+    """
+    Current precision setting
+    :returns: copy of settings
+    """
+    return dict(settings)
+
+def digits():
+    """
+    Significant digits of the current mode
+    :returns: number of digits
+    """
+    if settings['mode'] == 'float32':
+        return 7
+    if settings['mode'] == 'float64':
+        return 15
+    return settings['digits']
+
+def working():
+    """
+    Context for mpmath arithmetic in the current mode
+    :returns: mpmath.workdps(digits) in mp mode, otherwise a no-op context
+    """
+    if settings['mode'] == 'mp':
+        return mpmath.workdps(settings['digits'])
+    return nullcontext()
+
+def to_float(value):
+    """
+    Converts mpmath results to sympy Floats of the mode's digits, which keep
+    their precision outside mpmath.workdps (mpf values print and round at
+    the global 15 digits there)
+
+    :param value: mpf or object array of mpf
+    :returns: sympy Float or object array of sympy Float
+    """
+    if isinstance(value, np.ndarray):
+        return np.vectorize(to_float, otypes=[object])(value)
+    return smp.Float(value, settings['digits'])
+
+
+# ------------------ Kernels ------------------
+
+def to_array(values):
+    """
+    Converts numbers (or nested lists of numbers) into an array of the current mode,
+    mp mode gives object arrays of mpmath mpf
+
+    :param values: list or nested list of numbers
+    :returns: numpy array
+    """
+    if settings['mode'] == 'mp':
+        with working():
+            return np.vectorize(mpmath.mpf, otypes=[object])(np.array(values, dtype=object))
+    return np.array(values, dtype=settings['mode'])
+
+def norm(a):
+    """
+    Euclidean norm of a vector in the current mode
+    :param a: array from to_array
+    :returns: norm
+    """
+    if settings['mode'] == 'mp':
+        with working():
+            return to_float(mpmath.sqrt(mpmath.fsum(c * c for c in a)))
+    return np.linalg.norm(a)
+
+def dot(a, b):
+    """
+    Dot product of two vectors in the current mode
+    :param a: array from to_array
+    :param b: array from to_array
+    :returns: dot product
+    """
+    if settings['mode'] == 'mp':
+        with working():
+            return to_float(mpmath.fdot(a, b))
+    return np.dot(a, b)
+
+def det(m):
+    """
+    Determinant of a square matrix in the current mode
+    :param m: 2D array from to_array
+    :returns: determinant
+    """
+    if settings['mode'] == 'mp':
+        with working():
+            return to_float(mpmath.det(mpmath.matrix(m.tolist())))
+    return np.linalg.det(m)
+
+def projection(a, b):
+    """
+    Projection of a vector onto another vector in the current mode
+    :param a: array from to_array
+    :param b: array from to_array
+    :returns: projection of a on b
+    """
+    if settings['mode'] == 'mp':
+        with working():
+            return to_float(mpmath.fdot(a, b) / mpmath.fdot(b, b) * b)
+    return np.dot(a, b) / np.linalg.norm(b) ** 2 * b
+
+def approximate(value):
+    """
+    Converts an exact sympy result to the current precision,
+    symbolic results are evaluated to the mode's number of digits
+
+    :param value: sympy object
+    :returns: number (or evalf'd expression)
+    """
+    # Python numbers (calculator's exact fast path) skip sympify
+    if isinstance(value, (int, float, Fraction)) and settings['mode'] != 'mp':
+        return np.dtype(settings['mode']).type(float(value))
+    value = smp.sympify(value)
+    if value.free_symbols or not value.is_number:
+        return value.evalf(digits())
+    if settings['mode'] == 'mp' or not value.is_real:
+        return value.evalf(digits())
+    return np.dtype(settings['mode']).type(float(value))
+
+
+# Test:
+if __name__ == '__main__':
+    for mode in modes:
+        set_precision(mode)
+        print(mode, approximate(smp.pi), det(to_array([[1, 2], [3, 4]])))
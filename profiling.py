@@ -0,0 +1,208 @@
+"""
+File: profiling.py
+Description:
+    Low-overhead stage timers and counters for the calculation pipelines
+    (calculate in calculator.py, vector_calc in vector.py), aggregated into
+    p50 / p95 / p99 histograms, with an opt-in cProfile dump of slow requests.
+"""
+
+import os
+import time
+import cProfile
+import threading
+from functools import wraps
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+
+# Latest samples kept per stage for percentiles
+SAMPLES_PER_STAGE = 4096
+
+# enabled: record stage timings, profile_ms: dump a cProfile of requests slower
+# than this (None = off), profile_dir: where dumps go
+settings = {'enabled': True, 'profile_ms': None, 'profile_dir': 'profiles'}
+
+stages = {}    # stage -> {'count', 'total', 'samples'}
+counters = {}  # counter -> count
+local = threading.local()  # per-thread time spent in stages of the current request
+
+now = time.perf_counter
+
+
+# ------------------ Recording ------------------
+
+def record(name, seconds):
+    """
+    Adds one timing to a stage
+    :param name: stage name
+    :param seconds: elapsed seconds
+    """
+    stage = stages.get(name)
+    if stage is None:
+        stage = stages.setdefault(name, {'count': 0, 'total': 0.0, 'samples': deque(maxlen=SAMPLES_PER_STAGE)})
+    stage['count'] += 1
+    stage['total'] += seconds
+    stage['samples'].append(seconds)
+
+def lap(name, start):
+    """
+    Records the time since start as a stage of the current request
+
+    :param name: stage name
+    :param start: now() at the beginning of the stage
+    :returns: now(), the start of the next stage
+    """
+    end = now()
+    if settings['enabled']:
+        record(name, end - start)
+        local.inner = getattr(local, 'inner', 0.0) + end - start
+    return end
+
+def timed(name):
+    """
+    Decorator recording every call of a function as a stage (once when
+    timed functions of the same stage call each other)
+    :param name: stage name
+    :returns: decorator
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            active = getattr(local, 'active', None)
+            if active is None:
+                active = local.active = set()
+            # Calls nested in a call of the same stage are part of its lap
+            if name in active:
+                return func(*args, **kwargs)
+            active.add(name)
+            start = now()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                active.discard(name)
+                lap(name, start)
+        return wrapper
+    return decorate
+
+def count(name, amount=1):
+    """
+    Increments a counter (while profiling is enabled)
+    :param name: counter name
+    :param amount: increment
+    """
+    if settings['enabled']:
+        counters[name] = counters.get(name, 0) + amount
+
+@contextmanager
+def request(name, rest=None):
+    """
+    Times a whole request. Stage time recorded inside it (lap / timed)
+    is subtracted to give the rest stage, and with profiling on,
+    requests over the latency threshold leave a cProfile dump
+
+    :param name: stage name of the whole request
+    :param rest: stage name for time not covered by inner stages
+    """
+    if not settings['enabled']:
+        yield
+        return
+
+    profiler = None
+    if settings['profile_ms'] is not None and not getattr(local, 'profiling', False):
+        profiler, local.profiling = cProfile.Profile(), True
+        profiler.enable()
+
+    outer, local.inner = getattr(local, 'inner', 0.0), 0.0
+    start = now()
+    try:
+        yield
+    finally:
+        elapsed = now() - start
+        record(name, elapsed)
+        if rest is not None:
+            record(rest, max(elapsed - local.inner, 0.0))
+        local.inner = outer + elapsed
+
+        if profiler is not None:
+            profiler.disable()
+            local.profiling = False
+            if elapsed * 1e3 > settings['profile_ms']:
+                dump(profiler, name)
+
+def dump(profiler, name):
+    """
+    Saves a cProfile dump of a slow request
+    :param profiler: finished cProfile.Profile
+    :param name: request name
+    :returns: path of the dump
+    """
+    os.makedirs(settings['profile_dir'], exist_ok=True)
+    safe = ''.join(c if c.isalnum() else '_' for c in name)
+    path = os.path.join(settings['profile_dir'], f'{safe}-{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10**9}.prof')
+    profiler.dump_stats(path)
+    count('profiles_dumped')
+    return path
+
+
+# ------------------ Settings / Reading ------------------
+
+def set_profiling(enabled=None, profile_ms=None, profile_dir=None):
+    """
+    Updates instrumentation settings (None keeps current value)
+
+    :param enabled: record stage timings
+    :param profile_ms: latency threshold for cProfile dumps (negative turns dumps off)
+    :param profile_dir: directory of the dumps
+    :returns: updated settings
+    """
+    if enabled is not None:
+        settings['enabled'] = bool(enabled)
+    if profile_ms is not None:
+        settings['profile_ms'] = None if profile_ms < 0 else profile_ms
+    if profile_dir is not None:
+        settings['profile_dir'] = profile_dir
+    return dict(settings)
+
+def report():
+    """
+    Aggregated stage histograms and counters
+
+    :returns: {'stages': {stage: {count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms}}, 'counters': {...}}
+    """
+    result = {}
+    for name, stage in list(stages.items()):
+        samples = np.array(stage['samples']) * 1e3
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+        result[name] = {'count': stage['count'], 'total_ms': stage['total'] * 1e3,
+                        'mean_ms': stage['total'] * 1e3 / stage['count'],
+                        'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+    return {'stages': result, 'counters': dict(counters)}
+
+def format_report():
+    """
+    Human readable table of report()
+    :returns: string
+    """
+    lines = [f'{"stage":<28} {"count":>8} {"total ms":>10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}']
+    for name, s in sorted(report()['stages'].items()):
+        lines.append(f'{name:<28} {s["count"]:>8} {s["total_ms"]:10.2f} {s["p50_ms"]:9.3f} '
+                     f'{s["p95_ms"]:9.3f} {s["p99_ms"]:9.3f}')
+    for name, value in sorted(counters.items()):
+        lines.append(f'{name:<28} {value:>8}')
+    return '\n'.join(lines)
+
+def reset():
+    """Clears all stage timings and counters"""
+    stages.clear()
+    counters.clear()
+
+
+# Test:
+if __name__ == '__main__':
+    for _ in range(100):
+        with request('demo', 'demo.rest'):
+            start = now()
+            sum(range(1000))
+            lap('demo.sum', start)
+    print(format_report())
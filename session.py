@@ -0,0 +1,161 @@
+"""
+File: session.py
+Description:
+    Session environment of user definitions, f(x) = x^2 + 1 or c = 3. A definition
+    is parsed once into a sympy Lambda (or value), which later calculate, vector_calc
+    and graph requests receive as parser locals, so uses are inlined without reparsing
+    the definition. Parsed request expressions and lambdified definitions are cached
+    per session version.
+"""
+
+import re
+from collections import OrderedDict
+import sympy as smp
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication
+
+
+# Names of the calculator / vector / graph symbols and constants, which can't be redefined
+reserved = {'x', 'y', 'z', 't', 'n', 'u', 'v', 'i', 'j', 'k', 'alpha', 'beta', 'smp', 'pi', 'E', 'I', 'oo'}
+
+# calculator.regular and vector.clean rewrite these inside any name (e -> smp.E ...)
+rewritten = ['e', 'π', 'sqrt', 'ln', 'log', 'sin', 'cos', 'tan', 'csc', 'cot', 'sec']
+
+# f(x, y) = ... or c = ... (spaces removed)
+definition = re.compile(r'^([A-Za-z_][A-Za-z_0-9]*)(?:\(([A-Za-z_0-9,]*)\))?=([^=].*)$')
+identifier = re.compile(r'[A-Za-z_][A-Za-z_0-9]*')
+
+symbols = {name: smp.Symbol(name) for name in ('x', 'y', 'z', 't', 'n')}
+session_locals = {**symbols, 'π': smp.pi, 'e': smp.E, 'ln': smp.log}
+transformations = standard_transformations + (implicit_multiplication,)
+
+# Parsed expressions kept per (text, version, parser locals)
+PARSE_CACHE = 1024
+
+definitions = {}  # name -> {'params', 'expr', 'text'}
+names = {}        # name -> sympy Lambda / value, handed to parsers as locals
+compiled = {}     # name -> lambdified definition
+parsed = OrderedDict()
+state = {'version': 0}
+
+
+# ------------------ Defining ------------------
+
+def is_definition(text):
+    """
+    :param text: user input
+    :returns: whether it has the shape of a definition (name or name(params) = body)
+    """
+    match = definition.match(text.replace(' ', ''))
+    return bool(match) and match[1] not in reserved
+
+def define(text):
+    """
+    Parses and stores a definition, earlier definitions used in
+    its body are inlined
+
+    :param text: f(x) = x^2 + 1, g(x, y) = f(x)*y, c = 3 ...
+    :returns: name
+    """
+    match = definition.match(text.replace(' ', ''))
+    if not match:
+        raise ValueError(f'not a definition: {text}')
+    name, params, body = match[1], match[2], match[3]
+    if name in reserved or any(part in name for part in rewritten):
+        raise ValueError(f'{name} can not be defined')
+
+    params = [p for p in (params or '').split(',') if p]
+    if not all(identifier.fullmatch(p) for p in params) or len(set(params)) != len(params):
+        raise ValueError(f'invalid parameters: {params}')
+    args = [symbols.get(p) or smp.Symbol(p) for p in params]
+
+    local = {**session_locals, **names, **{p: a for p, a in zip(params, args)}}
+    expr = parse_expr(body.replace('^', '**'), local_dict=local, transformations=transformations)
+
+    definitions[name] = {'params': args, 'expr': expr, 'text': text}
+    names[name] = smp.Lambda(tuple(args), expr) if args else expr
+    compiled.pop(name, None)
+    state['version'] += 1
+    parsed.clear()
+    return name
+
+def undefine(name):
+    """
+    Removes a definition
+    :param name: defined name
+    """
+    definitions.pop(name)
+    names.pop(name)
+    compiled.pop(name, None)
+    state['version'] += 1
+    parsed.clear()
+
+def clear():
+    """Removes every definition"""
+    definitions.clear()
+    names.clear()
+    compiled.clear()
+    parsed.clear()
+    state['version'] += 1
+
+
+# ------------------ Using ------------------
+
+def uses(text):
+    """
+    :param text: expression
+    :returns: whether it mentions a defined name
+    """
+    return bool(names) and any(name in names for name in identifier.findall(text))
+
+def inline(text, local=None):
+    """
+    Parses an expression with the definitions inlined (cached per session version)
+
+    :param text: cleaned expression (python syntax)
+    :param local: extra parser locals
+    :returns: sympy expression
+    """
+    key = (text, state['version'], frozenset(local.items()) if local else None)
+    expr = parsed.get(key)
+    if expr is None:
+        expr = smp.sympify(text, locals={**session_locals, **(local or {}), **names})
+        parsed[key] = expr
+        if len(parsed) > PARSE_CACHE:
+            parsed.popitem(last=False)
+    else:
+        parsed.move_to_end(key)
+    return expr
+
+def function(name):
+    """
+    Numeric version of a definition, lambdified on first use
+
+    :param name: defined name
+    :returns: NumPy function of the parameters (a float for constants)
+    """
+    func = compiled.get(name)
+    if func is None:
+        entry = definitions[name]
+        if entry['params']:
+            func = smp.lambdify(entry['params'], entry['expr'], 'numpy', cse=True)
+        else:
+            func = float(entry['expr'])
+        compiled[name] = func
+    return func
+
+def describe(name):
+    """
+    :param name: defined name
+    :returns: 'f(x) = x**2 + 1' text of a definition
+    """
+    entry = definitions[name]
+    params = ', '.join(str(p) for p in entry['params'])
+    return f'{name}({params}) = {entry["expr"]}' if params else f'{name} = {entry["expr"]}'
+
+
+# Test:
+if __name__ == '__main__':
+    define('f(x) = x^2 + 1')
+    define('g(x, y) = f(x)*y')
+    define('c = 3')
+    print(describe('g'), inline('g(c, 2) + f(t)'), function('f')(2.0))
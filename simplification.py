@@ -0,0 +1,122 @@
+"""
+File: simplification.py
+Description:
+    Simplification policy of calculator results. Instead of always calling
+    smp.simplify, a result goes through the steps of a tier (none, cheap:
+    expand / cancel / together / trigsimp, full: cheap then smp.simplify)
+    under a time budget per request, and the smallest form found before the
+    deadline (by smp.count_ops, the original included) is returned. Steps
+    that can blow up run in equations' worker process, which is stopped at
+    the deadline, trigsimp only on expressions with trig functions.
+    Derivatives and integrals aren't simplified unless asked for, only
+    partial derivatives (smp.simplify before) follow the tier.
+"""
+
+import time
+from collections import OrderedDict
+import sympy as smp
+from sympy.functions.elementary.trigonometric import TrigonometricFunction
+from equations import within
+import profiling
+
+
+# Tier and time budget (seconds) per request
+settings = {'tier': 'cheap', 'seconds': 0.5}
+
+# Tiers of calculator sites that don't follow settings['tier']
+sites = {'derivative': 'none', 'integral': 'none'}
+
+tiers = {
+    'none': [],
+    'cheap': [('expand', smp.expand), ('cancel', smp.cancel), ('together', smp.together), ('trigsimp', smp.trigsimp)],
+    'full': [('expand', smp.expand), ('cancel', smp.cancel), ('together', smp.together), ('trigsimp', smp.trigsimp),
+             ('simplify', smp.simplify)],
+}
+
+# Steps that can't shrink an expression without these functions are skipped
+needs = {'trigsimp': TrigonometricFunction}
+
+# Steps with no bound on their running time ((sin(x) + x)^20 takes seconds to
+# expand, cancel or trigsimp), run where they can be stopped
+bounded = {'expand', 'cancel', 'trigsimp', 'simplify'}
+
+# Results of runs that finished within the budget, per (expression, tier)
+RESULT_CACHE = 1024
+results = OrderedDict()
+
+
+def set_policy(tier=None, seconds=None, site=None):
+    """
+    Changes the simplification policy
+
+    :param tier: 'none', 'cheap' or 'full'
+    :param seconds: time budget per request
+    :param site: 'derivative' or 'integral' to change only that site's tier
+    """
+    if tier is not None:
+        if tier not in tiers:
+            raise ValueError(f'unknown tier: {tier}')
+        if site is not None:
+            sites[site] = tier
+        else:
+            settings['tier'] = tier
+    if seconds is not None:
+        settings['seconds'] = float(seconds)
+
+def simplify(expr, tier=None, seconds=None, site=None):
+    """
+    Smallest form of an expression the tier's steps find within the budget.
+    Each step starts from the original expression, and no step is started
+    once the deadline has passed. Bounded steps run in equations' worker
+    process and are stopped when they run over the time left
+
+    :param expr: sympy expression
+    :param tier: 'none', 'cheap' or 'full' (None: the site's tier or settings)
+    :param seconds: time budget (None: settings)
+    :param site: calculator site ('derivative', 'integral', ...)
+    :returns: sympy expression
+    """
+    tier = tier or sites.get(site) or settings['tier']
+    steps = tiers[tier]
+    if not steps or not isinstance(expr, smp.Basic) or expr.is_Atom:
+        return expr
+    key = (expr, tier)
+    if key in results:
+        results.move_to_end(key)
+        profiling.count('simplify.cached')
+        return results[key]
+    deadline = time.perf_counter() + (settings['seconds'] if seconds is None else seconds)
+
+    best, best_ops, chosen = expr, smp.count_ops(expr), 'none'
+    for name, step in steps:
+        if name in needs and not expr.has(needs[name]):
+            continue
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            profiling.count('simplify.timeout')
+            return best
+        if name in bounded:
+            candidate = within(left, step, expr)
+            if candidate is None:
+                if time.perf_counter() >= deadline:
+                    profiling.count('simplify.timeout')
+                    return best
+                continue
+        else:
+            candidate = step(expr)
+        ops = smp.count_ops(candidate)
+        if ops < best_ops:
+            best, best_ops, chosen = candidate, ops, name
+    profiling.count('simplify.' + chosen)
+    results[key] = best
+    if len(results) > RESULT_CACHE:
+        results.popitem(last=False)
+    return best
+
+
+# Test:
+if __name__ == '__main__':
+    x, y = smp.symbols('x y')
+    print(simplify(smp.diff(smp.sin(x)**2 * y + smp.cos(x)**2 * y, y)))
+    print(simplify((x**2 - 1) / (x - 1)), simplify((x + 1)**2 - x**2, 'none'))
+    print(simplify(smp.sin(x)**2 + smp.cos(x)**2, 'full', 0.0))
@@ -249,11 +249,101 @@ def test_vector_norm():
     assert vector_calc('norm', '[3, 4]') == 'norm([3, 4])'
 
 def test_vector_arc_length():
-    assert vector_calc('length', '[t, t^2, 1]') == '[0-1]' # Mocked sympy and quad
+    import numpy as np
+    # Length over t in [0, 1]: sqrt(5)/2 + asinh(2)/4
+    assert np.isclose(float(vector_calc('length', '[t, t^2, 1]')), 1.4789428575445975)
+    assert vector_calc('length', '[1, 2, 8]') == '0.0'
 
 def test_vector_derivative():
     assert vector_calc('deriv', '[t, t^2, 1]') == '[t, t**2, 1]' # Mocked sympy, specific output for this mock
 
+def test_vector_field_operations():
+    assert vector_calc('grad', 'x^2*y + z') == '[2xy, x^2, 1]'
+    assert vector_calc('div', '[x*y, y*z, z*x]') == 'x + y + z'
+    assert vector_calc('curl', '[-y, x, 0]') == '[0, 0, 2]'
+    assert vector_calc('laplacian', 'x^2+y^2+z^2') == '6'
+
+def test_vector_field_compiled_grid():
+    import numpy as np
+    g = np.linspace(-1, 1, 8)
+    X, Y, Z = np.meshgrid(g, g, g, indexing='ij')
+    curl = vector_calc('curl', '[-y, x, 0]', compiled=True)(X, Y, Z)
+    assert curl.shape == (3, 8, 8, 8)
+    assert np.allclose(curl[2], 2) and np.allclose(curl[:2], 0)
+
+def test_vector_line_and_surface_integrals():
+    import math
+    circle = '[cos(t), sin(t), 0]'
+    assert math.isclose(vector_calc('line', '[-y, x, 0]', circle, bounds=(0, 2*math.pi)), 2*math.pi)
+    assert math.isclose(vector_calc('line', 'x^2', '[t, 0, 0]'), 1/3)
+    sphere = '[sin(u)*cos(v), sin(u)*sin(v), cos(u)]'
+    flux = vector_calc('surface', '[x, y, z]', sphere, bounds=((0, math.pi), (0, 2*math.pi)))
+    assert math.isclose(flux, 4*math.pi)
+
+    # Estimates that stop at the panel cap are flagged
+    with pytest.warns(RuntimeWarning):
+        vector_calc('line', 'x^(-1/2)', '[t, 0, 0]')
+
+def test_vector_chunked_memmap(tmp_path):
+    import numpy as np
+    from chunked import open_array
+    data = np.arange(30, dtype=np.float64).reshape(10, 3)
+    np.save(tmp_path / 'vecs.npy', data)
+    vecs = open_array(str(tmp_path / 'vecs.npy'))
+    norms = vector_calc('norm', vecs, out=str(tmp_path / 'norms.npy'))
+    assert np.allclose(np.load(tmp_path / 'norms.npy'), np.linalg.norm(data, axis=1))
+    assert np.allclose(norms, np.linalg.norm(data, axis=1))
+    assert np.isclose(vector_calc('sum_norm', vecs), np.linalg.norm(data, axis=1).sum())
+    assert np.allclose(vector_calc('add', vecs, np.ones(3)), data + 1)
+
+    # Results without an output path leave no files behind
+    import glob, tempfile
+    before = set(glob.glob(os.path.join(tempfile.gettempdir(), '*.npy')))
+    assert np.allclose(vector_calc('norm', data), np.linalg.norm(data, axis=1))
+    assert np.allclose(vector_calc('sub', vecs, np.ones(3)), data - 1)
+    from chunked import chunked_calc
+    summed = chunked_calc('add', vecs, np.ones(3), chunk_rows=4)
+    assert np.allclose(summed, data + 1) and summed.filename is None
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(), '*.npy'))) <= before
+
+    # Operations without a dataset version, or missing their second operand, are rejected
+    with pytest.raises(ValueError):
+        vector_calc('det', data)
+    with pytest.raises(ValueError):
+        chunked_calc('add', vecs)
+
+def test_precision_modes():
+    import precision
+    try:
+        precision.set_precision('mp', 40)
+        assert str(vector_calc('norm', '[1, 1]')).startswith('1.4142135623730950488016887242096980785')
+        assert abs(vector_calc('det', '[1, 2; 3, 4]') + 2) < 1e-38
+        assert str(vector_calc('projection', '[1, 0, 0]', '[1, 1, 1]')[0]).startswith('0.333333333333333333333333333333333333')
+        # mp digits stay inside the kernels
+        import mpmath
+        assert mpmath.mp.dps == 15
+        precision.set_precision('float32', approximate=True)
+        assert calculate('sqrt(4)/3', ['', '', '', '', '', '']) == '0.6666667'
+    finally:
+        precision.set_precision('float64', approximate=False)
+
+def test_vector_batched_matrices():
+    import numpy as np
+    from batched import batched_calc
+    stack = np.random.default_rng(1).random((50, 4, 4)) + np.eye(4) * 4
+    assert np.allclose(vector_calc('det', stack), [np.linalg.det(m) for m in stack])
+    assert np.allclose(vector_calc('matmul', stack, stack), [m @ m for m in stack])
+    inv = batched_calc('inv', stack, workers=3, chunk=16)
+    assert np.allclose(inv @ stack, np.eye(4))
+
+    # BLAS is single threaded inside the pool, unsupported operations are rejected
+    from threadpoolctl import threadpool_info
+    from batched import blas_threads
+    with blas_threads(1):
+        assert all(info['num_threads'] == 1 for info in threadpool_info())
+    with pytest.raises(ValueError):
+        vector_calc('norm', stack)
+
 
 # --- Solver AI Tests ---
 
@@ -287,6 +377,474 @@ def test_graphs_page_logic():
     # For now, we rely on the mock_graph.
     assert mock_graph("x^2") == "Graph of: x^2"
 
+def test_graph_sample_masks_asymptotes():
+    import numpy as np
+    from graph import compile_expr, sample
+    xs, ys = sample(compile_expr('1/(x-1)'), -10, 10, 2000)
+    assert np.isnan(ys).sum() >= 1
+    assert np.nanmax(np.abs(np.diff(ys))) < 1e3
+    xs, ys = sample(compile_expr('sqrt(x)'), -1, 1, 101)
+    assert np.isnan(ys[:50]).all() and np.isfinite(ys[50:]).all()
+    assert np.allclose(sample(compile_expr('3'), 0, 1, 5)[1], 3)
+
+def test_graph_draws_on_axes():
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from graph import graph
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    timings = graph('4x + x^2', ax)
+    assert set(timings) == {'compile', 'sample', 'draw'}
+    assert len(ax.lines[0].get_xdata()) >= 1000
+    assert graph('4x +* )', ax) is None
+
+def test_graph_viewport_cache_and_refinement():
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import graph
+    graph.clear_cache()
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    graph.graph('x^2', ax)
+    misses = graph.cache_stats['misses']
+
+    # Panning by one tile only samples the newly exposed tile
+    ax.set_xlim(-8, 12)
+    assert graph.cache_stats['misses'] == misses + 1
+    assert ax.lines[0].get_xdata().max() >= 12
+
+    # Refinement adds points only where the curve bends
+    func = graph.compile_expr('abs(x)')
+    xs, ys = graph.refine(func, np.linspace(-1.01, 1, 21), func(np.linspace(-1.01, 1, 21)))
+    assert 21 < len(xs) < 60 and np.all(np.diff(xs) > 0)
+    assert np.abs(xs[np.argmin(np.diff(xs))]) < 0.1
+
+def test_graph_overlay_shared_grid():
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import graph as graph_module
+    from graph import compile_exprs, graph
+    func = compile_exprs(['sin(x)', 'sin(x)^2', '2'])
+    ys = func(np.linspace(0, 1, 5))
+    assert ys.shape == (3, 5) and np.allclose(ys[1], ys[0] ** 2) and np.allclose(ys[2], 2)
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    graph('sin(x); x^2; 1/x', ax)
+    assert len(ax.lines) == 5  # three curves and the two axis lines
+    xs, ys = graph_module.viewport_sample(('sin(x)', 'x**2'), compile_exprs('sin(x); x^2'), -10, 10)
+    assert ys.shape == (2, len(xs))
+
+def test_graph_headless_export(tmp_path):
+    from export import export, main
+    paths = export(['x^2', 'sin(x); cos(x)', '4x +* )'], str(tmp_path), 'png', workers=1)
+    assert paths[2] is None
+    with open(paths[0], 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+    assert main(['x^3', '-o', str(tmp_path / 'svg'), '--format', 'svg', '--workers', '1']) == 0
+    assert (tmp_path / 'svg' / 'graph_0000.svg').read_text().lstrip().startswith('<?xml')
+
+def test_graph_surface_and_parametric_curve():
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from graph import compile_exprs, graph, kind, x, y
+    assert kind('x^2') == '2d' and kind('x*y') == 'surface' and kind('[cos(t), sin(t), t]') == 'curve'
+    X, Y = np.meshgrid(np.linspace(0, 1, 4), np.linspace(0, 2, 3))
+    assert np.allclose(compile_exprs(['x*y', '1'], (x, y))(X, Y), [X * Y, np.ones_like(X)])
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    figure.add_subplot()
+    assert graph('x^2 - y^2', figure.axes[0]) is not None
+    assert figure.axes[0].name == '3d' and len(figure.axes) == 1
+    assert graph('[cos(t), sin(t), t]', figure.axes[0]) is not None
+    assert len(figure.axes[0].lines[0].get_data_3d()[2]) == 2000
+    graph('x^2', figure.axes[0])
+    assert figure.axes[0].name == 'rectilinear'
+
+def test_graph_roots_and_extrema():
+    import numpy as np
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from graph import compile_derivatives, find_roots, graph, parse, solve
+    found = find_roots(compile_derivatives(parse('x^3 - 3x')), np.linspace(-3, 3, 601))
+    assert np.allclose(found['roots'], [-np.sqrt(3), 0, np.sqrt(3)])
+    assert np.allclose(found['minima'], [1]) and np.allclose(found['maxima'], [-1])
+
+    # Poles are not roots, double roots are
+    assert len(find_roots(compile_derivatives(parse('1/x')), np.linspace(-1, 1, 100))['roots']) == 0
+    assert np.allclose(find_roots(compile_derivatives(parse('x^2')), np.linspace(-1, 1.3, 100))['roots'], [0])
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    graph('sin(x)', ax)
+    assert np.allclose(solve(ax)[0]['roots'], np.arange(-3, 4) * np.pi)
+    ax.set_xlim(1, 4)
+    assert np.allclose(ax.lines[-3].get_xdata(), [np.pi])
+
+def test_graph_downsample_keeps_peaks_and_gaps():
+    import numpy as np
+    from downsample import downsample
+    xs = np.linspace(0, 1, 100001)
+    ys = np.sin(xs * 200)
+    ys[50000] = 7.0       # single spike
+    ys[70000] = np.nan    # break in the curve
+    for method in ('minmax', 'lttb'):
+        dx, dy = downsample(xs, ys, 500, method)
+        assert len(dx) <= 1500 and np.all(np.diff(dx) > 0)
+        assert np.nanmax(dy) == 7.0 and np.isnan(dy).any()
+        assert np.isclose(np.nanmin(dy), -1, atol=1e-3)
+
+def test_profiling_stage_report_and_dump(tmp_path):
+    import profiling
+    profiling.reset()
+    for _ in range(5):
+        calculate('x^2 + 2*x', ['', '', '', '', '', ''])
+        vector_calc('dot', '[1, 2, 3]', '[4, 5, 6]')
+    stages = profiling.report()['stages']
+    for name in ('calculate', 'calculate.clean', 'calculate.eval', 'calculate.str',
+                 'calculate.post_clean', 'vector_calc', 'vector_calc.operation', 'vector_calc.parse'):
+        assert stages[name]['count'] >= 5
+        assert 0 <= stages[name]['p50_ms'] <= stages[name]['p95_ms'] <= stages[name]['p99_ms']
+
+    # Every request over a 0 ms threshold leaves a cProfile dump
+    try:
+        profiling.set_profiling(profile_ms=0, profile_dir=str(tmp_path))
+        calculate('d/dx[x^3]', ['', 'x', '', '', '', ''])
+        assert len(list(tmp_path.glob('calculate-*.prof'))) == 1
+    finally:
+        profiling.set_profiling(profile_ms=-1, profile_dir='profiles')
+        profiling.reset()
+
+    # Parsing a field (which parses its components) is one parse lap per operand
+    vector_calc('div', '[x*y, y, z]', '')
+    assert profiling.report()['stages']['vector_calc.parse']['count'] == 1
+
+    # Counters stop with the timers
+    try:
+        profiling.reset()
+        profiling.set_profiling(enabled=False)
+        profiling.count('test.counter')
+        assert profiling.report()['counters'] == {}
+    finally:
+        profiling.set_profiling(enabled=True)
+        profiling.reset()
+
+def test_capture_and_replay(tmp_path, monkeypatch):
+    import numpy as np
+    import capture
+    path = str(tmp_path / 'workload.jsonl')
+    monkeypatch.setitem(capture.settings, 'max_bytes', 600)
+    try:
+        capture.set_capture(enabled=True, path=path)
+        for n in range(6):
+            calculate(f'{n}+3', ['', '', '', '', '', ''])
+        vector_calc('dot', '[1, 2, 3]', '[4, 5, 6]')
+        vector_calc('norm', np.ones((4, 3)))
+        vector_calc('norm', np.ones((capture.MAX_ARRAY, 3)))  # too large to record
+    finally:
+        capture.set_capture(enabled=False, path='captures/workload.jsonl')
+
+    assert os.path.exists(path + '.1')  # rotated
+    entries = capture.load(path)
+    assert [e['op'] for e in entries] == ['calculate'] * 6 + ['vector_calc'] * 2
+    assert entries[0]['res'] == '3' and entries[0]['ms'] > 0
+
+    result = capture.replay(path)
+    assert result['requests'] == 8 and result['diffs'] == []
+    assert result['replayed']['p50'] <= result['replayed']['p99']
+
+    # A changed engine shows up as a diff
+    monkeypatch.setattr(capture, 'engines', lambda: {'calculate': lambda *a: 'changed', 'vector_calc': vector_calc})
+    assert len(capture.replay(path)['diffs']) == 6
+
+def test_memory_budget_clears_caches(monkeypatch):
+    import memory
+    monkeypatch.setattr(memory, 'settings', dict(memory.settings))
+    memory.set_budget(cache_entries=10**9, clear_seconds=-1, check_every=1)
+    calculate('d/dx[x^5*sin(x)]', ['', 'x', '', '', '', ''])
+    use = memory.usage()
+    assert use['sympy_cache_entries'] > 0 and use['sympy_caches'] and use['rss_mb'] > 0
+
+    clears = use['clears']
+    memory.set_budget(cache_entries=0)
+    vector_calc('dot', '[1, 2, 3]', '[4, 5, 6]')
+    assert memory.state['clears'] == clears + 1
+    assert memory.cache_entries() < use['sympy_cache_entries']
+
+def test_calculate_solve(monkeypatch):
+    import numpy as np
+    import equations
+    no_conditions = ['', '', '', '', '', '']
+    assert calculate('solve[x^2=2]', no_conditions) == 'x = -sqrt(2); x = sqrt(2)'
+    assert calculate('solve[x+y=3; x-y=1]', no_conditions) == 'x = 2, y = 1'
+    assert calculate('solve[x+y=3]', ['y', '', '', '', '', '']) == 'y = 3 - x'
+
+    # Numeric fallback: vectorized Newton from many starts
+    roots = equations.numeric(equations.parse_system('sin(x) = x/3'), [equations.x])
+    assert np.allclose(sorted(r[equations.x] for r in roots), [-2.278862660, 0, 2.278862660])
+    system = equations.parse_system('x**2 + y**2 = 4; y = exp(x) - 1')
+    found = equations.numeric(system, [equations.x, equations.y])
+    assert len(found) == 2
+    for root in found:
+        assert all(abs(float(eq.subs(root))) < 1e-8 for eq in system)
+
+    monkeypatch.setattr(equations, 'symbolic', lambda *a: None)
+    assert calculate('solve[cos(x)=x]', no_conditions) == 'x = 0.739085133215'
+
+    # Calls over budget are stopped, not left running
+    import time, threading, multiprocessing
+    threads = threading.active_count()
+    assert equations.within(0.2, time.sleep, 30) is None
+    assert threading.active_count() == threads and not multiprocessing.active_children()
+    assert equations.within(5, sum, [1, 2, 3]) == 6
+
+def test_calculate_ode(monkeypatch):
+    import numpy as np
+    import odes
+    no_conditions = ['', '', '', '', '', '']
+    assert calculate("ode[y'=-2y; y(0)=1]", no_conditions) == 'y(t) = exp(-2t)'
+    assert calculate("ode[x'=y; y'=-x; x(0)=1; y(0)=0]", no_conditions) == 'x(t) = cos(t); y(t) = -sin(t)'
+
+    # Numeric path: higher order equation reduced to a first order system
+    states, rhs = odes.first_order(odes.parse_ode("y'' + 2y' + 5y = 0")[0])
+    assert [s.name for s in states] == ['y_0', 'y_1']
+    ts, ys = odes.integrate(states, rhs, [1, 0], (0, 2), t_eval=[1, 2])
+    exact = lambda t: np.exp(-t) * (np.cos(2 * t) + np.sin(2 * t) / 2)
+    assert np.allclose(ys[0], exact(ts), atol=1e-7)
+
+    # Batched initial conditions, together and separately
+    states, rhs = odes.first_order(odes.parse_ode("y' = -y*t")[0])
+    y0 = np.linspace(1, 3, 50)[:, None]
+    for together in (True, False):
+        ts, ys = odes.integrate(states, rhs, y0, (0, 1), t_eval=[1], together=together)
+        assert ys.shape == (50, 1, 1) and np.allclose(ys[:, 0, 0], y0[:, 0] * np.exp(-0.5), rtol=1e-6)
+
+    # dsolve over its budget is stopped, not left running next to the numeric answer
+    import threading, multiprocessing
+    threads = threading.active_count()
+    system, ics = odes.parse_ode("y'' = -sin(y); y(0) = 1; y'(0) = 0")
+    assert odes.closed_form(system, ics, seconds=0.3) is None
+    assert threading.active_count() == threads and not multiprocessing.active_children()
+
+    monkeypatch.setattr(odes, 'closed_form', lambda *a: None)
+    name, value = calculate("ode[y'=-2y; y(0)=1]", ['', '', '', '1', '', '']).split(' = ')
+    assert name == 'y(1)' and np.isclose(float(value), np.exp(-2), rtol=1e-7)
+
+def test_worksheet_incremental_recompute():
+    from worksheet import Worksheet
+    sheet = Worksheet()
+    sheet.set('a', 'x^2 + 1')
+    sheet.set('b', 'd/dx[a]')
+    sheet.set('c', 'a*b')
+    sheet.set('d', '∫[b]')
+    assert sheet.results() == {'a': 'x^2 + 1', 'b': '2x', 'c': '2x(x^2 + 1)', 'd': 'x^2'}
+
+    # Only downstream cells are evaluated, and an unchanged value stops propagation
+    assert sheet.set('a', 'x^3') == ['a', 'b', 'c', 'd']
+    assert sheet.display('d') == 'x^3'
+    assert sheet.set('b', 'd/dx[a + 0]') == ['b']
+    b = sheet.value('b')
+    sheet.set('f', '5')
+    assert sheet.value('b') is b
+
+    # A long chain: an edit near the end costs the cells after it
+    sheet.set('k0', 'x')
+    for i in range(1, 500):
+        sheet.set(f'k{i}', f'k{i - 1} + 1')
+    evaluations = sheet.evaluations
+    assert len(sheet.set('k490', 'y')) == 10
+    assert sheet.evaluations - evaluations == 10 and sheet.display('k499') == 'y + 9'
+
+    # Missing references and cycles are errors until fixed
+    sheet.set('p', 'q + 1')
+    assert sheet.display('p') == 'ERROR: q is not defined'
+    sheet.set('q', 'p')
+    assert sheet.display('q') == 'ERROR: circular reference'
+    sheet.set('q', '2')
+    assert sheet.display('p') == '3'
+
+def test_session_definitions():
+    import session
+    from graph import parse
+    no_conditions = ['', '', '', '', '', '']
+    try:
+        assert calculate('f(x) = x^2 + 3x', no_conditions) == 'f(x) = x^2 + 3x'
+        assert calculate('a = 5', no_conditions) == 'a = 5'
+        assert calculate('g(x, y) = f(x)*y', no_conditions) == 'g(x, y) = y(x^2 + 3x)'
+        assert calculate('f(a) + g(1, 2)', no_conditions) == '48'
+        assert calculate('d/dx[f(x)]', ['', 'x', '', '', '', '']) == '2x + 3'
+        assert calculate('solve[f(x) = a - 1]', no_conditions) == 'x = -4; x = 1'
+        assert vector_calc('grad', 'f(x)*y') == '[y(2x + 3), x^2 + 3x, 0]'
+        assert str(parse('f(x) + a')) == 'x**2 + 3*x + 5'
+        assert session.function('f')(2.0) == 10.0
+
+        # Parsed once per session version, a redefinition is picked up
+        assert session.inline('f(t)') is session.inline('f(t)')
+        calculate('f(x) = 2x', no_conditions)
+        assert calculate('f(a)', no_conditions) == '10'
+
+        # Symbols and names the calculator rewrites can't be defined
+        assert calculate('sin = 3', no_conditions) == 'ERROR'
+        assert not session.is_definition('x = 3')
+    finally:
+        session.clear()
+
+def test_exact_matrices():
+    import sympy as smp
+    from vector import exact_det, x
+    # Integer matrices are exact in every precision mode (LU gave -2.0000000000000004)
+    assert vector_calc('det', '[1, 2; 3, 4]') == -2
+    assert vector_calc('det', '[1, 2, 3; 4, 5, 6; 7, 8, 9]') == 0
+    assert vector_calc('det', '[1/2, x; y, 3]') == '-xy + 3/2'
+    assert vector_calc('det', '[1/x, 1; 1, x + 1]') == '1/x'
+    assert vector_calc('inv', '[1, 2; 3, 4]') == '[-2, 1; 3/2, -1/2]'
+    assert vector_calc('inv', '[1, 2; 2, 4]') is None
+
+    # Bareiss over ZZ[x] agrees with sympy's own determinant
+    m = smp.Matrix(6, 6, lambda i, j: (i + 2*j + 1)*x**((i*j) % 3) - i)
+    assert smp.expand(exact_det(m) - m.det(method='berkowitz')) == 0
+
+def test_polynomial_fast_path():
+    import polynomials
+    from fractions import Fraction
+    no_conditions = ['', '', '', '', '', '']
+    assert calculate('d/dx[3x^4 - x/2 + 1]', no_conditions) == '12x^3 - 1/2'
+    assert calculate('∫[x^2 - 1]', no_conditions) == 'x^3/3 - x'
+    assert calculate('∫[(x+1)(x-1)]', ['', '', '0', '3', '', '']) == '6'
+    assert calculate('lim[x^2 + 1]', ['', '2', '', '', '', '']) == '5'
+    assert calculate('5 - 2x^2', no_conditions) == '5 - 2x^2'
+    # Every root above degree 8, complex ones as floats like the smp.solve path lists them
+    tenth = calculate('solve[x^10 = 1]', no_conditions).split('; ')
+    assert len(tenth) == 10 and tenth[:2] == ['x = -1', 'x = 1']
+    assert 'x = 0.309016994375 + 0.951056516295I' in tenth
+    ninth = calculate('solve[x^9 + 1 = 0]', no_conditions).split('; ')
+    assert len(ninth) == 9 and ninth[0] == 'x = -1' and 'x = 0.5 - 0.866025403784I' in ninth
+    # Division by zero isn't a polynomial, sympy gives zoo
+    assert calculate('x/0', no_conditions) == 'zoox'
+    assert calculate('3x^2/0', no_conditions) == 'zoox^2'
+    assert polynomials.parse_sum('x/0', 'x') is None and polynomials.number('1/0') is None
+
+    # Same text as the sympy path
+    try:
+        polynomials.settings['enabled'] = False
+        expected = calculate('d/dx[x^5/3 - 2x^3 + x]', no_conditions)
+    finally:
+        polynomials.settings['enabled'] = True
+    assert calculate('d/dx[x^5/3 - 2x^3 + x]', no_conditions) == expected
+
+    # FFT products are exact, sparse terms stay sparse
+    a = {k: Fraction(k % 7 - 3) for k in range(300)}
+    naive = {}
+    for i, ca in a.items():
+        for j, cb in a.items():
+            naive[i + j] = naive.get(i + j, 0) + ca * cb
+    assert polynomials.multiply(a, a) == {k: c for k, c in naive.items() if c}
+    assert polynomials.derivative(polynomials.parse('x**100000+1')[1]) == {99999: 100000}
+
+def test_simplification_policy():
+    import time
+    import sympy as smp
+    import simplification
+    x, y = smp.symbols('x y')
+    assert simplification.simplify((x**2 - 1) / (x - 1)) == x + 1
+    assert simplification.simplify((x**2 - 1) / (x - 1), 'none') == (x**2 - 1) / (x - 1)
+    assert simplification.simplify(smp.sin(x)**2 + smp.cos(x)**2, 'full') == 1
+
+    # Finished results are reused, whatever the budget
+    assert simplification.simplify(smp.sin(x)**2 + smp.cos(x)**2, 'full', 0.0) == 1
+
+    # Nothing runs past the budget, the original is kept
+    simplification.results.clear()
+    start = time.perf_counter()
+    assert simplification.simplify(smp.sin(x)**2 + smp.cos(x)**2, 'full', 0.0) == smp.sin(x)**2 + smp.cos(x)**2
+    assert time.perf_counter() - start < 0.1
+
+    assert calculate('∂/∂x[(x^2 - y^2)/(x - y)]', ['x', '', '', '', '', '']) == '1'
+    try:
+        simplification.set_policy('none')
+        assert calculate('∂/∂x[(x^2 - y^2)/(x - y)]', ['x', '', '', '', '', '']) != '1'
+    finally:
+        simplification.set_policy('cheap')
+
+    # Derivatives aren't simplified by default, large ones stay fast
+    assert calculate('d/dx[sin(x)cos(x)]', ['x', '', '', '', '', '']) == '-sin(x)^2 + cos(x)^2'
+    start = time.perf_counter()
+    calculate('d/dx[(sin(x)+cos(y)+tan(z)+x)^20]', ['x', '', '', '', '', ''])
+    assert time.perf_counter() - start < simplification.settings['seconds']
+
+    # Steps that blow up are stopped at the deadline
+    large = smp.diff((smp.sin(x) + smp.cos(y) + smp.tan(smp.Symbol('z')) + x)**20, x)
+    start = time.perf_counter()
+    simplification.simplify(large, 'cheap')
+    assert time.perf_counter() - start < simplification.settings['seconds'] + 0.2
+
+def test_exact_arithmetic():
+    import arithmetic
+    no_conditions = ['', '', '', '', '', '']
+    assert calculate('1/3 + 1/6', no_conditions) == '1/2'
+    assert calculate('2^100 + 1', no_conditions) == '1267650600228229401496703205377'
+    assert calculate('sqrt(9/4) + 1/2', no_conditions) == '2'
+    assert calculate('(8/27)^(2/3)', no_conditions) == '4/9'
+    assert calculate('2(3 + 4)', no_conditions) == '14'
+    assert calculate('2.5*4', no_conditions) == '10.0'
+    assert arithmetic.evaluate('-2**2') == -4 and arithmetic.evaluate('2**-2') == arithmetic.Fraction(1, 4)
+
+    # Irrational results and constants are left to sympy
+    assert arithmetic.evaluate('sqrt(2)') is None and arithmetic.evaluate('2*pi') is None
+    assert calculate('sqrt(2)', no_conditions) == 'sqrt(2)'
+    assert calculate('2*π', no_conditions) == '2π'
+
+    # Functions of floats match sympy's Float
+    try:
+        arithmetic.settings['enabled'] = False
+        expected = calculate('sin(2.5)*2', no_conditions)
+    finally:
+        arithmetic.settings['enabled'] = True
+    assert calculate('sin(2.5)*2', no_conditions) == expected
+
+    # Division by zero and float overflow fall through to the sympy path instead of raising
+    for expression in ['1/0', '5%0', '0^-1', '2.0^10000', 'exp(1000.0)']:
+        assert arithmetic.evaluate(expression) is None
+        assert calculate(expression, no_conditions) == 'None'
+
+def test_taylor_expansion():
+    import sympy as smp
+    import expansions
+    assert calculate('taylor[sin(x)]', ['', '', '', '', '', '']) == 'x - x^3/6 + x^5/120 + O(x^6)'
+    assert calculate('taylor[1/sin(x)]', ['', '', '', '', '', '4']) == '1/x + x/6 + 7x^3/360 + O(x^4)'
+    assert calculate('taylor[exp(y)/y^2]', ['y', '', '', '', '', '3']) == 'y^(-2) + 1/y + 1/2 + y/6 + y^2/24 + O(y^3)'
+    assert calculate('taylor[ln(x)]', ['', '1', '', '', '', '3']) == 'x - 1 - (x - 1)^2/2 + O((x - 1)^3, (x, 1))'
+
+    # Same coefficients as smp.series, including ones ring_series can't expand
+    x, y = smp.symbols('x y')
+    for expr, point in [(smp.exp(smp.sin(x)) * smp.cos(x), 0), (1 / smp.sin(x) - 1 / x, 0), (smp.sin(x * y), 1),
+                        (1 / (1 - smp.cos(x)), 0), (smp.exp(x) / smp.sin(x)**3, 0), (smp.sqrt(1 + x), 0), (smp.tan(x), smp.Rational(1, 2))]:
+        terms = expansions.expand(expr, x, point, 7)
+        expected = smp.series(expr, x, point, 7).removeO()
+        assert smp.simplify(sum(c * (x - point)**k for k, c in terms.items()) - expected) == 0
+
+    # Lower orders come from the cached expansion
+    expr = smp.exp(smp.sin(x)) * smp.cos(x)
+    high = expansions.expand(expr, x, 0, 40)
+    assert expansions.expand(expr, x, 0, 10) == {k: c for k, c in high.items() if k < 10}
+
 # --- Placeholder for word problem page ---
 def test_word_problem_page_logic():
     # Similar to solver_ai, we are testing the underlying logic.
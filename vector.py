@@ -5,15 +5,27 @@ Description:
     expressions than in calculator.py, for the functions page in main.py.
 """
 
+import warnings
+from functools import lru_cache
 import numpy as np
 import sympy as smp
-from scipy.integrate import quad
+from sympy.polys.matrices import DomainMatrix
+from sympy.polys.matrices.exceptions import DMNonInvertibleMatrixError
 from calculator import post_clean
+from chunked import chunked_calc
+from batched import batched_calc
+import precision
+import profiling
+import capture
+import memory
+import session
 
 
 # Symbolic initialization
 t, x, y, z = smp.symbols('t x y z')
-poss_vars = ['t', 'x', 'y', 'z']
+u, v = smp.symbols('u v')  # surface parameters
+poss_vars = ['t', 'x', 'y', 'z', 'u', 'v']
+vector_locals = {'smp': smp, 't': t, 'x': x, 'y': y, 'z': z, 'u': u, 'v': v}
 operators = ['+', '-', '*', '/', '^']
 
 
@@ -77,6 +89,7 @@ def clean_symbolic(expr):
                 cleaned_expr += expr[i]
     return cleaned_expr
 
+@profiling.timed('vector_calc.parse')
 def str_to_array(vec):
     """
     Change string into an array of integers
@@ -100,6 +113,7 @@ def str_to_array(vec):
         arr.append(int(num))
     return arr
 
+@profiling.timed('vector_calc.parse')
 def str_to_array_dim(matrix):
     """
     Change string into an array of integers
@@ -125,6 +139,22 @@ def str_to_array_dim(matrix):
         arr.append([int(num) for num in row_nums])  
     return arr
 
+@profiling.timed('vector_calc.parse')
+def str_to_matrix(matrix):
+    """
+    Changes a matrix expression with rational or symbolic
+    entries ('[1/2, x; y, 3]') into a sympy Matrix
+
+    :param matrix: matrix expression
+    :returns: sympy Matrix
+    """
+    matrix = matrix.replace(' ', '')
+    if matrix[0] == '[' and matrix[-1] == ']':
+        matrix = matrix[1:-1]
+    rows = [[to_sympy(clean_symbolic(entry)) for entry in row.split(',')] for row in matrix.split(';')]
+    return smp.Matrix(rows)
+
+@profiling.timed('vector_calc.parse')
 def str_to_array_expr(vec):
     """
     Changes string expression into an array of expressions
@@ -180,19 +210,36 @@ def dot_product(a, b):
     :param b: vector b
     :returns: dot product of the two vectors
     """
-    a = np.array(str_to_array(a))
-    b = np.array(str_to_array(b))
-    return np.dot(a, b)
+    a = precision.to_array(str_to_array(a))
+    b = precision.to_array(str_to_array(b))
+    return precision.dot(a, b)
 
 def det(a):
     """
-    Determinant
-    :param a: vector
-    :returns: determinant
+    Determinant, exact (fraction-free) for every matrix: integer entries
+    are eliminated over ZZ instead of by floating-point LU
+
+    :param a: matrix expression
+    :returns: int for integer matrices, otherwise cleaned sympy text
     """
-    a = np.array(str_to_array_dim(a))
-    det = np.linalg.det(a)
-    return det
+    try:
+        a = str_to_array_dim(a)
+    except ValueError:
+        return post_clean(str(exact_det(str_to_matrix(a))))
+    return int(exact_det(smp.Matrix(a)))
+
+def inverse(a):
+    """
+    Exact inverse of a matrix
+    :param a: matrix expression
+    :returns: inverse as '[a, b; c, d]', or None when singular
+    """
+    try:
+        inv = exact_inverse(str_to_matrix(a))
+    except DMNonInvertibleMatrixError:
+        return None
+    rows = [', '.join(str(entry) for entry in inv.row(i)) for i in range(inv.rows)]
+    return post_clean('[' + '; '.join(rows) + ']')
 
 def cross_product(a, b):
     """
@@ -211,8 +258,8 @@ def norm_length(a):
     :param a: vector
     :returns: norm of vector
     """
-    a = np.array(str_to_array(a))
-    return np.linalg.norm(a)
+    a = precision.to_array(str_to_array(a))
+    return precision.norm(a)
 
 def projection(a, b):
     """
@@ -221,26 +268,20 @@ def projection(a, b):
     :param b: vector b
     :returns: projection of vector a on vector b
     """
-    a = np.array(str_to_array(a))
-    b = np.array(str_to_array(b))
-    proj = np.dot(a, b) / np.linalg.norm(b) ** 2 * b
+    a = precision.to_array(str_to_array(a))
+    b = precision.to_array(str_to_array(b))
+    proj = precision.projection(a, b)
     return proj
 
 def arc_length(a):
     """
-    Arc length of a vector
-    :param a: vector
-    :returns: arc length of vector
+    Arc length of a curve over t in [0, 1]
+    :param a: vector of expressions in t
+    :returns: arc length of the curve (0.0 for a constant vector)
     """
-    a = np.array(str_to_array_expr(a))
-    n_a = []
-    for i in a:
-        n_a.append(int(i))
-    expr = smp.Matrix([n_a[0], n_a[1], n_a[2]])
-    arc = smp.lambdify([t], smp.diff(expr,t).norm())
-
-    # Evaluate integral from [0-1] using scipy quad method
-    arc = quad(arc, 0, 1)[0]
+
+    # Line integral of 1 along the curve over t in [0-1]
+    arc = line_integral('1', a, (0, 1))
     arc = str(arc)
     arc = post_clean(arc)
     return arc
@@ -265,18 +306,363 @@ def derivative(a):
     return '[' + cleaned_deriv + ']'
 
 
+# ------------------ Exact Matrices ------------------
+
+def domain_matrix(m):
+    """
+    Converts a sympy Matrix to a DomainMatrix over the smallest ring of its
+    entries (ZZ, QQ, ZZ[x, y], ...), rational functions have their
+    denominators cleared so elimination stays fraction-free
+
+    :param m: square sympy Matrix
+    :returns: (DomainMatrix, common denominator as a sympy expression)
+    """
+    dm = DomainMatrix.from_Matrix(m)
+    if dm.domain.is_FractionField:
+        den, dm = dm.clear_denoms(convert=True)
+        return dm, den.domain.to_sympy(den.element)
+    return dm, smp.Integer(1)
+
+def exact_det(m):
+    """
+    Determinant by fraction-free (Bareiss) elimination over the ring of the entries
+
+    :param m: square sympy Matrix
+    :returns: sympy expression
+    """
+    if m.rows != m.cols:
+        raise ValueError('determinant of a non-square matrix')
+    dm, den = domain_matrix(m)
+    det = dm.domain.to_sympy(dm.det())
+    return det if den == 1 else smp.cancel(det / den ** m.rows)
+
+def exact_inverse(m):
+    """
+    Inverse as a fraction-free adjugate over one common denominator
+
+    :param m: square sympy Matrix
+    :returns: sympy Matrix
+    """
+    dm, den = domain_matrix(m)
+    num, d = dm.inv_den()
+    scale = den / dm.domain.to_sympy(d)
+    return num.to_Matrix().applyfunc(lambda entry: smp.cancel(entry * scale))
+
+
+# ------------------ Vector Fields ------------------
+
+def to_sympy(expr):
+    """
+    Turns a cleaned expression string into a sympy expression
+
+    :param expr: cleaned expression (output of clean_symbolic)
+    :returns: sympy expression
+    """
+    return session.inline(expr, vector_locals)
+
+@profiling.timed('vector_calc.parse')
+def str_to_field(vec):
+    """
+    Changes a field string into a list of sympy expressions,
+    '[x*y, y*z, z*x]' is a vector field and 'x*y*z' a scalar field
+
+    :param vec: field expression
+    :returns: list of sympy components (length 1 for scalar fields)
+    """
+    return [to_sympy(comp) for comp in str_to_array_expr(vec)]
+
+def coords(dim, exprs=()):
+    """
+    Coordinate symbols of a field, x, y, z up to three dimensions
+    and x1 ... xn for higher dimensional fields
+
+    :param dim: number of dimensions
+    :param exprs: field components, searched for x1 ... xn symbols
+    :returns: list of coordinate symbols
+    """
+
+    # Indices of any xk symbols used in the field (ex. x4 -> 4)
+    names = [sym.name for expr in exprs for sym in expr.free_symbols]
+    indexed = [int(name[1:]) for name in names if name[0] == 'x' and name[1:].isdigit()]
+
+    if dim <= 3 and not indexed:
+        return [x, y, z][:dim]
+    return list(smp.symbols(f'x1:{max([dim] + indexed) + 1}'))
+
+def jacobian(field, var):
+    """
+    All first partial derivatives of a field, computed once
+    and shared between divergence, curl and gradient
+
+    :param field: list of sympy components
+    :param var: coordinate symbols
+    :returns: sympy Matrix J with J[i, j] = dF_i / dvar_j
+    """
+    return smp.Matrix(field).jacobian(var)
+
+def gradient(f, var):
+    """
+    Gradient of a scalar field
+    :param f: sympy scalar expression
+    :param var: coordinate symbols
+    :returns: list of partial derivatives
+    """
+    return list(jacobian([f], var))
+
+def divergence(field, var):
+    """
+    Divergence of a vector field
+    :param field: list of sympy components
+    :param var: coordinate symbols (same length as field)
+    :returns: divergence expression
+    """
+    return jacobian(field, var).trace()
+
+def curl(field, var):
+    """
+    Curl of a 2 or 3 component vector field
+    :param field: list of sympy components
+    :param var: coordinate symbols
+    :returns: curl vector for 3D fields, scalar curl for 2D fields
+    """
+    J = jacobian(field, var)
+    if len(field) == 2:
+        return J[1, 0] - J[0, 1]
+    if len(field) == 3:
+        return [J[2, 1] - J[1, 2], J[0, 2] - J[2, 0], J[1, 0] - J[0, 1]]
+    raise ValueError('curl is only defined for 2 or 3 component fields')
+
+def laplacian(field, var):
+    """
+    Laplacian of a scalar field, or componentwise of a vector field
+    :param field: list of sympy components
+    :param var: coordinate symbols
+    :returns: list of laplacians, one per component
+    """
+    return [sum(smp.diff(f, v, 2) for v in var) for f in field]
+
+def directional_derivative(f, direction, var):
+    """
+    Directional derivative of a scalar field along a (normalized) direction
+    :param f: sympy scalar expression
+    :param direction: list of direction components
+    :param var: coordinate symbols
+    :returns: directional derivative expression
+    """
+    u = smp.Matrix(direction)
+    u = u / u.norm()
+    return (smp.Matrix(gradient(f, var)).T * u)[0]
+
+def compile_field(exprs, var):
+    """
+    Compiles field expressions into a single vectorized NumPy evaluator,
+    common subexpressions are eliminated across all components
+
+    :param exprs: list of sympy expressions
+    :param var: coordinate symbols (evaluator arguments)
+    :returns: function of coordinate grids returning an array of shape (len(exprs), *grid)
+    """
+    func = smp.lambdify(var, exprs, 'numpy', cse=True)
+
+    def evaluate(*grids):
+        grids = np.broadcast_arrays(*[np.asarray(g, dtype=float) for g in grids])
+        # Constant components come back as scalars, broadcast them to the grid
+        return np.stack([np.broadcast_to(c, grids[0].shape) for c in func(*grids)])
+
+    return evaluate
+
+def field_op(oper, a, b=None, compiled=False):
+    """
+    Vector field operations over x, y, z (or x1 ... xn)
+
+    :param oper: 'grad', 'div', 'curl', 'laplacian' or 'directional'
+    :param a: field expression
+    :param b: direction vector (directional derivative only)
+    :param compiled: return a NumPy grid evaluator instead of the expression
+    :returns: readable result string, or evaluator when compiled
+    """
+    field = str_to_field(a)
+    if oper in ('grad', 'directional', 'laplacian') and len(field) == 1:
+        var = coords(3, field)
+    else:
+        var = coords(len(field), field)
+
+    if oper == 'grad':
+        result = gradient(field[0], var)
+    elif oper == 'div':
+        result = divergence(field, var)
+    elif oper == 'curl':
+        result = curl(field, var)
+    elif oper == 'laplacian':
+        result = laplacian(field, var)
+    elif oper == 'directional':
+        result = directional_derivative(field[0], [to_sympy(c) for c in str_to_array_expr(b)], var)
+    else:
+        return None
+
+    if compiled:
+        return compile_field(result if isinstance(result, list) else [result], var)
+
+    # Scalars and one component results print without brackets
+    if not isinstance(result, list):
+        return post_clean(str(result))
+    if len(result) == 1:
+        return post_clean(str(result[0]))
+    return '[' + ', '.join(post_clean(str(c)) for c in result) + ']'
+
+
+# ------------------ Line / Surface Integrals ------------------
+
+@lru_cache(maxsize=None)
+def gauss_legendre(order):
+    """
+    Gauss-Legendre nodes and weights on [-1, 1] (cached per order)
+    :param order: number of nodes
+    :returns: (nodes, weights)
+    """
+    return np.polynomial.legendre.leggauss(order)
+
+def panel_nodes(a, b, panels, order):
+    """
+    Nodes and weights of a composite Gauss rule, [a, b] split into equal panels
+    :param a: left bound
+    :param b: right bound
+    :param panels: number of panels
+    :param order: nodes per panel
+    :returns: flat (nodes, weights) arrays
+    """
+    nodes, weights = gauss_legendre(order)
+    edges = np.linspace(a, b, panels + 1)
+    half = (edges[1:] - edges[:-1])[:, None] / 2
+    mid = (edges[1:] + edges[:-1])[:, None] / 2
+    return (mid + half * nodes).ravel(), (half * weights).ravel()
+
+def gauss_quad(func, bounds, tol=1e-10, order=16):
+    """
+    Adaptive tensor-product Gauss quadrature, the whole node grid is
+    evaluated in one vectorized call and the panel count is doubled
+    until two successive estimates agree to tol. Warns (RuntimeWarning)
+    when the panel cap is reached first
+
+    :param func: vectorized integrand taking one array per dimension
+    :param bounds: list of (a, b) pairs, one per dimension (1D or 2D)
+    :param tol: tolerance, relative for estimates above 1 in magnitude and
+                absolute below (so integrals of 0 converge)
+    :param order: Gauss nodes per panel
+    :returns: integral estimate
+    """
+
+    # Cap on panels per dimension (2D grids grow quadratically)
+    max_panels = 4096 if len(bounds) == 1 else 64
+    panels, previous = 1, None
+    while True:
+        nodes, weights = zip(*(panel_nodes(a, b, panels, order) for a, b in bounds))
+        grids = np.meshgrid(*nodes, indexing='ij')
+        w = weights[0] if len(weights) == 1 else np.outer(weights[0], weights[1])
+        value = float(np.sum(np.broadcast_to(func(*grids), w.shape) * w))
+
+        if previous is not None and abs(value - previous) <= tol * max(1.0, abs(value)):
+            return value
+        if panels >= max_panels:
+            warnings.warn(f'quadrature did not reach tol={tol} with {panels} panels per dimension '
+                          f'(last change {abs(value - previous):.3g})', RuntimeWarning, stacklevel=2)
+            return value
+        previous, panels = value, panels * 2
+
+def line_integrand(field, curve):
+    """
+    Integrand in t of a line integral along r(t), f(r)|r'| for scalar
+    fields and F(r)·r' for vector fields
+
+    :param field: list of sympy components (length 1 for scalar fields)
+    :param curve: list of sympy components of r(t)
+    :returns: sympy expression in t
+    """
+    r = smp.Matrix(curve)
+    dr = r.diff(t)
+    sub = dict(zip(coords(len(curve)), r))
+    if len(field) == 1:
+        return field[0].subs(sub) * dr.norm()
+    return sum(f.subs(sub) * d for f, d in zip(field, dr))
+
+def surface_integrand(field, surface):
+    """
+    Integrand in u, v of a surface integral over r(u, v), f(r)|r_u x r_v|
+    for scalar fields and the flux F(r)·(r_u x r_v) for vector fields
+
+    :param field: list of sympy components (length 1 for scalar fields)
+    :param surface: three sympy components of r(u, v)
+    :returns: sympy expression in u, v
+    """
+    r = smp.Matrix(surface)
+    normal = r.diff(u).cross(r.diff(v))
+    sub = dict(zip(coords(3), r))
+    if len(field) == 1:
+        return field[0].subs(sub) * normal.norm()
+    return sum(f.subs(sub) * c for f, c in zip(field, normal))
+
+def line_integral(a, b, bounds=(0, 1), tol=1e-10):
+    """
+    Line integral of a scalar or vector field along a parametric curve
+    :param a: field expression
+    :param b: curve r(t) expression
+    :param bounds: (t0, t1)
+    :param tol: tolerance (see gauss_quad)
+    :returns: value of the integral
+    """
+    integrand = line_integrand(str_to_field(a), str_to_field(b))
+    func = smp.lambdify([t], integrand, 'numpy', cse=True)
+    return gauss_quad(func, [bounds], tol)
+
+def surface_integral(a, b, bounds=((0, 1), (0, 1)), tol=1e-10):
+    """
+    Surface integral (flux for vector fields) over a parametric surface
+    :param a: field expression
+    :param b: surface r(u, v) expression
+    :param bounds: ((u0, u1), (v0, v1))
+    :param tol: tolerance (see gauss_quad)
+    :returns: value of the integral
+    """
+    integrand = surface_integrand(str_to_field(a), str_to_field(b))
+    func = smp.lambdify([u, v], integrand, 'numpy', cse=True)
+    return gauss_quad(func, list(bounds), tol)
+
+
 # ------------------ Main Calculation ------------------
 
-def vector_calc(oper, a, b=None):
+@capture.captured('vector_calc')
+def vector_calc(oper, a, b=None, compiled=False, bounds=None, out=None):
     """
     Calculates vector / matrix operations
 
     :param oper: operation
-    :param a: vector a or matrix expression
-    :param b: vector b
+    :param a: vector a or matrix expression, an (N, d) array / np.memmap of vectors
+              or an (N, k, k) stack of matrices
+    :param b: vector b (or matrix / stack for batched matmul and solve)
+    :param compiled: field operations return a NumPy grid evaluator
+    :param bounds: parameter bounds of integrals, (t0, t1) or ((u0, u1), (v0, v1))
+    :param out: output .npy path for operations over on-disk datasets
     :returns: calculation based on operation
     """
 
+    memory.tick()
+    with profiling.request('vector_calc', 'vector_calc.operation'):
+        profiling.count('vector_calc.operation ' + str(oper))
+        return operate(oper, a, b, compiled, bounds, out)
+
+def operate(oper, a, b, compiled, bounds, out):
+    """
+    Dispatches vector_calc to its operation
+
+    :returns: calculation based on operation
+    """
+
+    # Stacks of matrices run as one batch, datasets (possibly larger than RAM) chunk by chunk
+    if isinstance(a, np.ndarray) and a.ndim == 3:
+        return batched_calc(oper, a, b)
+    if isinstance(a, np.ndarray):
+        return chunked_calc(oper, a, b, out)
+
     if oper == 'add':
         return add(a, b)
     if oper == 'sub':
@@ -285,6 +671,8 @@ def vector_calc(oper, a, b=None):
         return dot_product(a, b)
     if oper == 'det':
         return det(a)
+    if oper == 'inv':
+        return inverse(a)
     if oper == 'cross':
         return cross_product(a, b)
     if oper == 'projection':
@@ -295,6 +683,12 @@ def vector_calc(oper, a, b=None):
         return arc_length(a)
     if oper == 'deriv':
         return derivative(a)
+    if oper in ('grad', 'div', 'curl', 'laplacian', 'directional'):
+        return field_op(oper, a, b, compiled)
+    if oper == 'line':
+        return line_integral(a, b, bounds or (0, 1))
+    if oper == 'surface':
+        return surface_integral(a, b, bounds or ((0, 1), (0, 1)))
 
 
 # Test:
@@ -0,0 +1,254 @@
+"""
+File: worksheet.py
+Description:
+    Worksheet of named cells for the calculator page. A cell holds a calculator
+    expression (x^2 + 1, d/dx[a], ...) that may reference other cells by name.
+    Cells form a dependency graph, and an edit recomputes only the cells downstream
+    of it, in dependency order, reusing the cached sympy values of all others.
+    Propagation stops at cells whose value did not change.
+"""
+
+import re
+from collections import deque
+import sympy as smp
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication
+from calculator import clean, inside_expr, post_clean, x, y, z, t, n
+
+
+# Cell expressions: an operation of the calculator page around a body, or a plain expression
+operation = re.compile(r'^(d/dx|∫|lim|∂/∂x|Σ)\[(.*)\]$')
+identifier = re.compile(r'[A-Za-z_][A-Za-z_0-9]*')
+
+# Names that are never cell references
+worksheet_locals = {'x': x, 'y': y, 'z': z, 't': t, 'n': n, 'π': smp.pi, 'e': smp.E, 'ln': smp.log,
+                    'log': smp.log, 'sqrt': smp.sqrt, 'exp': smp.exp, 'sin': smp.sin, 'cos': smp.cos,
+                    'tan': smp.tan, 'sec': smp.sec, 'csc': smp.csc, 'cot': smp.cot, 'pi': smp.pi,
+                    'asin': smp.asin, 'acos': smp.acos, 'atan': smp.atan, 'oo': smp.oo, 'I': smp.I}
+transformations = standard_transformations + (implicit_multiplication,)
+
+no_conditions = ['', '', '', '', '', '']
+
+
+class CellError(Exception):
+    """A cell that can't be evaluated (syntax, missing reference, cycle)"""
+
+
+class Worksheet:
+    """
+    Named cells with incremental recomputation
+
+    cells: name -> {'text', 'conditions', 'deps', 'value', 'error'}
+    dependents: name -> names of cells referencing it (also for names not defined yet)
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.dependents = {}
+        self.evaluations = 0
+
+    # ------------------ Editing ------------------
+
+    def set(self, name, text, conditions=None):
+        """
+        Creates or edits a cell and recomputes what depends on it
+
+        :param name: cell name (an identifier that is not x, y, z, t, n or a function)
+        :param text: calculator expression, may reference other cells
+        :param conditions: calculator conditions for the cell's operation (wrt, lim, ∫ bounds, Σ)
+        :returns: names of the cells that were recomputed, in order
+        """
+        if not identifier.fullmatch(name) or name in worksheet_locals:
+            raise ValueError(f'invalid cell name: {name}')
+
+        old = self.cells.get(name)
+        if old is not None:
+            for dep in old['deps']:
+                self.dependents[dep].discard(name)
+        deps = references(text)
+        for dep in deps:
+            self.dependents.setdefault(dep, set()).add(name)
+        # The previous value stays until re-evaluated, so an edit giving the same value stops there
+        self.cells[name] = {'text': text, 'conditions': list(conditions or no_conditions), 'deps': deps,
+                            'value': old['value'] if old else None, 'error': old['error'] if old else None}
+        return self.recompute([name])
+
+    def remove(self, name):
+        """
+        Deletes a cell, cells referencing it become errors
+
+        :param name: cell name
+        :returns: names of the cells that were recomputed
+        """
+        cell = self.cells.pop(name)
+        for dep in cell['deps']:
+            self.dependents[dep].discard(name)
+        return self.recompute(sorted(self.dependents.get(name, ())))
+
+    # ------------------ Recomputing ------------------
+
+    def affected(self, names):
+        """
+        Cells downstream of names (names included)
+
+        :param names: edited cells
+        :returns: set of cell names
+        """
+        seen, queue = set(), deque(names)
+        while queue:
+            name = queue.popleft()
+            if name in seen or name not in self.cells:
+                continue
+            seen.add(name)
+            queue.extend(self.dependents.get(name, ()))
+        return seen
+
+    def order(self, names):
+        """
+        Topological order of a set of cells (Kahn), counting only edges inside the set
+
+        :param names: set of cell names
+        :returns: (ordered names, names on a cycle)
+        """
+        waiting = {name: len(self.cells[name]['deps'] & names) for name in names}
+        ready = deque(sorted(name for name, count in waiting.items() if count == 0))
+        ordered = []
+        while ready:
+            name = ready.popleft()
+            ordered.append(name)
+            for dependent in sorted(self.dependents.get(name, ())):
+                if dependent in waiting:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        ready.append(dependent)
+        return ordered, names - set(ordered)
+
+    def recompute(self, names):
+        """
+        Re-evaluates the cells downstream of names. A cell whose value is
+        unchanged doesn't dirty its dependents
+
+        :param names: edited cells
+        :returns: names of the cells that were evaluated, in order
+        """
+        ordered, cycle = self.order(self.affected(names))
+        for name in cycle:
+            self.cells[name].update(value=None, error='circular reference')
+
+        dirty, evaluated = set(), []
+        for name in ordered:
+            cell = self.cells[name]
+            if name not in names and not cell['deps'] & dirty:
+                continue
+            before = (cell['value'], cell['error'])
+            self.evaluate(name)
+            evaluated.append(name)
+            if (cell['value'], cell['error']) != before:
+                dirty.add(name)
+        return evaluated
+
+    def evaluate(self, name):
+        """
+        Evaluates one cell from the cached values of its references
+        :param name: cell name
+        """
+        cell = self.cells[name]
+        self.evaluations += 1
+        try:
+            cell.update(value=evaluate(cell['text'], cell['conditions'], self.references_of(cell)), error=None)
+        except CellError as error:
+            cell.update(value=None, error=str(error))
+
+    def references_of(self, cell):
+        """
+        :param cell: cell dict
+        :returns: {name: cached sympy value} of the cells it references
+        """
+        values = {}
+        for dep in cell['deps']:
+            other = self.cells.get(dep)
+            if other is None:
+                raise CellError(f'{dep} is not defined')
+            if other['error'] is not None:
+                raise CellError(f'{dep}: {other["error"]}')
+            values[dep] = other['value']
+        return values
+
+    # ------------------ Reading ------------------
+
+    def value(self, name):
+        """
+        :param name: cell name
+        :returns: cached sympy value (None when the cell has an error)
+        """
+        return self.cells[name]['value']
+
+    def display(self, name):
+        """
+        :param name: cell name
+        :returns: user readable result, or 'ERROR: ...'
+        """
+        cell = self.cells[name]
+        if cell['error'] is not None:
+            return 'ERROR: ' + cell['error']
+        return post_clean(str(cell['value']))
+
+    def results(self):
+        """
+        :returns: {name: display text} of every cell
+        """
+        return {name: self.display(name) for name in self.cells}
+
+
+# ------------------ Parsing / Evaluating ------------------
+
+def split(text):
+    """
+    :param text: cell expression
+    :returns: (operation or 'regular', body)
+    """
+    text = text.replace(' ', '')
+    match = operation.match(text)
+    return (match[1], match[2]) if match else ('regular', text)
+
+def references(text):
+    """
+    Cell names an expression refers to
+
+    :param text: cell expression
+    :returns: set of names
+    """
+    return {name for name in identifier.findall(split(text)[1]) if name not in worksheet_locals}
+
+def evaluate(text, conditions, values):
+    """
+    Evaluates a cell expression
+
+    :param text: cell expression
+    :param conditions: calculator conditions
+    :param values: {cell name: sympy value} of its references
+    :returns: sympy value
+    """
+    op, body = split(text)
+    cleaned = clean(body)
+    if cleaned is None:
+        raise CellError('syntax error')
+    try:
+        expr = parse_expr(cleaned, local_dict={**worksheet_locals, **values}, transformations=transformations)
+    except Exception:
+        raise CellError('syntax error')
+    if op == 'regular':
+        return expr
+    result = inside_expr(op, expr, conditions)
+    if result is None:
+        raise CellError(f'{op} failed')
+    return result
+
+
+# Test:
+if __name__ == '__main__':
+    sheet = Worksheet()
+    sheet.set('a', 'x^2 + 1')
+    sheet.set('b', 'd/dx[a]')
+    sheet.set('c', 'a*b')
+    print(sheet.results())
+    print(sheet.set('a', 'sin(x)'), sheet.results())